@@ -0,0 +1,478 @@
+# benchmarks/bench.py
+"""
+Tekrarlanabilir performans ölçümleri (repo kökünden çalıştırılır).
+
+    python -m benchmarks.bench run -o bench.json                 # tüm hedefler
+    python -m benchmarks.bench run -t dapt_evaluate_all -t note_generate_warm
+    python -m benchmarks.bench compare baseline.json bench.json --threshold 0.10
+
+- Her hedef: ısınma + N örnek; örnek başına işlem süresi (µs/op) üzerinden özet istatistik
+- JSON çıktısında ortam bilgisi (Python, platform, git commit) bulunur
+- compare: medyan süre eşiği aşan hedefleri regresyon olarak işaretler (çıkış kodu 1)
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DAPT_RULES_PATH = "rules/dapt.yaml"
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class Target:
+    name: str
+    setup: Callable[[], Tuple[Callable[[], Any], int]]   # (ölçülecek işlem, çağrı başına işlem sayısı)
+    repeat: int = 20
+    warmup: int = 2
+    description: str = ""
+
+
+# ----------------------------
+# Targets
+# ----------------------------
+def _dapt_init(precompute: bool) -> Callable[[], Tuple[Callable[[], Any], int]]:
+    def setup():
+        from core.engine import DaptRuleEngine
+
+        return (lambda: DaptRuleEngine(DAPT_RULES_PATH, precompute=precompute)), 1
+
+    return setup
+
+
+def _dapt_answer_space() -> List[Dict[str, Any]]:
+    """Tüm soru seçenekleri + 'yanıtlanmamış' (None) kartezyen çarpımı."""
+    from core.engine import DaptRuleEngine
+
+    engine = DaptRuleEngine(DAPT_RULES_PATH)
+    axes = [[(q.id, v) for v in [*q.options, None]] for q in engine.questions]
+    return [{k: v for k, v in combo if v is not None} for combo in itertools.product(*axes)]
+
+
+def _dapt_evaluate_all(cached: bool) -> Callable[[], Tuple[Callable[[], Any], int]]:
+    def setup():
+        from core.engine import DaptRuleEngine
+        from core.records import FrozenRecord
+        from core.result_cache import RESULT_CACHE
+
+        engine = DaptRuleEngine(DAPT_RULES_PATH, precompute=True)
+        space = [FrozenRecord(a) for a in _dapt_answer_space()]
+
+        def run():
+            if not cached:
+                RESULT_CACHE.clear()  # aksi halde ilk turdan sonra yalnızca önbellek isabeti ölçülür
+            for answers in space:
+                engine.evaluate(answers)
+
+        return run, len(space)
+
+    return setup
+
+
+OAC_AGENTS = ("Warfarin", "Apiksaban", "Rivaroksaban", "Edoksaban", "Dabigatran", "Bilinmiyor")
+OAC_EGFR = tuple(range(0, 125, 5))
+
+
+def _oac_grid() -> List[Dict[str, Any]]:
+    grid = []
+    for agent, egfr, bleed, urgency, very_high in itertools.product(
+        OAC_AGENTS, OAC_EGFR, ("Düşük-Orta", "Yüksek"), ("Elektif", "Time-sensitive", "Acil"), (False, True)
+    ):
+        mech = agent == "Warfarin"
+        grid.append(
+            dict(agent=agent, urgency=urgency, bleed_risk=bleed, very_high_bleed=very_high,
+                 egfr=float(egfr), has_mech_valve=mech, high_te_risk=mech)
+        )
+    return grid
+
+
+def _oac_evaluate_grid(cached: bool) -> Callable[[], Tuple[Callable[[], Any], int]]:
+    def setup():
+        from core.oac_engine import OacRuleEngine
+        from core.result_cache import RESULT_CACHE
+
+        engine = OacRuleEngine()
+        grid = _oac_grid()
+
+        def run():
+            if not cached:
+                RESULT_CACHE.clear()
+            for kw in grid:
+                engine.evaluate(**kw)
+
+        return run, len(grid)
+
+    return setup
+
+
+def _oac_evaluate_batch() -> Tuple[Callable[[], Any], int]:
+    from core.oac_engine import OacRuleEngine
+    from core.result_cache import RESULT_CACHE
+
+    engine = OacRuleEngine()
+    grid = _oac_grid()
+    cols = {k: [row[k] for row in grid] for k in grid[0]}
+
+    def run():
+        RESULT_CACHE.clear()  # vektörleştirilemeyen satırlar önbellekli evaluate'e düşer
+        engine.evaluate_batch(**cols)
+
+    return run, len(grid)
+
+
+def _load_drug_list_snapshot() -> Tuple[Callable[[], Any], int]:
+    from core import catalog_snapshot
+    from core.catalog import DEFAULT_CSV_PATH
+
+    catalog_snapshot.load_drug_names(DEFAULT_CSV_PATH)  # snapshot yoksa üretilir
+
+    def run():
+        catalog_snapshot._cache.clear()
+        names = catalog_snapshot.load_drug_names(DEFAULT_CSV_PATH)
+        return names[len(names) // 2]
+
+    return run, 1
+
+
+def _load_drug_list_csv() -> Tuple[Callable[[], Any], int]:
+    from core.catalog import DEFAULT_CSV_PATH, read_drug_names
+
+    return (lambda: read_drug_names(DEFAULT_CSV_PATH)), 1
+
+
+def _catalog_build() -> Tuple[Callable[[], Any], int]:
+    from core.catalog import DEFAULT_CSV_PATH, DrugCatalog
+    from core.catalog_snapshot import load_drug_names
+
+    mapped = load_drug_names(DEFAULT_CSV_PATH)
+    names = list(mapped)
+    hashes = list(getattr(mapped, "hashes", None) or []) or None
+    return (lambda: DrugCatalog(names, hashes)), 1
+
+
+def _catalog_open_mapped() -> Tuple[Callable[[], Any], int]:
+    """Yeni çalışan: snapshot mmap + MappedCatalog + sınıf tablosu (kurulum yok)."""
+    from core import catalog_snapshot
+    from core.catalog import DEFAULT_CSV_PATH
+    from core.drug_classes import get_class_table
+
+    catalog_snapshot.load_drug_names(DEFAULT_CSV_PATH)  # snapshot yoksa üretilir
+    snap = catalog_snapshot.snapshot_path_for(DEFAULT_CSV_PATH)
+
+    def run():
+        catalog = catalog_snapshot.MappedNames(snap).catalog()
+        table = get_class_table(catalog)
+        return table[len(table) // 2]
+
+    return run, 1
+
+
+SEARCH_QUERIES = ("beloc", "ELIQUIS 5", "apiksaban", "klopidogrel 75", "aspirin", "atorva", "coraspin", "warfarin")
+
+
+def _catalog_search(mapped: bool) -> Callable[[], Tuple[Callable[[], Any], int]]:
+    def setup():
+        from core.catalog import DEFAULT_CSV_PATH, DrugCatalog
+        from core.catalog_snapshot import MappedNames, load_drug_names
+
+        names = load_drug_names(DEFAULT_CSV_PATH)
+        if mapped and isinstance(names, MappedNames):
+            catalog = names.catalog()
+        else:
+            catalog = DrugCatalog(list(names))
+        return (lambda: [catalog.search(q, 50) for q in SEARCH_QUERIES]), len(SEARCH_QUERIES)
+
+    return setup
+
+
+def _catalog_apply() -> Tuple[Callable[[], Any], int]:
+    """SGK güncellemesi benzeri ~%1 fark (eklenen/kaldırılan/yeniden adlandırılan) -> diff + apply."""
+    from core.catalog import DEFAULT_CSV_PATH, DrugCatalog
+    from core.catalog_snapshot import load_drug_names
+
+    names = list(load_drug_names(DEFAULT_CSV_PATH))
+    base = DrugCatalog(names)
+    step = max(1, len(names) // 40)
+    removed = set(names[::step])
+    renamed = {n: n.lower() for n in names[1::step] if n not in removed and n.lower() != n}
+    added = [f"BENCH{i} 10 MG TABLET (28 TABLET) (10 MG, metoprolol)" for i in range(len(removed))]
+    new = sorted([renamed.get(n, n) for n in names if n not in removed] + added)
+    return (lambda: base.apply(base.diff(new))), 1
+
+
+DDI_QUERIES = (
+    "apiksaban", "klopidogrel", "aspirin", "amiodaron", "digoksin", "metoprolol", "verapamil", "ramipril",
+    "valsartan", "spironolakton", "atorvastatin", "klaritromisin", "ibuprofen", "esomeprazol", "izosorbid",
+    "kolsisin", "furosemid", "metformin", "insulin", "levotiroksin",
+)
+
+
+def _ddi_check() -> Tuple[Callable[[], Any], int]:
+    """Polifarmasi: 20 katalog ürünü (çok sayıda etkileşimli çift) -> tüm çiftlerin kontrolü."""
+    from core.catalog import get_catalog
+    from core.registry import get_interaction_index
+
+    catalog = get_catalog()
+    index = get_interaction_index()
+    meds = [p.name for q in DDI_QUERIES for p in catalog.search(q, 1)] if catalog is not None else list(DDI_QUERIES)
+    index.check(meds, catalog)  # ürün tablosu kurulsun
+    return (lambda: index.check(meds, catalog)), 1
+
+
+NOTE_VARIANTS = 64
+
+
+def _note_contexts() -> List[Tuple[Any, ...]]:
+    from core.patient import PatientContext
+
+    out = []
+    for i in range(NOTE_VARIANTS):
+        ctx = PatientContext(
+            patient_age=40 + i % 50,
+            hr=45 + (i * 7) % 90,
+            sbp=100 + i % 60,
+            has_af="Evet" if i % 2 else "Hayır",
+            has_hf="Evet" if i % 3 == 0 else "Hayır",
+            lvef="<40%" if i % 6 == 0 else "≥50%",
+            has_ckd="Evet" if i % 4 == 0 else "Hayır",
+            egfr=float(20 + i),
+            has_cad="Evet" if i % 5 < 2 else "Hayır",
+            antithrombotic_strategy=("DAPT (Tool-1)", "Monoterapi-AP", "Monoterapi-OAC", "—")[i % 4],
+            current_meds=[["Metoprolol"], ["Verapamil", "Aspirin"], [], ["Diltiazem"]][i % 4],
+        )
+        out.append((ctx, {"recommendation_tr": "Öneri", "class": "I"}, "F2) OAK", "- Cihaz yok.\n",
+                    "- RCRI skoru: 1/6", "- Akış", "- Test"))
+    return out
+
+
+def _note_generate(cold: bool) -> Callable[[], Tuple[Callable[[], Any], int]]:
+    def setup():
+        from core.clinical import clear_note_cache, generate_consultation_note
+
+        cases = _note_contexts()
+        for args in cases:
+            generate_consultation_note(*args)  # katalog/sınıf tablosu yüklensin
+
+        def run():
+            if cold:
+                clear_note_cache()
+            for args in cases:
+                generate_consultation_note(*args)
+
+        return run, len(cases)
+
+    return setup
+
+
+def _app_rerun() -> Tuple[Callable[[], Any], int]:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"app.py ilk çalıştırmada hata verdi: {at.exception}")
+
+    def run():
+        at.run()
+
+    return run, 1
+
+
+TARGETS: Dict[str, Target] = {
+    t.name: t
+    for t in (
+        Target("dapt_init", _dapt_init(False), repeat=30, description="DaptRuleEngine.__init__ (YAML + derleme)"),
+        Target("dapt_init_precompute", _dapt_init(True), repeat=30, description="DaptRuleEngine.__init__ + doğruluk tablosu"),
+        Target("dapt_evaluate_all", _dapt_evaluate_all(False), description="evaluate: tüm yanıt uzayı (seçenekler + yanıtsız; sonuç önbelleği boş)"),
+        Target("dapt_evaluate_all_cached", _dapt_evaluate_all(True), description="evaluate: aynı uzay (sonuç önbelleği dolu)"),
+        Target("oac_evaluate_grid", _oac_evaluate_grid(False), description="OacRuleEngine.evaluate: eGFR × ajan × risk × aciliyet grid'i (sonuç önbelleği boş)"),
+        Target("oac_evaluate_grid_cached", _oac_evaluate_grid(True), description="OacRuleEngine.evaluate: aynı grid (sonuç önbelleği dolu)"),
+        Target("oac_evaluate_batch", _oac_evaluate_batch, description="OacRuleEngine.evaluate_batch: aynı grid (NumPy; sonuç önbelleği boş)"),
+        Target("load_drug_list", _load_drug_list_snapshot, repeat=30, description="load_drug_names (mmap snapshot, soğuk önbellek)"),
+        Target("load_drug_list_csv", _load_drug_list_csv, repeat=10, description="read_drug_names (CSV ayrıştırma)"),
+        Target("catalog_build", _catalog_build, repeat=5, description="DrugCatalog indeks kurulumu"),
+        Target("catalog_open_mapped", _catalog_open_mapped, repeat=30, description="MappedNames + MappedCatalog + sınıf tablosu (yeni çalışan)"),
+        Target("catalog_search", _catalog_search(False), description="DrugCatalog.search (bellek içi indeks)"),
+        Target("catalog_search_mapped", _catalog_search(True), description="MappedCatalog.search (mmap snapshot)"),
+        Target("catalog_apply", _catalog_apply, repeat=10, description="DrugCatalog.diff + apply (~%2,5 ekleme/çıkarma/ad değişikliği)"),
+        Target("ddi_check_20_meds", _ddi_check, description="InteractionIndex.check: 20 ilaçlık liste"),
+        Target("note_generate_cold", _note_generate(True), description="generate_consultation_note (bölüm önbelleği boş)"),
+        Target("note_generate_warm", _note_generate(False), description="generate_consultation_note (bölüm önbelleği dolu)"),
+        Target("app_rerun", _app_rerun, repeat=10, warmup=1, description="app.py tam rerun (streamlit AppTest)"),
+    )
+}
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    k = min(len(sorted_vals) - 1, max(0, int(round(p / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+def summarize(samples_us: List[float]) -> Dict[str, float]:
+    s = sorted(samples_us)
+    q1, q3 = _percentile(s, 25), _percentile(s, 75)
+    return {
+        "n": len(s),
+        "min_us": round(s[0], 3),
+        "median_us": round(statistics.median(s), 3),
+        "mean_us": round(statistics.fmean(s), 3),
+        "stdev_us": round(statistics.stdev(s), 3) if len(s) > 1 else 0.0,
+        "p95_us": round(_percentile(s, 95), 3),
+        "iqr_us": round(q3 - q1, 3),
+        "max_us": round(s[-1], 3),
+    }
+
+
+def measure(target: Target, repeat: Optional[int] = None) -> Dict[str, Any]:
+    fn, ops = target.setup()
+    for _ in range(target.warmup):
+        fn()
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat or target.repeat):
+            t0 = time.perf_counter_ns()
+            fn()
+            samples.append((time.perf_counter_ns() - t0) / 1e3 / ops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {"description": target.description, "ops_per_sample": ops, **summarize(samples)}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run_suite(names: List[str], repeat: Optional[int] = None, quiet: bool = False) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in names:
+        target = TARGETS[name]
+        try:
+            res = measure(target, repeat)
+        except ImportError as e:
+            # ör. streamlit kurulu değilse app_rerun atlanır
+            res = {"description": target.description, "skipped": f"{type(e).__name__}: {e}"}
+        results[name] = res
+        if not quiet:
+            if "skipped" in res:
+                print(f"{name:<24} atlandı ({res['skipped']})", file=sys.stderr)
+            else:
+                print(f"{name:<24} median {res['median_us']:>12.3f} µs/op  p95 {res['p95_us']:>12.3f}  (n={res['n']})",
+                      file=sys.stderr)
+    return {"schema": SCHEMA_VERSION, "environment": environment(), "results": results}
+
+
+# ----------------------------
+# Compare
+# ----------------------------
+@dataclass
+class Comparison:
+    name: str
+    base_us: float
+    new_us: float
+    ratio: float
+    status: str      # "regression" | "improvement" | "ok"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[Comparison]:
+    out: List[Comparison] = []
+    base_res, cur_res = baseline.get("results", {}), current.get("results", {})
+    for name in sorted(set(base_res) & set(cur_res)):
+        b, c = base_res[name], cur_res[name]
+        if "median_us" not in b or "median_us" not in c or b["median_us"] <= 0:
+            continue
+        ratio = c["median_us"] / b["median_us"]
+        if ratio > 1.0 + threshold:
+            status = "regression"
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        out.append(Comparison(name, b["median_us"], c["median_us"], round(ratio, 3), status))
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="CAPE performans ölçümleri.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ap_run = sub.add_parser("run", help="Ölçümleri çalıştır ve JSON üret")
+    ap_run.add_argument("-t", "--target", action="append", choices=sorted(TARGETS), help="Yalnızca bu hedef(ler)")
+    ap_run.add_argument("-o", "--out", default="-", help="JSON çıktı dosyası (varsayılan: stdout)")
+    ap_run.add_argument("-r", "--repeat", type=int, default=None, help="Örnek sayısını geçersiz kıl")
+    ap_run.add_argument("--quiet", action="store_true")
+
+    ap_cmp = sub.add_parser("compare", help="Bir baseline ile karşılaştır (regresyonda çıkış kodu 1)")
+    ap_cmp.add_argument("baseline")
+    ap_cmp.add_argument("current")
+    ap_cmp.add_argument("--threshold", type=float, default=0.10, help="Medyan artış eşiği (0.10 = %%10)")
+    ap_cmp.add_argument("--json", action="store_true", help="Sonucu JSON olarak yaz")
+
+    sub.add_parser("list", help="Hedefleri listele")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "list":
+        for name, t in TARGETS.items():
+            print(f"{name:<24} {t.description}")
+        return 0
+
+    if args.cmd == "run":
+        report = run_suite(args.target or list(TARGETS), args.repeat, args.quiet)
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out == "-":
+            print(data)
+        else:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(data + "\n")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    if args.json:
+        print(json.dumps([asdict(r) for r in rows], ensure_ascii=False, indent=2))
+    else:
+        print(f"{'hedef':<24} {'baseline µs':>14} {'şimdi µs':>14} {'oran':>7}  durum")
+        for r in rows:
+            print(f"{r.name:<24} {r.base_us:>14.3f} {r.new_us:>14.3f} {r.ratio:>7.3f}  {r.status}")
+    return 1 if any(r.status == "regression" for r in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,461 @@
+# benchmarks/loadtest.py
+"""
+Eşzamanlı oturum yük testi: N sanal klinisyen oturumu app.py'yi gerçekçi etkileşim senaryolarıyla
+(streamlit AppTest, headless) sürer; N büyüdükçe kapasite eğrisi üretir (repo kökünden çalıştırılır).
+
+    python -m benchmarks.loadtest --sessions 1,2,4,8,16 -o capacity.json
+    python -m benchmarks.loadtest --sessions 1,8,32 --script meds --think-time 20 --no-memory
+
+Her N için:
+- rerun gecikmesi p50/p90/p95/p99 (ms), toplam ve senaryo bazında
+- etkileşim başına CPU (process_time; audit / arka plan thread'leri dahil)
+- oturum başına bellek (tracemalloc; ayrı geçişte ölçülür, zamanlamaları bozmaz). Oturum durumu
+  (answers, dapt_result, widget state) + oturumun son render ağacını (ilaç seçenek listesi dahil) kapsar
+- think-time'a göre süreç kullanımı (N x CPU / think-time) ve tahmini p95 (p95 / (1 - kullanım))
+Özet: hedef kullanımda süreç başına oturum sınırı ve N üzerinden doğrusal bellek uyumu (sabit + oturum başı).
+
+Notlar:
+- AppTest global Runtime durumunu değiştirdiği için oturumlar süreç içinde sırayla (tur tur, araya girerek)
+  sürülür; tek Streamlit süreci de rerun'ları GIL altında fiilen sıralı çalıştırır. Kuyruk etkisi
+  kullanım üzerinden tahmin edilir
+- AppTest her etkileşimde tam script'i çalıştırır (fragment-only rerun yok): gecikmeler üst sınırdır
+- Oturumlar tohumdan (--seed) türetilmiş farklı girdiler kullanır; sonuç önbelleği gerçekçi isabet alır
+- Denetim kaydı varsayılan kapalıdır (--audit ile CAPE_AUDIT_DB'ye yazar)
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.bench import _percentile, environment
+
+APP_PATH = "app.py"
+SCHEMA_VERSION = 1
+
+DRUG_QUERIES = (
+    "beloc", "eliquis", "apiksaban", "coraspin", "plavix", "klopidogrel", "xarelto", "coumadin", "isoptin",
+    "digoksin", "amiodaron", "atorvastatin", "ramipril", "valsartan", "metformin", "lasix", "aldactone",
+)
+
+
+# ----------------------------
+# Senaryolar
+# ----------------------------
+# adım: (ad, fn(at, rng) -> bool); False = bu oturumda uygulanamadı (ör. görünmeyen soru), rerun yapılmaz
+Step = Tuple[str, Callable[[Any, random.Random], bool]]
+
+
+def _by_label(widgets, label: str):
+    return next((w for w in widgets if w.label == label), None)
+
+
+def _by_key(widgets, key: str):
+    return next((w for w in widgets if w.key == key), None)
+
+
+def _select(label: str, value: Optional[str] = None) -> Callable[[Any, random.Random], bool]:
+    def step(at, rng):
+        w = _by_label(at.selectbox, label)
+        if w is None or w.disabled:
+            return False
+        w.set_value(value if value is not None else rng.choice(list(w.options)))
+        return True
+
+    return step
+
+
+def _select_key(key: str) -> Callable[[Any, random.Random], bool]:
+    def step(at, rng):
+        w = _by_key(at.selectbox, key)
+        if w is None or w.disabled:
+            return False
+        w.set_value(rng.choice(list(w.options)))
+        return True
+
+    return step
+
+
+def _radio(key: str) -> Callable[[Any, random.Random], bool]:
+    def step(at, rng):
+        w = _by_key(at.radio, key)
+        if w is None:
+            return False
+        w.set_value(rng.choice(list(w.options)))
+        return True
+
+    return step
+
+
+def _number(label: str, lo: float, hi: float) -> Callable[[Any, random.Random], bool]:
+    def step(at, rng):
+        w = _by_label(at.number_input, label)
+        if w is None:
+            return False
+        w.set_value(type(w.value)(round(rng.uniform(lo, hi))))
+        return True
+
+    return step
+
+
+def _click(key: str = "", label: str = "") -> Callable[[Any, random.Random], bool]:
+    def step(at, rng):
+        w = _by_key(at.button, key) if key else _by_label(at.button, label)
+        if w is None:
+            return False
+        w.click()
+        return True
+
+    return step
+
+
+def _search_med(at, rng) -> bool:
+    w = _by_key(at.text_input, "drug_query")
+    if w is None:
+        return False
+    w.set_value(rng.choice(DRUG_QUERIES))
+    return True
+
+
+def _pick_med(at, rng) -> bool:
+    """Arama sonuçlarından henüz seçilmemiş ilk ürünü ekle."""
+    w = _by_key(at.multiselect, "current_meds")
+    if w is None:
+        return False
+    fresh = [o for o in w.options if o not in w.value]
+    if not fresh:
+        return False
+    w.set_value([*w.value, fresh[0]])
+    return True
+
+
+def _vitals(at, rng) -> bool:
+    for key, lo, hi in (("hr", 40, 130), ("sbp", 90, 190), ("dbp", 50, 110)):
+        w = _by_key(at.number_input, key)
+        if w is None:
+            return False
+        w.set_value(rng.randint(lo, hi))
+    return _click(label="Vital bulguları kaydet")(at, rng)
+
+
+SCRIPTS: Dict[str, List[Step]] = {
+    # KAH + DAPT soru akışı, Tool-1, not
+    "dapt": [
+        ("cad", _select("Koroner arter hastalığı / PCI öyküsü", "Evet")),
+        ("q_bleeding", _radio("q_high_bleeding_risk_ncs")),
+        ("q_defer", _radio("q_can_defer_ncs")),
+        ("q_pci_1m", _radio("q_pci_lt_1m")),
+        ("q_acs_3m", _radio("q_acs_lt_3m")),
+        ("tool1", _click("btn_tool1")),
+        ("surgery_risk", _select("Cerrahi aciliyeti")),
+        ("note", _click("btn_generate_all")),
+    ],
+    # AF + NOAC kesme/yeniden başlama, Tool-2, not
+    "oac": [
+        ("af", _select("Atriyal fibrilasyon (AF)", "Evet")),
+        ("ckd", _select("Kronik böbrek hastalığı (CKD)")),
+        ("egfr", _number("eGFR (ml/dk/1.73m²) - varsa", 15, 110)),
+        ("oac_agent", _select_key("oac_agent")),
+        ("bleed_risk", _select_key("bleed_risk_oac")),
+        ("tool2", _click("btn_tool2")),
+        ("note", _click("btn_generate_all")),
+    ],
+    # ilaç arama / seçim (etkileşim uyarıları), not
+    "meds": [
+        ("search_1", _search_med),
+        ("pick_1", _pick_med),
+        ("search_2", _search_med),
+        ("pick_2", _pick_med),
+        ("search_3", _search_med),
+        ("pick_3", _pick_med),
+        ("search_4", _search_med),
+        ("pick_4", _pick_med),
+        ("note", _click("btn_generate_all")),
+    ],
+    # vitaller (form), RCRI, cihaz, mekanik kapak, not
+    "vitals": [
+        ("vitals", _vitals),
+        ("dm", _select("Diabetes mellitus")),
+        ("device", _select("Hastada pacemaker/ICD/CRT var mı?", "Evet")),
+        ("device_type", _select("Cihaz tipi")),
+        ("mech_valve", _select("Mekanik kapak var mı?")),
+        ("note", _click("btn_generate_all")),
+    ],
+}
+
+
+# ----------------------------
+# Oturumlar
+# ----------------------------
+@dataclass
+class Sample:
+    script: str
+    step: str
+    wall_ms: float
+    cpu_ms: float
+    error: bool
+
+
+@dataclass
+class Session:
+    at: Any
+    script: str
+    rng: random.Random
+    steps: List[Step]
+    pos: int = 0
+    loaded: bool = False
+    samples: List[Sample] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.loaded and self.pos >= len(self.steps)
+
+    def _timed_run(self, step: str) -> None:
+        c0, t0 = time.process_time(), time.perf_counter()
+        self.at.run()
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        self.samples.append(Sample(self.script, step, wall * 1e3, cpu * 1e3, bool(self.at.exception)))
+
+    def advance(self) -> None:
+        """Bir etkileşim: ilk turda sayfa açılışı, sonra senaryonun sıradaki uygulanabilir adımı."""
+        if not self.loaded:
+            self.loaded = True
+            self._timed_run("load")
+            return
+        while self.pos < len(self.steps):
+            name, fn = self.steps[self.pos]
+            self.pos += 1
+            if fn(self.at, self.rng):
+                self._timed_run(name)
+                return
+
+
+def open_sessions(n: int, scripts: Sequence[str], seed: int, timeout: float) -> List[Session]:
+    from streamlit.testing.v1 import AppTest
+
+    return [
+        Session(
+            at=AppTest.from_file(APP_PATH, default_timeout=timeout),
+            script=scripts[i % len(scripts)],
+            rng=random.Random(seed * 100003 + i),
+            steps=SCRIPTS[scripts[i % len(scripts)]],
+        )
+        for i in range(n)
+    ]
+
+
+def drive(sessions: Sequence[Session]) -> None:
+    """Oturumlar tur tur ilerler: her turda her oturum bir etkileşim yapar (araya girmeli trafik)."""
+    while True:
+        active = [s for s in sessions if not s.done]
+        if not active:
+            return
+        for s in active:
+            s.advance()
+
+
+# ----------------------------
+# Ölçüm
+# ----------------------------
+def _latency(values: List[float]) -> Dict[str, float]:
+    s = sorted(values)
+    if not s:
+        return {}
+    return {
+        "p50_ms": round(_percentile(s, 50), 3),
+        "p90_ms": round(_percentile(s, 90), 3),
+        "p95_ms": round(_percentile(s, 95), 3),
+        "p99_ms": round(_percentile(s, 99), 3),
+        "max_ms": round(s[-1], 3),
+    }
+
+
+def _rss_mib() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def measure_timing(n: int, scripts: Sequence[str], seed: int, timeout: float, think_time: float) -> Dict[str, Any]:
+    sessions = open_sessions(n, scripts, seed, timeout)
+    t0 = time.perf_counter()
+    drive(sessions)
+    elapsed = time.perf_counter() - t0
+    samples = [x for s in sessions for x in s.samples]
+
+    wall = [x.wall_ms for x in samples]
+    cpu_mean = sum(x.cpu_ms for x in samples) / len(samples)
+    lat = _latency(wall)
+    # think-time başına bir etkileşim yapan N klinisyen -> süreç kullanımı
+    utilization = n * (cpu_mean / 1e3) / think_time
+    out: Dict[str, Any] = {
+        "sessions": n,
+        "interactions": len(samples),
+        "errors": sum(x.error for x in samples),
+        "latency": lat,
+        "cpu_ms_per_interaction": round(cpu_mean, 3),
+        "wall_ms_mean": round(sum(wall) / len(wall), 3),
+        "throughput_per_s": round(len(samples) / elapsed, 2),
+        "utilization": round(utilization, 4),
+        "est_p95_ms_at_think_time": round(lat["p95_ms"] / (1 - utilization), 3) if utilization < 1 else None,
+        "by_script": {
+            name: _latency([x.wall_ms for x in samples if x.script == name])
+            for name in dict.fromkeys(x.script for x in samples)
+        },
+        "rss_mib": _rss_mib(),
+    }
+    del sessions
+    gc.collect()
+    return out
+
+
+def measure_memory(n: int, scripts: Sequence[str], seed: int, timeout: float) -> Dict[str, Any]:
+    """tracemalloc: N oturum açılıp senaryolar bitince hâlâ tutulan bellek (oturum başına)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        sessions = open_sessions(n, scripts, seed, timeout)
+        drive(sessions)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    retained = current - base
+    out = {
+        "retained_kib": round(retained / 1024, 1),
+        "per_session_kib": round(retained / 1024 / n, 1),
+        "peak_kib": round((peak - base) / 1024, 1),
+    }
+    del sessions
+    gc.collect()
+    return out
+
+
+def _linear_fit(xs: Sequence[float], ys: Sequence[float]) -> Optional[Tuple[float, float]]:
+    """En küçük kareler: y = a + b x -> (a, b); tek nokta için None."""
+    if len(xs) < 2:
+        return None
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    return my - b * mx, b
+
+
+def summarize_curve(curve: List[Dict[str, Any]], think_time: float, target_util: float) -> Dict[str, Any]:
+    last = curve[-1]
+    cpu_s = last["cpu_ms_per_interaction"] / 1e3
+    summary: Dict[str, Any] = {
+        "think_time_s": think_time,
+        "target_utilization": target_util,
+        "max_sessions_per_process": int(target_util * think_time / cpu_s) if cpu_s > 0 else None,
+        "cpu_ms_per_interaction": last["cpu_ms_per_interaction"],
+        "p95_ms": last["latency"].get("p95_ms"),
+    }
+    mem = [(c["sessions"], c["memory"]["retained_kib"]) for c in curve if "memory" in c]
+    fit = _linear_fit([m[0] for m in mem], [m[1] for m in mem])
+    if fit is not None:
+        summary["memory_fixed_kib"] = round(fit[0], 1)
+        summary["memory_kib_per_session"] = round(fit[1], 1)
+    return summary
+
+
+def run_curve(
+    sizes: Sequence[int],
+    scripts: Sequence[str],
+    *,
+    seed: int = 0,
+    timeout: float = 60.0,
+    think_time: float = 15.0,
+    target_util: float = 0.7,
+    memory: bool = True,
+    quiet: bool = False,
+) -> Dict[str, Any]:
+    # ısınma: motorlar, katalog, önbellekler ve Streamlit modülleri ölçüm dışında yüklenir
+    drive(open_sessions(len(scripts), scripts, seed - 1, timeout))
+    gc.collect()
+
+    curve: List[Dict[str, Any]] = []
+    for n in sizes:
+        point = measure_timing(n, scripts, seed, timeout, think_time)
+        if memory:
+            point["memory"] = measure_memory(n, scripts, seed, timeout)
+        curve.append(point)
+        if not quiet:
+            lat = point["latency"]
+            mem = f"  {point['memory']['per_session_kib']:>9.1f} KiB/oturum" if memory else ""
+            print(
+                f"N={n:<4} p50 {lat['p50_ms']:>8.1f} ms  p95 {lat['p95_ms']:>8.1f} ms  "
+                f"CPU {point['cpu_ms_per_interaction']:>7.1f} ms/etkileşim  kullanım {point['utilization']:>6.1%}"
+                f"{mem}  hata {point['errors']}",
+                file=sys.stderr,
+            )
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "environment": environment(),
+        "config": {"sessions": list(sizes), "scripts": list(scripts), "seed": seed, "think_time_s": think_time},
+        "curve": curve,
+        "summary": summarize_curve(curve, think_time, target_util),
+    }
+
+
+def _sizes(text: str) -> List[int]:
+    try:
+        sizes = sorted({int(x) for x in text.split(",") if x.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"oturum sayıları virgülle ayrılmış tamsayılar olmalı: {text!r}")
+    if not sizes or sizes[0] < 1:
+        raise argparse.ArgumentTypeError("oturum sayıları ≥1 olmalı")
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="CAPE eşzamanlı oturum yük testi (kapasite eğrisi).")
+    ap.add_argument("--sessions", type=_sizes, default=[1, 2, 4, 8, 16], help="N değerleri (örn. 1,4,16,32)")
+    ap.add_argument("--script", action="append", choices=sorted(SCRIPTS), help="Senaryo(lar); oturumlara sırayla dağıtılır")
+    ap.add_argument("-o", "--out", default="-", help="JSON çıktı dosyası (varsayılan: stdout)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--think-time", type=float, default=15.0, help="Klinisyen başına etkileşimler arası süre (s)")
+    ap.add_argument("--target-util", type=float, default=0.7, help="Kapasite özeti için hedef süreç kullanımı")
+    ap.add_argument("--timeout", type=float, default=60.0, help="AppTest rerun zaman aşımı (s)")
+    ap.add_argument("--no-memory", action="store_true", help="tracemalloc geçişini atla")
+    ap.add_argument("--audit", action="store_true", help="Denetim kaydını açık bırak (CAPE_AUDIT_DB'ye yazar)")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    if not args.audit:
+        os.environ["CAPE_AUDIT"] = "0"
+    report = run_curve(
+        args.sessions,
+        args.script or list(SCRIPTS),
+        seed=args.seed,
+        timeout=args.timeout,
+        think_time=args.think_time,
+        target_util=args.target_util,
+        memory=not args.no_memory,
+        quiet=args.quiet,
+    )
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(data)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+"""
+CAPE klinik çekirdeği — Streamlit/PIL'siz içe aktarılabilir.
+
+    from core import PatientContext, calc_rcri, generate_consultation_note
+
+Alt modüller ilk erişimde yüklenir (PEP 562): `import core` yaml/katalog/numpy yüklemez.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Any, Dict
+
+_LAZY: Dict[str, str] = {
+    "PatientContext": "core.patient",
+    "calc_rcri": "core.clinical",
+    "esc_rcri_pathway_summary": "core.clinical",
+    "get_doac_dose_warnings": "core.clinical",
+    "get_interaction_warnings": "core.clinical",
+    "get_af_rate_control_text": "core.clinical",
+    "get_device_management_note": "core.clinical",
+    "get_bradycardia_meds_note": "core.clinical",
+    "generate_consultation_note": "core.clinical",
+    "FrozenRecord": "core.records",
+    "DaptRuleEngine": "core.engine",
+    "OacRuleEngine": "core.oac_engine",
+    "RuleTool": "core.rule_tool",
+    "InteractionIndex": "core.interactions",
+    "get_dapt_engine": "core.registry",
+    "get_oac_engine": "core.registry",
+    "get_rule_tool": "core.registry",
+    "get_interaction_index": "core.registry",
+    "get_cohort_engine": "core.cohort",
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'core' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,255 @@
+# core/analytics.py
+"""
+Denetim kaydı (core/audit.py `consults`) üzerinde analiz sorguları.
+
+    python -m core.analytics                      # özet (JSON)
+    python -m core.analytics --since 2026-01-01 --verify
+    python -m core.analytics --rebuild            # özet tablolarını tam taramayla yeniden kur
+
+- Özet (rollup) tabloları AFTER INSERT tetikleyicileriyle satır geldikçe güncellenir
+  (gün x boyut x sayaç); panolar consults'u taramaz, yalnızca özetleri toplar
+- Tetikleyiciler yazıcıyla aynı transaction'da çalışır: özetler ham kayıtla her zaman tutarlıdır
+- Kurulum (install) yazılabilir her audit bağlantısında çağrılır; ilk kurulumda mevcut
+  kayıtlar tek seferde özetlenir (BEGIN IMMEDIATE: eşzamanlı yazıcılar çift saymaz)
+- Gün: yerel saat, 'YYYY-AA-GG'; tarih filtreleri özetlerde gün aralığıyla uygulanır
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ANALYTICS_VERSION = 2  # 2: boyut kolonları NOT NULL (eksik değer UNKNOWN); 1'den yükseltmede özetler yeniden kurulur
+UNKNOWN = "bilinmiyor"
+
+EGFR_BANDS: Tuple[str, ...] = (UNKNOWN, "<15", "15–29", "30–49", "50–89", "≥90")
+SURGERY_RISK_ORDER: Tuple[str, ...] = ("Düşük", "Orta", "Yüksek")  # core.clinical.SURGERY_TABLE5 sırası
+
+
+def _egfr_band_sql(col: str) -> str:
+    return (
+        f"CASE WHEN {col} IS NULL OR {col} <= 0 THEN 'bilinmiyor' "
+        f"WHEN {col} < 15 THEN '<15' WHEN {col} < 30 THEN '15–29' WHEN {col} < 50 THEN '30–49' "
+        f"WHEN {col} < 90 THEN '50–89' ELSE '≥90' END"
+    )
+
+
+def _day_sql(col: str) -> str:
+    return f"date({col}, 'unixepoch', 'localtime')"
+
+
+def _dim_sql(col: str) -> str:
+    # NULL birincil anahtarda her satırı ayrı sayar (ON CONFLICT tetiklenmez): eksik boyut sabit değere çevrilir
+    return f"COALESCE({col}, '{UNKNOWN}')"
+
+
+# (tablo, boyut kolonları, kaynak ifadeleri, koşul)
+_ROLLUPS: Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...], str], ...] = (
+    ("rollup_daily", ("day",), (_day_sql("{r}.ts"),), "1"),
+    ("rollup_dapt", ("day", "output_id"), (_day_sql("{r}.ts"), _dim_sql("{r}.dapt_output_id")), "{r}.dapt_output_id IS NOT NULL"),
+    (
+        "rollup_oac",
+        ("day", "agent", "egfr_band", "stop_hours"),
+        (_day_sql("{r}.ts"), _dim_sql("{r}.oac_agent"), _egfr_band_sql("{r}.egfr"), _dim_sql("{r}.oac_stop_hours")),
+        "{r}.oac_stop_hours IS NOT NULL",
+    ),
+    (
+        "rollup_rcri",
+        ("day", "surgery_risk", "rcri_score"),
+        (_day_sql("{r}.ts"), _dim_sql("{r}.surgery_risk"), _dim_sql("{r}.rcri_score")),
+        "{r}.rcri_score IS NOT NULL",
+    ),
+)
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS consults_ts ON consults (ts)",
+    "CREATE INDEX IF NOT EXISTS consults_dapt ON consults (dapt_output_id, ts)",
+    "CREATE INDEX IF NOT EXISTS consults_oac ON consults (oac_agent, egfr)",
+    "CREATE INDEX IF NOT EXISTS consults_rcri ON consults (surgery_risk, rcri_score)",
+)
+
+
+def _rollup_ddl() -> List[str]:
+    stmts = ["CREATE TABLE IF NOT EXISTS analytics_meta (version INTEGER NOT NULL)"]
+    for table, dims, exprs, cond in _ROLLUPS:
+        cols = ", ".join(f"{d} NOT NULL" for d in dims)
+        stmts.append(f"CREATE TABLE IF NOT EXISTS {table} ({cols}, n INTEGER NOT NULL, PRIMARY KEY ({', '.join(dims)}))")
+        values = ", ".join(e.format(r="NEW") for e in exprs)
+        stmts.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ins AFTER INSERT ON consults "
+            f"WHEN {cond.format(r='NEW')} BEGIN "
+            f"INSERT INTO {table} ({', '.join(dims)}, n) VALUES ({values}, 1) "
+            f"ON CONFLICT ({', '.join(dims)}) DO UPDATE SET n = n + 1; END"
+        )
+    return stmts + list(_INDEXES)
+
+
+def _backfill(conn: sqlite3.Connection) -> None:
+    for table, dims, exprs, cond in _ROLLUPS:
+        conn.execute(f"DELETE FROM {table}")
+        select = ", ".join(e.format(r="c") for e in exprs)
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(dims)}, n) "
+            f"SELECT {select}, COUNT(*) FROM consults c WHERE {cond.format(r='c')} GROUP BY {select}"
+        )
+
+
+def install(conn: sqlite3.Connection) -> None:
+    """Özet tabloları, tetikleyiciler ve indeksler (idempotent; consults şeması hazır olmalı)."""
+    row = None
+    try:
+        row = conn.execute("SELECT version FROM analytics_meta").fetchone()
+    except sqlite3.OperationalError:
+        pass
+    if row is not None and row[0] >= ANALYTICS_VERSION:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS analytics_meta (version INTEGER NOT NULL)")
+        row = conn.execute("SELECT version FROM analytics_meta").fetchone()
+        if row is None or row[0] < ANALYTICS_VERSION:  # başka bir süreç araya girmediyse
+            if row is not None:  # eski sürüm: tablo/tetikleyici tanımları değişti, yeniden kurulur
+                for table, _, _, _ in _ROLLUPS:
+                    conn.execute(f"DROP TRIGGER IF EXISTS {table}_ins")
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for stmt in _rollup_ddl():
+                conn.execute(stmt)
+            _backfill(conn)
+            conn.execute("DELETE FROM analytics_meta")
+            conn.execute("INSERT INTO analytics_meta (version) VALUES (?)", (ANALYTICS_VERSION,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def rebuild(conn: sqlite3.Connection) -> None:
+    """Özetleri consults'un tam taramasıyla yeniden hesaplar (bakım; panolar kullanmaz)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _backfill(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+# ----------------------------
+# Queries (yalnızca özet tabloları)
+# ----------------------------
+def _day_filter(since: Optional[str], until: Optional[str]) -> Tuple[str, List[str]]:
+    clauses, params = [], []
+    if since:
+        clauses.append("day >= ?")
+        params.append(since)
+    if until:
+        clauses.append("day <= ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def total_consults(conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None) -> int:
+    where, params = _day_filter(since, until)
+    return int(conn.execute(f"SELECT COALESCE(SUM(n), 0) FROM rollup_daily{where}", params).fetchone()[0])
+
+
+def daily_counts(
+    conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None
+) -> List[Tuple[str, int]]:
+    where, params = _day_filter(since, until)
+    return conn.execute(f"SELECT day, n FROM rollup_daily{where} ORDER BY day", params).fetchall()
+
+
+def dapt_output_counts(
+    conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None
+) -> List[Tuple[str, int]]:
+    """Tool-1 output_id -> konsültasyon sayısı (çoktan aza)."""
+    where, params = _day_filter(since, until)
+    return conn.execute(
+        f"SELECT output_id, SUM(n) AS n FROM rollup_dapt{where} GROUP BY output_id ORDER BY n DESC, output_id",
+        params,
+    ).fetchall()
+
+
+def oac_stop_hours(
+    conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None
+) -> List[Tuple[str, str, int, int]]:
+    """(ajan, eGFR bandı, kesme saati, sayı); bantlar EGFR_BANDS sırasıyla."""
+    where, params = _day_filter(since, until)
+    rows = conn.execute(
+        f"SELECT agent, egfr_band, stop_hours, SUM(n) FROM rollup_oac{where} "
+        f"GROUP BY agent, egfr_band, stop_hours",
+        params,
+    ).fetchall()
+    band = {b: i for i, b in enumerate(EGFR_BANDS)}
+    return sorted(rows, key=lambda r: (r[0] or "", band.get(r[1], len(band)), r[2]))
+
+
+def rcri_by_surgery_risk(
+    conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None
+) -> List[Tuple[str, int, int]]:
+    """(cerrahi risk, RCRI skoru, sayı); risk SURGERY_RISK_ORDER sırasıyla."""
+    where, params = _day_filter(since, until)
+    rows = conn.execute(
+        f"SELECT surgery_risk, rcri_score, SUM(n) FROM rollup_rcri{where} GROUP BY surgery_risk, rcri_score",
+        params,
+    ).fetchall()
+    order = {r: i for i, r in enumerate(SURGERY_RISK_ORDER)}
+    return sorted(rows, key=lambda r: (order.get(r[0], len(order)), r[1]))
+
+
+def summary(conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "total": total_consults(conn, since, until),
+        "dapt_output_counts": dapt_output_counts(conn, since, until),
+        "oac_stop_hours": oac_stop_hours(conn, since, until),
+        "rcri_by_surgery_risk": rcri_by_surgery_risk(conn, since, until),
+    }
+
+
+def verify(conn: sqlite3.Connection) -> List[str]:
+    """Özetleri tam taramayla karşılaştırır; tutarsız tablo adlarını döner."""
+    bad = []
+    for table, dims, exprs, cond in _ROLLUPS:
+        select = ", ".join(e.format(r="c") for e in exprs)
+        scanned = conn.execute(
+            f"SELECT {select}, COUNT(*) FROM consults c WHERE {cond.format(r='c')} GROUP BY {select}"
+        ).fetchall()
+        stored = conn.execute(f"SELECT {', '.join(dims)}, n FROM {table}").fetchall()
+        if sorted(scanned, key=repr) != sorted(stored, key=repr):
+            bad.append(table)
+    return bad
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from core.audit import connect, db_path
+
+    ap = argparse.ArgumentParser(prog="python -m core.analytics", description="Denetim kaydı analiz özeti.")
+    ap.add_argument("--db", default=None, help="SQLite dosyası (varsayılan: CAPE_AUDIT_DB / logs/audit.sqlite3)")
+    ap.add_argument("--since", default=None, help="başlangıç günü (YYYY-AA-GG)")
+    ap.add_argument("--until", default=None, help="bitiş günü (YYYY-AA-GG, dahil)")
+    ap.add_argument("--verify", action="store_true", help="özetleri tam taramayla doğrula")
+    ap.add_argument("--rebuild", action="store_true", help="özetleri yeniden hesapla")
+    args = ap.parse_args(argv)
+
+    path = args.db or db_path()
+    conn = connect(path, readonly=not args.rebuild)
+    try:
+        if args.rebuild:
+            rebuild(conn)
+        out: Dict[str, Any] = summary(conn, args.since, args.until)
+        if args.verify:
+            out["verify_mismatch"] = verify(conn)
+    finally:
+        conn.close()
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    return 1 if out.get("verify_mismatch") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
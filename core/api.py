@@ -0,0 +1,280 @@
+# core/api.py
+"""
+Yerel (localhost) HTTP JSON API — EHR entegrasyonu için Streamlit'siz erişim.
+
+    python -m core.api --port 8765 --workers 4
+
+Uç noktalar (POST, gövde JSON):
+- /v1/dapt            {"answers": {...}}                      -> DaptRuleEngine.evaluate
+- /v1/oac             {agent, urgency, bleed_risk, ...}        -> OacRuleEngine.evaluate
+- /v1/doac-warnings   {agent, age, egfr, current_meds, ...}    -> get_doac_dose_warnings
+- /v1/interactions    {current_meds}                           -> InteractionIndex.check (tüm ilaç çiftleri)
+- /v1/consult         core.batch kayıt formatı                 -> konsültasyon notu + sonuçlar
+                      (denetim kaydına source="api" ile yazılır; birleştirilen özdeş istekler tek kayıttır)
+GET /v1/health, GET /v1/metrics (uç nokta başına gecikme p50/p95/p99, birleştirilen istek sayısı)
+
+- asyncio ile tek süreçte I/O; CPU işi işçi havuzuna (process pool) aktarılır
+- Aynı anda gelen özdeş istekler tek hesaplamada birleştirilir (in-flight coalescing)
+- Yalnızca loopback adreslerine bağlanır
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.clinical import get_doac_dose_warnings
+from core.drug_classes import meds_class_mask
+from core.profiling import LatencyStats
+from core.records import FrozenRecord
+from core.registry import get_dapt_engine, get_interaction_index, get_oac_engine
+
+DAPT_RULES_PATH = "rules/dapt.yaml"
+MAX_BODY_BYTES = 1 << 20
+
+
+# ----------------------------
+# Handlers (işçi süreçte çalışır; modül seviyesinde olmalı -> pickle edilebilir)
+# ----------------------------
+def _str_list(body: Dict[str, Any], key: str) -> List[str]:
+    """Metin listesi alanı; tek metin karakterlerine bölünmez (sessiz yanlış negatif) -> ValueError (400)."""
+    value = body.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"'{key}' metin listesi olmalı (örn. [\"Amiodaron\"])")
+    return value
+
+
+def handle_dapt(body: Dict[str, Any]) -> Dict[str, Any]:
+    answers = FrozenRecord(body.get("answers") or {})
+    return get_dapt_engine(DAPT_RULES_PATH).evaluate(answers)
+
+
+def handle_oac(body: Dict[str, Any]) -> Dict[str, Any]:
+    res = get_oac_engine().evaluate(
+        agent=body.get("agent", "Bilinmiyor"),
+        urgency=body.get("urgency", "Elektif"),
+        bleed_risk=body.get("bleed_risk", "Düşük-Orta"),
+        very_high_bleed=bool(body.get("very_high_bleed", False)),
+        egfr=float(body.get("egfr") or 0),
+        has_mech_valve=bool(body.get("has_mech_valve", False)),
+        high_te_risk=bool(body.get("high_te_risk", False)),
+    )
+    return vars(res)
+
+
+def handle_doac_warnings(body: Dict[str, Any]) -> Dict[str, Any]:
+    warnings = get_doac_dose_warnings(
+        agent=body.get("agent", ""),
+        age=int(body.get("age") or 0),
+        egfr=float(body.get("egfr") or 0),
+        current_meds=_str_list(body, "current_meds"),
+        bleed_risk=body.get("bleed_risk", "Düşük-Orta"),
+        very_high_bleed=bool(body.get("very_high_bleed", False)),
+    )
+    return {"warnings": warnings}
+
+
+def handle_interactions(body: Dict[str, Any]) -> Dict[str, Any]:
+    hits = get_interaction_index().check(_str_list(body, "current_meds"))
+    return {"interactions": [h.as_dict() for h in hits]}
+
+
+def handle_consult(body: Dict[str, Any]) -> Dict[str, Any]:
+    from core.batch import run_consult
+
+    return run_consult(body, source="api")
+
+
+ROUTES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "/v1/dapt": handle_dapt,
+    "/v1/oac": handle_oac,
+    "/v1/doac-warnings": handle_doac_warnings,
+    "/v1/interactions": handle_interactions,
+    "/v1/consult": handle_consult,
+}
+
+
+def _warm_worker() -> None:
+    get_dapt_engine(DAPT_RULES_PATH)
+    get_oac_engine()
+    meds_class_mask(["Aspirin"])  # katalog + sınıf tablosunu ilk istekten önce yükle
+    get_interaction_index().check(["Aspirin"])
+
+
+# ----------------------------
+# Server
+# ----------------------------
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _content_length(value: str) -> Optional[int]:
+    """Content-Length başlığı: boşsa 0; yalnızca ASCII rakamlar (negatif / metin / '+' -> None)."""
+    value = value.strip()
+    if not value:
+        return 0
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+
+class ApiServer:
+    def __init__(self, executor: Executor, host: str = "127.0.0.1", port: int = 8765):
+        if not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"API yalnızca loopback adresine bağlanabilir (verilen: {host})")
+        self.executor = executor
+        self.host = host
+        self.port = port
+        self.stats = LatencyStats()
+        self.coalesced = 0
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._on_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _compute(self, route: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        key = (route, json.dumps(body, sort_keys=True, ensure_ascii=False))
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self.executor, ROUTES[route], body)
+        self._inflight[key] = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _dispatch(self, method: str, path: str, raw: bytes) -> Tuple[int, Dict[str, Any]]:
+        if path == "/v1/health":
+            return 200, {"status": "ok"}
+        if path == "/v1/metrics":
+            return 200, {"routes": self.stats.snapshot(), "coalesced": self.coalesced,
+                         "inflight": len(self._inflight)}
+        if path not in ROUTES:
+            return 404, {"error": f"bilinmeyen uç nokta: {path}"}
+        if method != "POST":
+            return 405, {"error": "POST bekleniyor"}
+        try:
+            body = json.loads(raw.decode("utf-8") or "{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return 400, {"error": f"geçersiz JSON: {e}"}
+        if not isinstance(body, dict):
+            return 400, {"error": "JSON nesnesi bekleniyor"}
+
+        t0 = time.perf_counter()
+        try:
+            result = await self._compute(path, body)
+        except (TypeError, ValueError, KeyError) as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        self.stats.add(path, (time.perf_counter() - t0) * 1000.0)
+        return 200, result
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "geçersiz istek satırı"}, keep_alive=False)
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = _content_length(headers.get("content-length", ""))
+                if length is None:
+                    await self._write(writer, 400, {"error": "geçersiz Content-Length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, 413, {"error": "gövde çok büyük"}, keep_alive=False)
+                    break
+                raw = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = await self._dispatch(method.upper(), target.split("?", 1)[0], raw)
+                await self._write(writer, status, payload, keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], *, keep_alive: bool) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+def make_executor(workers: int) -> Executor:
+    """workers=0 -> süreç içi tek thread (geliştirme/test); >0 -> process pool."""
+    if workers <= 0:
+        return ThreadPoolExecutor(max_workers=1, initializer=_warm_worker)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="CAPE kural motorları için yerel HTTP JSON API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=2, help="İşçi süreç sayısı (0 = süreç içi)")
+    args = ap.parse_args(argv)
+
+    executor = make_executor(args.workers)
+    server = ApiServer(executor, host=args.host, port=args.port)
+
+    async def _run() -> None:
+        await server.start()
+        print(f"CAPE API: http://{server.host}:{server.port} (işçi: {args.workers})")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
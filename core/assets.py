@@ -0,0 +1,202 @@
+# core/assets.py
+"""
+Logo varlık hattı: kaynak PNG -> hedef boyutta, sıkıştırılmış varyantlar (WebP + PNG).
+
+    python -m core.assets              # assets/build/ altına üretir (dağıtımda önceden çalıştırılabilir)
+
+- Dosya adları içerik hash'i taşır: logo.sidebar.3f9a1c2e.png
+- manifest.json kaynakla (mtime, boyut, sha256) eşleşmezse varyantlar yeniden üretilir
+- Streamlit 1.37 st.image yalnızca PNG/JPEG/GIF'i yeniden kodlamadan sunar -> uygulama PNG varyantını,
+  statik sunum/HTML gömme WebP varyantını kullanır
+- Çalışma anında varyantlar süreç başına bir kez belleğe alınır (rerun başına disk okuması yok)
+- PIL yalnızca üretim sırasında (tembel) import edilir
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+LOGO_SOURCE = os.path.join("assets", "logo.png")
+BUILD_DIR = os.path.join("assets", "build")
+MANIFEST_NAME = "manifest.json"
+
+# görüntüleme genişlikleri (px): kenar çubuğu logosu ve "centered" sayfa içerik genişliği
+LOGO_WIDTHS: Dict[str, int] = {"sidebar": 220, "banner": 704}
+FORMATS = ("webp", "png")
+WEBP_QUALITY = 85
+PNG_COLORS = 256   # PNG varyantı paletli (RGBA kaynaktan ~10x küçük; Streamlit PNG'yi yeniden kodlamadan sunar)
+
+_MIMETYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+@dataclass(frozen=True)
+class AssetVariant:
+    name: str
+    fmt: str
+    width: int
+    height: int
+    sha: str
+    data: bytes = field(repr=False)
+
+    @property
+    def mimetype(self) -> str:
+        return _MIMETYPES[self.fmt]
+
+    @property
+    def filename(self) -> str:
+        return f"logo.{self.name}.{self.sha[:8]}.{self.fmt}"
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def render_variants(src: str = LOGO_SOURCE, widths: Optional[Dict[str, int]] = None) -> List[AssetVariant]:
+    """Kaynak görüntüden tüm varyantları bellekte üretir (diske yazmaz)."""
+    from PIL import Image
+
+    widths = widths or LOGO_WIDTHS
+    out: List[AssetVariant] = []
+    with Image.open(src) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        for name, width in widths.items():
+            w = min(width, im.width)
+            h = max(1, round(im.height * w / im.width))
+            resized = im.resize((w, h), Image.LANCZOS) if w != im.width else im
+            for fmt in FORMATS:
+                buf = io.BytesIO()
+                if fmt == "webp":
+                    resized.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+                else:
+                    quantize = getattr(Image, "Quantize", Image).FASTOCTREE
+                    resized.quantize(colors=PNG_COLORS, method=quantize).save(buf, "PNG", optimize=True)
+                data = buf.getvalue()
+                out.append(AssetVariant(name, fmt, w, h, hashlib.sha256(data).hexdigest(), data))
+    return out
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_logo_variants(src: str = LOGO_SOURCE, out_dir: str = BUILD_DIR) -> List[AssetVariant]:
+    """
+    Varyantları üretip out_dir'e yazar; manifest en son ve atomik yayınlanır.
+    Önceki sürümlerden kalan logo.* varyant dosyaları silinir.
+    """
+    st = os.stat(src)
+    variants = render_variants(src)
+    os.makedirs(out_dir, exist_ok=True)
+    for v in variants:
+        _write_atomic(os.path.join(out_dir, v.filename), v.data)
+
+    manifest = {
+        "source": {"path": src, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _sha256_file(src)},
+        "variants": [
+            {"name": v.name, "format": v.fmt, "width": v.width, "height": v.height, "sha256": v.sha, "file": v.filename}
+            for v in variants
+        ],
+    }
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    keep = {v.filename for v in variants} | {MANIFEST_NAME}
+    for fn in os.listdir(out_dir):
+        if fn.startswith("logo.") and fn not in keep and ".tmp." not in fn:
+            try:
+                os.remove(os.path.join(out_dir, fn))
+            except OSError:
+                pass
+    return variants
+
+
+def _read_manifest(src: str, out_dir: str, stamp: Tuple[int, int]) -> Optional[List[AssetVariant]]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        source = manifest["source"]
+        if (source["mtime_ns"], source["size"]) != stamp and source["sha256"] != _sha256_file(src):
+            return None  # kaynak içerik değişmiş
+        if {(e["name"], e["format"]) for e in manifest["variants"]} != {(n, f) for n in LOGO_WIDTHS for f in FORMATS}:
+            return None  # genişlik/format listesi değişmiş
+        variants = []
+        for e in manifest["variants"]:
+            with open(os.path.join(out_dir, e["file"]), "rb") as f:
+                data = f.read()
+            if hashlib.sha256(data).hexdigest() != e["sha256"]:
+                return None
+            variants.append(AssetVariant(e["name"], e["format"], e["width"], e["height"], e["sha256"], data))
+        return variants
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+_lock = threading.Lock()
+_cache: Dict[str, Tuple[Tuple[int, int], Dict[Tuple[str, str], AssetVariant]]] = {}
+
+
+def load_logo_variants(src: str = LOGO_SOURCE, out_dir: str = BUILD_DIR) -> Dict[Tuple[str, str], AssetVariant]:
+    """
+    (ad, format) -> varyant. Süreç başına önbelleklenir; kaynak dosya değişince yenilenir.
+    1) Güncel manifest varsa diskteki varyantlar bir kez okunur
+    2) Yoksa üretilir ve yazılmaya çalışılır (salt-okunur dağıtımda yalnızca bellekte tutulur)
+    Kaynak yoksa boş sözlük döner.
+    """
+    try:
+        st = os.stat(src)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(src)
+
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+
+        variants = _read_manifest(src, out_dir, stamp)
+        if variants is None:
+            try:
+                variants = build_logo_variants(src, out_dir)
+            except OSError:
+                variants = render_variants(src)
+        table = {(v.name, v.fmt): v for v in variants}
+        _cache[key] = (stamp, table)
+        return table
+
+
+def get_logo(name: str, fmt: str = "png", src: str = LOGO_SOURCE) -> Optional[AssetVariant]:
+    return load_logo_variants(src).get((name, fmt))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Logo varyantlarını (WebP + PNG, içerik hash'li) üretir.")
+    ap.add_argument("src", nargs="?", default=LOGO_SOURCE)
+    ap.add_argument("-o", "--out-dir", default=BUILD_DIR)
+    args = ap.parse_args(argv)
+
+    src_size = os.path.getsize(args.src)
+    for v in build_logo_variants(args.src, args.out_dir):
+        print(f"{v.filename:<36} {v.width}x{v.height}  {len(v.data) / 1024:8.1f} KB  (kaynak {src_size / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,317 @@
+# core/audit.py
+"""
+Konsültasyon denetim kaydı (append-only SQLite, WAL).
+
+    CAPE_AUDIT=0                          # kapatır (varsayılan açık)
+    CAPE_AUDIT_DB=logs/audit.sqlite3
+    CAPE_AUDIT_QUEUE=10000                # bellek içi kuyruk sınırı
+
+- submit() yalnızca sınırlı kuyruğa ekler (put_nowait); UI thread'i diske hiç dokunmaz
+- Arka plan yazıcı kuyrukta birikenleri tek transaction'da yazar (yük arttıkça parti büyür)
+- Kuyruk doluysa kayıt düşürülür ve sayılır (stats()["dropped"]); not üretimi asla beklemez
+- consults tablosu tetikleyicilerle UPDATE/DELETE'e kapalıdır; analiz özetleri de INSERT
+  tetikleyicileriyle aynı transaction'da güncellenir (core/analytics.py)
+- Birden fazla süreç (Streamlit sunucuları, API işçileri) aynı dosyaya yazabilir (WAL + busy_timeout)
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+ENV_ENABLE = "CAPE_AUDIT"
+ENV_DB_PATH = "CAPE_AUDIT_DB"
+ENV_QUEUE_SIZE = "CAPE_AUDIT_QUEUE"
+
+DEFAULT_DB_PATH = os.path.join("logs", "audit.sqlite3")
+DEFAULT_QUEUE_SIZE = 10_000
+BATCH_SIZE = 500
+BUSY_TIMEOUT_S = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS consults (
+    id                INTEGER PRIMARY KEY,
+    ts                REAL NOT NULL,       -- unix zamanı (s)
+    source            TEXT NOT NULL,       -- app / api / batch
+    context_json      TEXT NOT NULL,       -- PatientContext.as_dict()
+    dapt_output_id    TEXT,
+    dapt_class        TEXT,
+    oac_agent         TEXT,
+    egfr              REAL,
+    oac_stop_hours    INTEGER,
+    oac_restart_min_hours INTEGER,
+    oac_restart_max_hours INTEGER,
+    oac_bridging      INTEGER,
+    rcri_score        INTEGER,
+    surgery_risk      TEXT,
+    warnings_json     TEXT NOT NULL,
+    rules_json        TEXT NOT NULL,       -- kural dosyası sha256'ları
+    latency_json      TEXT NOT NULL,       -- adım başına ms
+    total_ms          REAL
+);
+CREATE TRIGGER IF NOT EXISTS consults_no_update BEFORE UPDATE ON consults
+BEGIN SELECT RAISE(ABORT, 'consults append-only'); END;
+CREATE TRIGGER IF NOT EXISTS consults_no_delete BEFORE DELETE ON consults
+BEGIN SELECT RAISE(ABORT, 'consults append-only'); END;
+"""
+
+COLUMNS: Tuple[str, ...] = (
+    "ts", "source", "context_json", "dapt_output_id", "dapt_class",
+    "oac_agent", "egfr", "oac_stop_hours", "oac_restart_min_hours", "oac_restart_max_hours", "oac_bridging",
+    "rcri_score", "surgery_risk", "warnings_json", "rules_json", "latency_json", "total_ms",
+)
+_INSERT = f"INSERT INTO consults ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def enabled() -> bool:
+    return os.environ.get(ENV_ENABLE, "1").strip().lower() not in {"0", "false", "no", "hayır", "off"}
+
+
+def db_path() -> str:
+    return os.environ.get(ENV_DB_PATH) or DEFAULT_DB_PATH
+
+
+def _queue_size_from_env() -> int:
+    try:
+        return max(1, int(os.environ.get(ENV_QUEUE_SIZE, DEFAULT_QUEUE_SIZE)))
+    except ValueError:
+        return DEFAULT_QUEUE_SIZE
+
+
+def connect(path: str, *, readonly: bool = False) -> sqlite3.Connection:
+    """WAL modunda bağlantı; yazılabilir bağlantıda şema oluşturulur."""
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_S)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL'da commit başına fsync yok; checkpoint'te var
+    conn.executescript(SCHEMA)
+
+    from core.analytics import install  # özet tabloları + tetikleyiciler (core/analytics.py)
+
+    install(conn)
+    return conn
+
+
+# ----------------------------
+# Record
+# ----------------------------
+def _json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+@dataclass
+class ConsultRecord:
+    """Tek konsültasyonun denetim satırı; JSON serileştirme (row) yazıcı thread'inde yapılır."""
+    context: Dict[str, Any]
+    source: str = "app"
+    dapt_output_id: Optional[str] = None
+    dapt_class: Optional[str] = None
+    oac_agent: Optional[str] = None
+    egfr: Optional[float] = None
+    oac_timing: Optional[Mapping[str, int]] = None
+    rcri_score: Optional[int] = None
+    surgery_risk: Optional[str] = None
+    warnings: List[str] = field(default_factory=list)
+    rules: Dict[str, Optional[str]] = field(default_factory=dict)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    ts: float = field(default_factory=time.time)
+
+    def row(self) -> Tuple[Any, ...]:
+        timing = self.oac_timing or {}
+        return (
+            self.ts,
+            self.source,
+            _json(self.context),
+            self.dapt_output_id,
+            self.dapt_class,
+            self.oac_agent,
+            self.egfr,
+            timing.get("stop_hours"),
+            timing.get("restart_min_hours"),
+            timing.get("restart_max_hours"),
+            timing.get("bridging"),
+            self.rcri_score,
+            self.surgery_risk,
+            _json(list(self.warnings)),
+            _json(self.rules),
+            _json(self.latency_ms),
+            round(sum(self.latency_ms.values()), 3),
+        )
+
+
+class Timings:
+    """Adım süreleri (ms): `with timings("dapt"): ...`; profil kapalıyken de ölçer."""
+
+    def __init__(self) -> None:
+        self.ms: Dict[str, float] = {}
+
+    @contextmanager
+    def __call__(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.ms[name] = round(self.ms.get(name, 0.0) + (time.perf_counter_ns() - t0) / 1e6, 3)
+
+
+def rules_hashes() -> Dict[str, Optional[str]]:
+    """Süreçte yüklü kural dosyalarının sha256'ları (core.registry; dosya okumaz)."""
+    from core.oac_engine import OAC_RULES_PATH
+    from core.registry import DAPT_RULES_PATH, DOAC_WARNINGS_RULES_PATH, INTERACTIONS_RULES_PATH, registry
+
+    return {
+        "dapt": registry.rules_hash(DAPT_RULES_PATH, kind="dapt"),
+        "oac": registry.rules_hash(OAC_RULES_PATH, kind="oac"),
+        "doac_warnings": registry.rules_hash(DOAC_WARNINGS_RULES_PATH, kind="tool"),
+        "interactions": registry.rules_hash(INTERACTIONS_RULES_PATH, kind="interactions"),
+    }
+
+
+# ----------------------------
+# Writer
+# ----------------------------
+_STOP = object()
+
+
+class AuditLog:
+    def __init__(self, path: str, *, queue_size: int = DEFAULT_QUEUE_SIZE, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = ""
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._run, name="cape-audit-writer", daemon=True)
+                t.start()
+                self._thread = t
+
+    def submit(self, record: ConsultRecord) -> bool:
+        """Bloklamaz; kuyruk doluysa False (kayıt düşürülür)."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+            ok = True
+        except queue.Full:
+            ok = False
+        with self._lock:
+            if ok:
+                self.submitted += 1
+            else:
+                self.dropped += 1
+        return ok
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Şu ana kadar kuyruğa girenler yazılana kadar bekler (CLI/test; UI'dan çağrılmaz)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "pending": self._queue.qsize(),
+            "last_error": self.last_error,
+        }
+
+    def _write(self, conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> None:
+        try:
+            with conn:  # tek transaction
+                conn.executemany(_INSERT, rows)
+        except sqlite3.Error as e:
+            self.failed += len(rows)
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def _run(self) -> None:
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            conn = None
+
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [x.row() for x in items if isinstance(x, ConsultRecord)]
+            if rows:
+                if conn is None:
+                    self.failed += len(rows)
+                else:
+                    self._write(conn, rows)
+            for x in items:
+                if isinstance(x, threading.Event):
+                    x.set()
+            if any(x is _STOP for x in items):
+                break
+
+        if conn is not None:
+            conn.close()
+
+
+_log: Optional[AuditLog] = None
+_log_lock = threading.Lock()
+
+
+def get_audit_log() -> Optional[AuditLog]:
+    """Süreç genelinde tek yazıcı (CAPE_AUDIT=0 ise None)."""
+    global _log
+    if not enabled():
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = AuditLog(db_path(), queue_size=_queue_size_from_env())
+                atexit.register(_log.close)
+    return _log
+
+
+def record_consult(record: ConsultRecord) -> bool:
+    log = get_audit_log()
+    return log.submit(record) if log is not None else False
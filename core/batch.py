@@ -0,0 +1,425 @@
+# core/batch.py
+"""
+Headless toplu konsültasyon: CSV/JSONL hasta kayıtları -> JSONL (not + yapılandırılmış sonuç) veya zip.
+
+    python -m core.batch ameliyat_listesi.csv -o notlar.jsonl -j 8
+    python -m core.batch kayitlar.jsonl --zip notlar.zip
+
+- Kayıtlar akış halinde okunur; işlemci havuzuna parça (chunk) halinde dağıtılır
+- Uçuştaki parça sayısı sınırlıdır -> bellek dosya boyutundan bağımsız kalır
+- Çıktı sırası giriş sırasıyla aynıdır
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from core.audit import ConsultRecord, Timings, get_audit_log, record_consult, rules_hashes
+from core.clinical import (
+    RCRI_ITEMS_TR,
+    SURGERY_TO_RISK,
+    TOOL1_INACTIVE_RESULT,
+    TOOL2_INACTIVE_BLOCK,
+    antithrombotic_strategy_for,
+    build_oac_block,
+    build_rcri_block,
+    build_workup_block,
+    calc_rcri,
+    esc_rcri_pathway_summary,
+    generate_consultation_note,
+    get_device_management_note,
+    get_doac_dose_warnings,
+    map_oac_bleed_risk,
+)
+from core.drug_classes import meds_class_mask
+from core.patient import PatientContext
+from core.records import FrozenRecord
+from core.registry import get_dapt_engine, get_interaction_index, get_oac_engine
+
+DAPT_RULES_PATH = "rules/dapt.yaml"
+
+# app.py widget varsayılanları (kayıtta alan yoksa)
+RECORD_DEFAULTS: Dict[str, Any] = {
+    "patient_age": 55,
+    "patient_sex": "Erkek",
+    "urgency": "Elektif",
+    "hr": 80,
+    "sbp": 130,
+    "dbp": 80,
+    "symptoms": ["Yok"],
+    "functional_capacity": "≥4 MET",
+    "has_hf": "Hayır",
+    "nyha": "Bilinmiyor",
+    "lvef": "Bilinmiyor",
+    "has_af": "Hayır",
+    "has_ckd": "Hayır",
+    "egfr": 0.0,
+    "has_dm": "Hayır",
+    "has_ht": "Hayır",
+    "has_cad": "Hayır",
+    "pci_time": "—",
+    "mono_ap_agent": "Aspirin",
+    "mono_oac_agent": "Bilinmiyor",
+    "has_mech_valve": "Hayır",
+    "has_device": "Hayır",
+    "device_type": "—",
+    "pace_dependent": "—",
+    "aspirin_dose": "Bilinmiyor",
+    "p2y12_agent_ui": "Bilinmiyor",
+    "current_meds": [],
+    "creatinine": 0.0,
+    "oac_agent": "Bilinmiyor",
+    "bleed_risk_oac": "Düşük-Orta",
+    "very_high_bleed": False,
+    "high_te_risk": False,
+}
+
+_LIST_FIELDS = {"symptoms", "current_meds"}
+_INT_FIELDS = {"patient_age", "hr", "sbp", "dbp"}
+_FLOAT_FIELDS = {"egfr", "creatinine"}
+_BOOL_FIELDS = {"very_high_bleed", "high_te_risk", *(f"rcri_{k}" for k in RCRI_ITEMS_TR)}
+_TRUE = {"1", "true", "evet", "yes", "e", "x"}
+
+
+def normalize_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CSV (hepsi metin) veya JSONL kaydını app.py değer tiplerine çevirir.
+    Liste alanları CSV'de ';' ile ayrılır (örn. "Angina;Dispne").
+    """
+    rec = dict(RECORD_DEFAULTS)
+    for k, v in raw.items():
+        if v is None or (isinstance(v, str) and v.strip() == ""):
+            continue
+        if k in _LIST_FIELDS and isinstance(v, str):
+            v = [x.strip() for x in v.split(";") if x.strip()]
+        elif k in _INT_FIELDS:
+            v = int(float(v))
+        elif k in _FLOAT_FIELDS:
+            v = float(v)
+        elif k in _BOOL_FIELDS and isinstance(v, str):
+            v = v.strip().lower() in _TRUE
+        rec[k] = v
+    return rec
+
+
+def run_consult(raw: Dict[str, Any], source: Optional[str] = "batch") -> Dict[str, Any]:
+    """
+    Tek hasta: app.py "Öneri + Konsültasyon Notu Oluştur" akışının UI'sız karşılığı.
+    Not, app.py'deki gibi denetim kaydına yazılır (`source`: batch / api; None ise yazılmaz).
+    """
+    rec = normalize_record(raw)
+    timings = Timings()
+    dapt_engine = get_dapt_engine(DAPT_RULES_PATH)
+    oac_engine = get_oac_engine()
+
+    selected_surgery = rec.get("selected_surgery", "")
+    surgery_risk = rec.get("surgery_risk") or SURGERY_TO_RISK.get(selected_surgery, "Orta")
+    has_cad, has_af, pci_time = rec["has_cad"], rec["has_af"], rec["pci_time"]
+    if has_cad == "Evet" and pci_time not in {"<1 yıl", "≥1 yıl"}:
+        pci_time = "<1 yıl"
+    strategy = antithrombotic_strategy_for(has_cad, pci_time, has_af)
+    show_tool1 = (has_cad == "Evet") and (pci_time == "<1 yıl")
+    show_tool2 = (has_af == "Evet") or (rec["has_mech_valve"] == "Evet")
+
+    # Tool-1
+    if show_tool1:
+        answers = {q.id: rec[q.id] for q in dapt_engine.questions if q.id in rec}
+        if rec["p2y12_agent_ui"] != "Bilinmiyor":
+            answers["p2y12_agent"] = rec["p2y12_agent_ui"]
+        if rec["aspirin_dose"] != "Bilinmiyor":
+            answers["aspirin_dose"] = rec["aspirin_dose"]
+        with timings("dapt"):
+            dapt_result = dapt_engine.evaluate(FrozenRecord(answers))
+        aspirin_val, p2y12_val = rec["aspirin_dose"], rec["p2y12_agent_ui"]
+    else:
+        dapt_result = dict(TOOL1_INACTIVE_RESULT)
+        aspirin_val, p2y12_val = "—", "—"
+
+    device_note = get_device_management_note(rec["has_device"], rec["device_type"], rec["pace_dependent"])
+
+    # Tool-2
+    oac_out: Optional[Dict[str, Any]] = None
+    agent: Optional[str] = None
+    oac_timing: Optional[Dict[str, int]] = None
+    dose_warnings: List[str] = []
+    if show_tool2:
+        has_mech_valve = rec["has_mech_valve"] == "Evet"
+        mapped_bleed = map_oac_bleed_risk(rec["bleed_risk_oac"])
+        agent = "Warfarin" if has_mech_valve else rec["oac_agent"]
+        oac_inputs = dict(
+            agent=agent,
+            urgency=rec["urgency"],
+            bleed_risk=mapped_bleed,
+            very_high_bleed=bool(rec["very_high_bleed"]),
+            egfr=rec["egfr"],
+            has_mech_valve=has_mech_valve,
+            high_te_risk=bool(rec["high_te_risk"]) and has_mech_valve,
+        )
+        with timings("oac"):
+            oac_res = oac_engine.evaluate(**oac_inputs)
+            oac_timing = oac_engine.timing(**oac_inputs)
+        with timings("doac_warnings"):
+            dose_warnings = get_doac_dose_warnings(
+                agent=agent,
+                age=int(rec["patient_age"] or 0),
+                egfr=float(rec["egfr"] or 0),
+                current_meds=rec["current_meds"],
+                bleed_risk=mapped_bleed,
+                very_high_bleed=bool(rec["very_high_bleed"]),
+            )
+        oac_block = build_oac_block(oac_res, dose_warnings, has_mech_valve)
+        oac_out = {"agent": agent, **vars(oac_res)}
+    else:
+        oac_block = TOOL2_INACTIVE_BLOCK
+
+    # RCRI + ESC
+    rcri_defaults = {
+        "high_risk_surgery": surgery_risk == "Yüksek",
+        "ihd": has_cad == "Evet",
+        "chf": rec["has_hf"] == "Evet",
+        "cva": False,
+        "dm_insulin": False,
+        "cr_gt2": float(rec["creatinine"] or 0) > 2.0,
+    }
+    rcri_flags = {k: bool(rec.get(f"rcri_{k}", d)) for k, d in rcri_defaults.items()}
+    rcri_score, rcri_positives = calc_rcri(rcri_flags)
+    pathway_text, workup = esc_rcri_pathway_summary(
+        surgery_risk=surgery_risk,
+        rcri_score=rcri_score,
+        functional_capacity=rec["functional_capacity"],
+        symptoms=rec["symptoms"],
+        urgency=rec["urgency"],
+        has_hf=rec["has_hf"],
+        lvef=rec["lvef"],
+    )
+
+    ctx = PatientContext.from_mapping(rec)
+    ctx.selected_surgery = selected_surgery
+    ctx.surgery_risk = surgery_risk
+    ctx.pci_time = pci_time if has_cad == "Evet" else "—"
+    ctx.antithrombotic_strategy = strategy
+    ctx.has_mech_valve = rec["has_mech_valve"]
+    ctx.aspirin_dose = aspirin_val
+    ctx.p2y12_agent_ui = p2y12_val
+
+    with timings("interactions"):
+        interaction_hits = get_interaction_index().check(list(ctx.current_meds))  # not + JSON çıktısı için tek kontrol
+        interaction_lines = [h.text_tr() for h in interaction_hits]
+    with timings("note"):
+        note = generate_consultation_note(
+            ctx,
+            dapt_result,
+            oac_block,
+            device_note,
+            rcri_block=build_rcri_block(rcri_score, rcri_positives),
+            esc_pathway_block=pathway_text,
+            esc_workup_block=build_workup_block(workup),
+            interaction_lines=interaction_lines,
+        )
+    if source is not None:
+        record_consult(
+            ConsultRecord(
+                context=ctx.as_dict(),
+                source=source,
+                dapt_output_id=dapt_result.get("output_id"),
+                dapt_class=dapt_result.get("class") or None,
+                oac_agent=agent,
+                egfr=float(rec["egfr"] or 0),
+                oac_timing=oac_timing,
+                rcri_score=rcri_score,
+                surgery_risk=surgery_risk,
+                warnings=dose_warnings + interaction_lines,
+                rules=rules_hashes(),
+                latency_ms=timings.ms,
+            )
+        )
+    return {
+        "dapt": dapt_result,
+        "oac": oac_out,
+        "dose_warnings": dose_warnings,
+        "interactions": [h.as_dict() for h in interaction_hits],
+        "rcri": {"score": rcri_score, "positives": rcri_positives},
+        "esc": {"pathway": pathway_text, "workup": workup},
+        "note": note,
+    }
+
+
+# iter_records'ın okunamayan JSONL satırı için ürettiği kayıttaki anahtar
+_PARSE_ERROR = "__parse_error__"
+
+
+def _run_chunk(chunk: List[tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    out = []
+    for idx, raw in chunk:
+        if _PARSE_ERROR in raw:
+            out.append({"index": idx, "record_id": str(idx), "error": raw[_PARSE_ERROR]})
+            continue
+        rid = raw.get("record_id") or raw.get("id") or str(idx)
+        try:
+            out.append({"index": idx, "record_id": rid, **run_consult(raw)})
+        except Exception as e:
+            out.append({"index": idx, "record_id": rid, "error": f"{type(e).__name__}: {e}"})
+    log = get_audit_log()
+    if log is not None:
+        log.flush()  # havuz işçisi os._exit ile biter (atexit çalışmaz): parçanın denetim kayıtları burada yazılır
+    return out
+
+
+def _warm_worker() -> None:
+    # her işçi süreçte motorları bir kez derle
+    get_dapt_engine(DAPT_RULES_PATH)
+    get_oac_engine()
+    meds_class_mask(["Aspirin"])  # katalog + sınıf tablosunu ilk istekten önce yükle
+    get_interaction_index().check(["Aspirin"])
+
+
+# ----------------------------
+# Streaming I/O
+# ----------------------------
+def iter_records(fh: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+        return
+    for lineno, line in enumerate(fh, 1):
+        line = line.strip()
+        if not line:
+            continue
+        # bozuk satır çalıştırmayı durdurmaz: işaretli kayıt olarak sırasında hata satırına dönüşür
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {_PARSE_ERROR: f"JSONDecodeError: {lineno}. satır: {e}"}
+            continue
+        if not isinstance(rec, dict):
+            yield {_PARSE_ERROR: f"TypeError: {lineno}. satır JSON nesnesi değil ({type(rec).__name__})"}
+            continue
+        yield rec
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[tuple[int, Dict[str, Any]]]]:
+    it = enumerate(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_stream(
+    records: Iterable[Dict[str, Any]],
+    *,
+    jobs: int = 0,
+    chunk_size: int = 32,
+    max_in_flight: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sonuçları giriş sırasıyla üretir. jobs<=1 ise havuz kurulmaz (tek süreç).
+    Uçuşta en fazla max_in_flight parça tutulur (varsayılan 4 × işçi).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1:
+        for chunk in _chunks(records, chunk_size):
+            yield from _run_chunk(chunk)
+        return
+
+    max_in_flight = max_in_flight or 4 * jobs
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_warm_worker) as pool:
+        for chunk in _chunks(records, chunk_size):
+            pending.append(pool.submit(_run_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class _Progress:
+    def __init__(self, stream: TextIO, every_s: float = 1.0):
+        self.stream = stream
+        self.every_s = every_s
+        self.t0 = time.perf_counter()
+        self.last = self.t0
+        self.n = 0
+        self.errors = 0
+
+    def tick(self, row: Dict[str, Any]) -> None:
+        self.n += 1
+        if "error" in row:
+            self.errors += 1
+        now = time.perf_counter()
+        if now - self.last >= self.every_s:
+            self.last = now
+            self._print(now)
+
+    def _print(self, now: float, final: bool = False) -> None:
+        dt = max(now - self.t0, 1e-9)
+        prefix = "Tamamlandı" if final else "İşleniyor"
+        self.stream.write(f"\r{prefix}: {self.n} kayıt, {self.errors} hata, {self.n / dt:.1f} kayıt/sn, {dt:.1f} sn")
+        if final:
+            self.stream.write("\n")
+        self.stream.flush()
+
+    def done(self) -> None:
+        self._print(time.perf_counter(), final=True)
+
+
+def _detect_format(path: str, fmt: str) -> str:
+    if fmt != "auto":
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="CSV/JSONL hasta listesinden toplu konsültasyon notu üretir.")
+    ap.add_argument("input", help="CSV veya JSONL dosyası ('-' = stdin)")
+    ap.add_argument("-o", "--output", default="-", help="JSONL çıktı ('-' = stdout)")
+    ap.add_argument("--zip", dest="zip_path", default=None, help="Notları .txt dosyaları olarak zip'e yaz")
+    ap.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="İşçi süreç sayısı (varsayılan: CPU sayısı)")
+    ap.add_argument("--chunk-size", type=int, default=32)
+    ap.add_argument("--quiet", action="store_true", help="İlerleme bilgisini gösterme")
+    args = ap.parse_args(argv)
+
+    fmt = _detect_format(args.input, args.format)
+    fin = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8-sig", newline="")
+    fout: Optional[TextIO] = None
+    zf: Optional[zipfile.ZipFile] = None
+    if args.zip_path:
+        zf = zipfile.ZipFile(args.zip_path, "w", compression=zipfile.ZIP_DEFLATED)
+    else:
+        fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    progress = _Progress(io.StringIO() if args.quiet else sys.stderr)
+    try:
+        rows = process_stream(iter_records(fin, fmt), jobs=args.jobs, chunk_size=args.chunk_size)
+        for row in rows:
+            progress.tick(row)
+            if zf is not None:
+                safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(row["record_id"]))
+                name = f"{row['index']:06d}_{safe_id}"
+                zf.writestr(f"{name}.txt", row.get("note") or f"HATA: {row.get('error')}")
+            else:
+                fout.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        progress.done()
+        if fin is not sys.stdin:
+            fin.close()
+        if zf is not None:
+            zf.close()
+        if fout is not None and fout is not sys.stdout:
+            fout.close()
+    return 1 if progress.errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
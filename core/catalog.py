@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+import bisect
+import csv
+import hashlib
+import heapq
+import os
+import re
+import threading
+import weakref
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+DEFAULT_CSV_PATH = os.path.join("data", "sgk_ilaclar.csv")
+
+
+@dataclass(frozen=True)
+class DrugProduct:
+    """
+    SGK listesindeki tek satır:
+    "MARKA GÜÇ FORM (güç, etken madde)" -> alanlarına ayrılmış hali.
+    `name` CSV'deki orijinal metindir (multiselect değeri olarak kullanılır).
+    """
+    name: str
+    brand: str
+    strength: str
+    form: str
+    ingredient: str
+
+
+# ----------------------------
+# Turkish case folding
+# ----------------------------
+_FOLD_TABLE = str.maketrans(
+    {
+        "İ": "i", "I": "i", "ı": "i",
+        "Ş": "s", "ş": "s",
+        "Ğ": "g", "ğ": "g",
+        "Ü": "u", "ü": "u",
+        "Ö": "o", "ö": "o",
+        "Ç": "c", "ç": "c",
+        "Â": "a", "â": "a",
+        "Î": "i", "î": "i",
+        "Û": "u", "û": "u",
+    }
+)
+_NON_ALNUM = re.compile(r"[^0-9a-z%]+")
+
+
+def fold_tr(text: str) -> str:
+    """
+    Türkçe duyarlı arama anahtarı: İ/ı/ş/ğ/ü/ö/ç sadeleştirilir, küçük harfe çevrilir,
+    'x' -> 'ks' (apixaban ~ apiksaban), harf/rakam dışı karakterler tek boşluğa iner.
+    """
+    t = (text or "").translate(_FOLD_TABLE).lower()
+    t = t.replace("x", "ks").replace("w", "v").replace("q", "k")
+    return _NON_ALNUM.sub(" ", t).strip()
+
+
+# ----------------------------
+# Row parsing
+# ----------------------------
+_WS = re.compile(r"\s+")
+_UNIT = r"(?:MG|MCG|G|GR|ML|IU|Ü|UI|MIU|MMOL|MEQ)"
+_STRENGTH_TOKEN = re.compile(rf"^(?=.)[%\d.,+\-]*{_UNIT}?(?:/[%\d.,+\-]*{_UNIT}?)*$", re.IGNORECASE)
+_PACK_PAREN = re.compile(r"\(\s*\d+[^()]*\)")
+
+
+def _split_trailing_paren(text: str) -> Tuple[str, str]:
+    """Sondaki "( ... )" grubunu (iç içe parantezleri sayarak) ayırır."""
+    if not text.endswith(")"):
+        return text, ""
+    depth = 0
+    for i in range(len(text) - 1, -1, -1):
+        ch = text[i]
+        if ch == ")":
+            depth += 1
+        elif ch == "(":
+            depth -= 1
+            if depth == 0:
+                return text[:i].rstrip(), text[i + 1:-1].strip()
+    return text, ""
+
+
+def parse_drug_row(name: str) -> DrugProduct:
+    text = _WS.sub(" ", (name or "").strip())
+    head, inner = _split_trailing_paren(text)
+
+    strength = ""
+    ingredient = ""
+    if inner:
+        # "0,14 MG" ondalık virgülü bölünmesin diye ", " ile ayrılır
+        first, sep, rest = inner.partition(", ")
+        if sep and any(ch.isdigit() for ch in first):
+            strength = first.strip()
+            ingredient = rest.strip()
+        else:
+            ingredient = inner
+
+    tokens = head.split(" ")
+    i = 0
+    while i < len(tokens) and not (tokens[i][:1].isdigit() or tokens[i][:1] == "%"):
+        i += 1
+    if i == 0:
+        # "%5 DEKSTROZ ..." gibi rakamla başlayan ürün adları
+        i = 1
+    brand = " ".join(tokens[:i])
+
+    rest_tokens = tokens[i:]
+    j = 0
+    while j < len(rest_tokens) and _STRENGTH_TOKEN.match(rest_tokens[j]):
+        j += 1
+    if not strength and j:
+        strength = " ".join(rest_tokens[:j])
+    # ambalaj sayısı "28 FILM TABLET" / "(30 TABLET)"
+    form_tokens = rest_tokens[j:]
+    while form_tokens and form_tokens[0].isdigit():
+        form_tokens = form_tokens[1:]
+    form = _PACK_PAREN.sub("", " ".join(form_tokens)).strip(" ,")
+
+    return DrugProduct(name=name, brand=brand, strength=strength, form=form, ingredient=ingredient)
+
+
+# ----------------------------
+# Row hashes / diff
+# ----------------------------
+def row_hash(name: str) -> int:
+    """Satır içerik hash'i (64 bit); katalog sürümleri arasındaki fark bununla bulunur."""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def catalog_version(hashes: Iterable[int]) -> str:
+    """Sıradan bağımsız içerik sürümü (satır hash'lerinin sıralı özeti)."""
+    return hashlib.blake2b(array("Q", sorted(hashes)).tobytes(), digest_size=8).hexdigest()
+
+
+@dataclass
+class CatalogDiff:
+    """
+    İki liste arasındaki fark.
+    - renamed: kaldırılan ve eklenen satırın katlanmış (fold_tr) metni aynı -> yazım/büyük harf düzeltmesi;
+      ürün aynı id'yi korur
+    """
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed)
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.renamed)}"
+
+
+def diff_rows(old: Mapping[int, str], names: Sequence[str], hashes: Optional[Sequence[int]] = None) -> CatalogDiff:
+    """
+    old: hash -> ad (mevcut katalog); names/hashes: yeni liste (hizalı).
+    Yalnızca eklenen satırlar okunur (mmap snapshot'ta diğerleri decode edilmez).
+    """
+    if hashes is None:
+        hashes = [row_hash(n) for n in names]
+    new = set(hashes)
+    removed = [name for h, name in old.items() if h not in new]
+    added = [names[i] for i, h in enumerate(hashes) if h not in old]
+
+    diff = CatalogDiff()
+    if removed and added:
+        by_fold: Dict[str, List[str]] = {}
+        for name in removed:
+            by_fold.setdefault(fold_tr(name), []).append(name)
+        still_added = []
+        for name in added:
+            olds = by_fold.get(fold_tr(name))
+            if olds:
+                diff.renamed.append((olds.pop(), name))
+            else:
+                still_added.append(name)
+        renamed_old = {o for o, _ in diff.renamed}
+        removed = [n for n in removed if n not in renamed_old]
+        added = still_added
+    diff.added = sorted(added)
+    diff.removed = sorted(removed)
+    diff.renamed.sort()
+    return diff
+
+
+# ----------------------------
+# Search index
+# ----------------------------
+def _trigrams(text: str) -> set[str]:
+    grams: set[str] = set()
+    for word in text.split():
+        w = f" {word} "
+        for i in range(len(w) - 2):
+            grams.add(w[i:i + 3])
+    return grams
+
+
+def _index_keys(p: DrugProduct) -> Tuple[str, str]:
+    """(marka anahtarı, indekslenen metin)."""
+    brand_key = fold_tr(p.brand)
+    return brand_key, f"{brand_key} {fold_tr(p.ingredient)}".strip()
+
+
+# tombstone oranı bunu aşarsa apply() tam yeniden kurar (id'ler sıkıştırılır)
+COMPACT_RATIO = 0.25
+
+
+class DrugCatalog:
+    """
+    Yapılandırılmış ilaç kataloğu + bellek içi arama indeksi.
+    - prefix: marka/etken madde kelimelerinin sıralı listesi (bisect)
+    - trigram: karakter 3'lülerinden ürün id listelerine ters indeks
+    Aranan metin: marka + etken madde (form/güç gibi çok tekrar eden kelimeler indekslenmez).
+    - Değiştirilmez: apply(diff) yalnızca değişen yapıları kopyalayan yeni bir katalog döner
+      (copy-on-write; eski kataloğu okuyan istekler etkilenmez). Kaldırılan ürünün id'si None olur.
+    """
+
+    def __init__(self, names: Iterable[str], hashes: Optional[Sequence[int]] = None):
+        self.products: List[Optional[DrugProduct]] = [parse_drug_row(n) for n in names]
+        self.by_name: Dict[str, int] = {p.name: i for i, p in enumerate(self.products)}
+        if hashes is None:
+            hashes = [row_hash(p.name) for p in self.products]
+        self.by_hash: Dict[int, int] = {h: i for i, h in enumerate(hashes)}
+        self.version = catalog_version(self.by_hash)
+        # (üst katalog, değişen id'ler): türetilmiş tablolar (CatalogTable) artımlı güncellenir
+        self.lineage: Optional[Tuple["weakref.ref[DrugCatalog]", frozenset]] = None
+        # snapshot'tan hazır okunan tablolar (CatalogTable.key -> ürün id'siyle hizalı değerler); bellek içi kurulumda boş
+        self.tables: Mapping[str, Sequence[int]] = {}
+
+        self._brand_keys: List[str] = []
+        words: List[Tuple[str, int]] = []
+        postings: Dict[str, List[int]] = {}
+        for pid, p in enumerate(self.products):
+            brand_key, text = _index_keys(p)
+            self._brand_keys.append(brand_key)
+            for w in set(text.split()):
+                words.append((w, pid))
+            for g in _trigrams(text):
+                postings.setdefault(g, []).append(pid)
+
+        words.sort()
+        self._words = [w for w, _ in words]
+        self._word_ids = [pid for _, pid in words]
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def get(self, name: str) -> Optional[DrugProduct]:
+        pid = self.by_name.get(name)
+        return self.products[pid] if pid is not None else None
+
+    def live_products(self) -> Iterable[DrugProduct]:
+        return (p for p in self.products if p is not None)
+
+    def diff(self, names: Sequence[str], hashes: Optional[Sequence[int]] = None) -> CatalogDiff:
+        old = {h: self.products[pid].name for h, pid in self.by_hash.items()}
+        return diff_rows(old, names, hashes)
+
+    def apply(self, diff: CatalogDiff) -> "DrugCatalog":
+        """
+        Farkı uygular ve yeni katalog döner (self değişmez).
+        - Dokunulmayan trigram posting listeleri paylaşılır; yalnızca değişen gram'lar kopyalanır
+        - Kelime listesi sıralı koşuların birleştirilmesiyle güncellenir (tam sıralama yok)
+        """
+        if not diff:
+            return self
+        dead = len(self.products) - len(self.by_name) + len(diff.removed)
+        if dead > COMPACT_RATIO * (len(self.products) + len(diff.added)):
+            removed, renames = set(diff.removed), dict(diff.renamed)
+            names = [renames.get(p.name, p.name) for p in self.live_products() if p.name not in removed]
+            return DrugCatalog(sorted(names + diff.added))
+
+        new = object.__new__(DrugCatalog)
+        products = list(self.products)
+        by_name = dict(self.by_name)
+        by_hash = dict(self.by_hash)
+        brand_keys = list(self._brand_keys)
+
+        drop_words: set[Tuple[str, int]] = set()
+        add_words: List[Tuple[str, int]] = []
+        drop_grams: Dict[str, set] = {}
+        add_grams: Dict[str, List[int]] = {}
+
+        def unindex(pid: int) -> None:
+            p = products[pid]
+            _, text = _index_keys(p)
+            drop_words.update((w, pid) for w in set(text.split()))
+            for g in _trigrams(text):
+                drop_grams.setdefault(g, set()).add(pid)
+            del by_name[p.name]
+            by_hash.pop(row_hash(p.name), None)
+
+        def index(pid: int, name: str) -> None:
+            p = parse_drug_row(name)
+            products[pid] = p
+            brand_key, text = _index_keys(p)
+            brand_keys[pid] = brand_key
+            add_words.extend((w, pid) for w in set(text.split()))
+            for g in _trigrams(text):
+                add_grams.setdefault(g, []).append(pid)
+            by_name[name] = pid
+            by_hash[row_hash(name)] = pid
+
+        changed = []
+        for name in diff.removed:
+            pid = self.by_name[name]
+            unindex(pid)
+            products[pid] = None
+            brand_keys[pid] = ""
+            changed.append(pid)
+        for old_name, new_name in diff.renamed:
+            pid = self.by_name[old_name]
+            unindex(pid)
+            index(pid, new_name)
+            changed.append(pid)
+        for name in diff.added:
+            pid = len(products)
+            products.append(None)
+            brand_keys.append("")
+            index(pid, name)
+            changed.append(pid)
+
+        kept = [(w, pid) for w, pid in zip(self._words, self._word_ids) if (w, pid) not in drop_words] \
+            if drop_words else list(zip(self._words, self._word_ids))
+        # sıra (kelime, ürün adı): tam kurulumdaki id sırasıyla aynı, _prefix_ids'in sınırı aynı ürünleri seçer.
+        # Eklenenler bisect ile yerleştirilir (anahtar yalnızca O(eklenen · log n) kez hesaplanır)
+        def word_key(wp: Tuple[str, int]) -> Tuple[str, str]:
+            return wp[0], products[wp[1]].name
+
+        words: List[Tuple[str, int]] = []
+        lo = 0
+        for wp in sorted(add_words, key=word_key):
+            hi = bisect.bisect_right(kept, word_key(wp), lo, key=word_key)
+            words.extend(kept[lo:hi])
+            words.append(wp)
+            lo = hi
+        words.extend(kept[lo:])
+
+        postings = dict(self._postings)
+        for g in set(drop_grams) | set(add_grams):
+            gone = drop_grams.get(g, ())
+            lst = [pid for pid in postings.get(g, ()) if pid not in gone] + add_grams.get(g, [])
+            if lst:
+                postings[g] = lst
+            else:
+                postings.pop(g, None)
+
+        new.products = products
+        new.by_name = by_name
+        new.by_hash = by_hash
+        new.version = catalog_version(by_hash)
+        new.lineage = (weakref.ref(self), frozenset(changed))
+        new.tables = {}
+        new._brand_keys = brand_keys
+        new._words = [w for w, _ in words]
+        new._word_ids = [pid for _, pid in words]
+        new._postings = postings
+        return new
+
+    def _name_key(self, pid: int) -> Any:
+        """Eşit skorda sıralama anahtarı (ürün adı)."""
+        return self.products[pid].name
+
+    def _prefix_ids(self, prefix: str, limit: int) -> List[int]:
+        lo = bisect.bisect_left(self._words, prefix)
+        out: List[int] = []
+        seen: set[int] = set()
+        for i in range(lo, len(self._words)):
+            if not self._words[i].startswith(prefix):
+                break
+            pid = self._word_ids[i]
+            if pid not in seen:
+                seen.add(pid)
+                out.append(pid)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def search(self, query: str, k: int = 20) -> List[DrugProduct]:
+        """
+        Marka veya etken madde ile top-k arama ("ELIQUIS", "apiksaban", "beloc").
+        Sıralama: marka öneki > kelime öneki > trigram örtüşme oranı; eşitlikte ad sırası.
+        """
+        q = fold_tr(query)
+        if not q or k <= 0:
+            return []
+
+        scores: Dict[int, float] = {}
+        first_word = q.split()[0]
+        for pid in self._prefix_ids(first_word, limit=max(4 * k, 200)):
+            scores[pid] = 2.0
+
+        # önek eşleşmesi k'yı dolduruyorsa trigram taramasına gerek yok (skor ≤1 < 2)
+        grams = _trigrams(q) if len(scores) < k else set()
+        if len(q) >= 3 and grams:
+            counts: Dict[int, int] = {}
+            for g in grams:
+                for pid in self._postings.get(g, ()):
+                    counts[pid] = counts.get(pid, 0) + 1
+            need = max(1, (len(grams) + 1) // 2)
+            n = float(len(grams))
+            for pid, c in counts.items():
+                if c >= need:
+                    scores[pid] = scores.get(pid, 0.0) + c / n
+
+        for pid in scores:
+            if self._brand_keys[pid].startswith(q):
+                scores[pid] += 1.0
+
+        name_key = self._name_key
+        best = heapq.nsmallest(k, scores.items(), key=lambda kv: (-kv[1], name_key(kv[0])))
+        return [self.products[pid] for pid, _ in best]
+
+
+# ----------------------------
+# Loading (process-wide cache)
+# ----------------------------
+def read_drug_names(csv_path: str = DEFAULT_CSV_PATH) -> List[str]:
+    """
+    CSV'den ilaç adlarını okur (app.load_drug_list ile aynı kurallar):
+    'drug_name' kolonu varsa o, yoksa ilk kolon; boşluk kırpılır, tekrarlar atılır, sıralanır.
+    """
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        col = header.index("drug_name") if "drug_name" in header else 0
+        names = {row[col].strip() for row in reader if len(row) > col and row[col].strip()}
+    return sorted(names)
+
+
+_catalog_lock = threading.Lock()
+_catalog_cache: Dict[str, Tuple[Tuple[int, int], DrugCatalog]] = {}
+
+# artımlı güncellenen katalog yayınlanmadan önce çağrılır (ör. CatalogTable.carry: sınıf / etken madde tabloları)
+_publish_hooks: List[Callable[[DrugCatalog], None]] = []
+
+
+def on_publish(fn: Callable[[DrugCatalog], None]) -> Callable[[DrugCatalog], None]:
+    _publish_hooks.append(fn)
+    return fn
+
+
+def table_key(name: str, spec: Any) -> str:
+    """Kalıcı tablo anahtarı: ad + tabloyu üreten kalıpların özeti (kalıplar değişirse snapshot'taki tablo kullanılmaz)."""
+    return f"{name}:{hashlib.blake2b(repr(spec).encode('utf-8'), digest_size=8).hexdigest()}"
+
+
+# anahtarlı tablolar ilaç snapshot'ına yazılır (core.catalog_snapshot.build_snapshot)
+_persisted_tables: "weakref.WeakValueDictionary[str, CatalogTable]" = weakref.WeakValueDictionary()
+
+
+def persisted_tables() -> Dict[str, "CatalogTable"]:
+    return dict(_persisted_tables)
+
+
+class CatalogTable:
+    """
+    Ürün id'leriyle hizalı türetilmiş tablo (ör. sınıf / etken madde maskeleri).
+    - Katalog başına bir kez kurulur; katalog düşünce tablo da düşer (zayıf referans)
+    - catalog.apply ile türetilen sürümde üst tablo kopyalanır, yalnızca değişen id'ler yeniden hesaplanır
+    - Kaldırılmış ürün id'leri 0'dır
+    - `key` verilirse tablo snapshot'a yazılır; mmap katalogda (catalog.tables) hazır tablo okunur, kurulum yapılmaz
+    """
+
+    def __init__(self, compute: Callable[[DrugProduct], int], key: str = ""):
+        self._compute = compute
+        self.key = key
+        self._tables: "weakref.WeakKeyDictionary[DrugCatalog, Sequence[int]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        if key:
+            _persisted_tables[key] = self
+
+    def build(self, catalog: DrugCatalog) -> List[int]:
+        compute = self._compute
+        return [compute(p) if p is not None else 0 for p in catalog.products]
+
+    def _existing(self, catalog: DrugCatalog) -> Optional[Sequence[int]]:
+        table = self._tables.get(catalog)
+        if table is None and self.key:
+            table = catalog.tables.get(self.key)
+        return table
+
+    def _derive(self, catalog: DrugCatalog) -> Optional[List[int]]:
+        if catalog.lineage is None:
+            return None
+        parent_ref, changed = catalog.lineage
+        parent = parent_ref()
+        base = self._existing(parent) if parent is not None else None
+        if base is None:
+            return None
+        table = list(base)
+        table.extend([0] * (len(catalog.products) - len(table)))
+        for pid in changed:
+            p = catalog.products[pid]
+            table[pid] = self._compute(p) if p is not None else 0
+        return table
+
+    def get(self, catalog: DrugCatalog) -> Sequence[int]:
+        table = self._existing(catalog)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(catalog)
+                if table is None:
+                    table = self._derive(catalog)
+                    if table is None:
+                        table = self.build(catalog)
+                    self._tables[catalog] = table
+        return table
+
+    def carry(self, catalog: DrugCatalog) -> None:
+        """on_publish kancası: üst katalogun tablosu varsa yeni sürümünkini yayından önce artımlı hazırlar."""
+        table = self._derive(catalog)
+        if table is not None:
+            with self._lock:
+                self._tables.setdefault(catalog, table)
+
+
+def get_catalog(csv_path: str = DEFAULT_CSV_PATH) -> Optional[DrugCatalog]:
+    """
+    Süreç genelinde paylaşılan katalog; dosya (mtime, boyut) değişirse güncellenir.
+    - CSV'nin bu damgası için snapshot varsa (catalog_refresh yayını) katalog, arama indeksi ve sınıf tabloları
+      doğrudan mmap'ten okunur (MappedCatalog): kurulum yok, sayfalar tüm süreçlerce paylaşılır
+    - Snapshot yoksa ve önceki katalog varsa (CSV elle değişti) istek yolunda tam kurulum yapılmaz:
+      yeni liste satır hash'leriyle karşılaştırılır, yalnızca fark uygulanır (apply) ve snapshot
+      yeni katalogdan arka planda yazılır
+    - Soğuk açılışta snapshot bir kez kurulur (yazılamıyorsa bellek içi tam kurulum)
+    - Yeni katalog tek atamayla yayınlanır, çalışan istekler eskisini okumaya devam eder
+    """
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(csv_path)
+
+    hit = _catalog_cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    with _catalog_lock:
+        hit = _catalog_cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        from core.catalog_snapshot import open_or_build, open_snapshot, write_snapshot_async  # döngüsel import'u önler
+
+        mapped = open_snapshot(csv_path, stamp)
+        if mapped is None and hit is not None:
+            catalog = hit[1].apply(hit[1].diff(read_drug_names(csv_path)))
+            for hook in _publish_hooks:
+                hook(catalog)  # eski katalog hâlâ canlı: türetilmiş tablolar farktan güncellenir
+            write_snapshot_async(csv_path, stamp, catalog)
+        else:
+            if mapped is None:
+                mapped = open_or_build(csv_path, stamp)
+            catalog = mapped.catalog() if mapped is not None else DrugCatalog(read_drug_names(csv_path))
+        _catalog_cache[key] = (stamp, catalog)
+        return catalog
+
+
+def search_options(catalog: Optional[DrugCatalog], query: str, selected: Sequence[str], k: int = 50) -> List[str]:
+    """Multiselect seçenekleri: önce mevcut seçimler, sonra arama sonuçları."""
+    out = list(dict.fromkeys(selected))
+    if catalog is not None and query:
+        seen = set(out)
+        out += [p.name for p in catalog.search(query, k) if p.name not in seen]
+    return out
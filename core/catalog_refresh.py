@@ -0,0 +1,103 @@
+# core/catalog_refresh.py
+"""
+SGK ilaç listesi güncellemesi: yeni CSV'yi mevcut katalogla satır hash'leri üzerinden karşılaştırır
+ve yeni sürümü atomik olarak yayınlar.
+
+    python -m core.catalog_refresh yeni_liste.csv --dry-run    # yalnızca fark
+    python -m core.catalog_refresh yeni_liste.csv              # data/sgk_ilaclar.csv'yi günceller
+
+Ortak sürüm anahtarı CSV'nin (mtime_ns, boyut) damgasıdır; snapshot yolu bu damgayı içerir
+(data/sgk_ilaclar.<mtime_ns>-<boyut>.bin). Yayın sırası:
+1) Yeni CSV hedef klasörde geçici dosyaya kopyalanır; damga bu dosyadan alınır
+   (rename mtime'ı ve boyutu korur -> yayından sonra CSV'nin damgası aynıdır)
+2) Yeni katalog yayındaki katalogdan farkla türetilir (apply; tablolar da farkla güncellenir) ve
+   yeni damganın snapshot'ı olarak atomik yazılır
+3) Geçici CSV hedefin üzerine taşınır (os.replace)
+4) Diğer damgalı snapshot'lar silinir (mmap ile açık tutan süreçler etkilenmez)
+Okuyucu yalnızca okuduğu damganın dosyasını açar: 3)'ten önce eski CSV + eski snapshot, sonra yeni CSV +
+yeni snapshot (katalog, arama indeksi ve tablolar hazır; yeniden başlatma / soğuk kurulum yok).
+Hiçbir okuyucu başka bir damganın snapshot'ını yazmaz, bu yüzden yayınlanan snapshot ezilmez.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+from core.catalog import DEFAULT_CSV_PATH, CatalogDiff, DrugCatalog, catalog_version, diff_rows, read_drug_names, row_hash
+from core.catalog_snapshot import open_snapshot, remove_stale_snapshots, snapshot_path_for, write_snapshot
+
+
+def current_catalog(csv_path: str) -> Optional[DrugCatalog]:
+    """Yayındaki katalog: güncel snapshot varsa mmap'ten (kurulum yok), yoksa CSV'den."""
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    mapped = open_snapshot(csv_path, (st.st_mtime_ns, st.st_size))
+    if mapped is not None:
+        return mapped.catalog()
+    return DrugCatalog(read_drug_names(csv_path))
+
+
+def refresh(
+    new_csv: str, csv_path: str = DEFAULT_CSV_PATH, *, dry_run: bool = False, show: int = 0
+) -> Dict[str, Any]:
+    old = current_catalog(csv_path)
+    names = read_drug_names(new_csv)
+    hashes = [row_hash(n) for n in names]
+    diff: CatalogDiff = old.diff(names, hashes) if old is not None else diff_rows({}, names, hashes)
+
+    report: Dict[str, Any] = {
+        "target": csv_path,
+        "old_version": old.version if old is not None and len(old) else None,
+        "new_version": catalog_version(hashes),
+        "rows": len(names),
+        "added": len(diff.added),
+        "removed": len(diff.removed),
+        "renamed": len(diff.renamed),
+        "published": False,
+    }
+    if show:
+        report["examples"] = {
+            "added": diff.added[:show],
+            "removed": diff.removed[:show],
+            "renamed": [list(pair) for pair in diff.renamed[:show]],
+        }
+    if dry_run or not diff:
+        return report
+
+    directory = os.path.dirname(os.path.abspath(csv_path))
+    tmp_csv = os.path.join(directory, f".{os.path.basename(csv_path)}.tmp.{os.getpid()}")
+    try:
+        shutil.copyfile(new_csv, tmp_csv)
+        st = os.stat(tmp_csv)
+        stamp = (st.st_mtime_ns, st.st_size)
+        catalog = old.apply(diff) if old is not None else DrugCatalog(names, hashes)
+        write_snapshot(catalog, snapshot_path_for(csv_path, stamp), stamp)
+        os.replace(tmp_csv, csv_path)
+    finally:
+        if os.path.exists(tmp_csv):
+            os.unlink(tmp_csv)
+    remove_stale_snapshots(csv_path, keep=stamp)
+    report["published"] = True
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="SGK ilaç listesini fark (satır hash) ile günceller.")
+    ap.add_argument("new_csv", help="yeni SGK listesi (CSV)")
+    ap.add_argument("--csv", default=DEFAULT_CSV_PATH, help=f"yayındaki liste (varsayılan: {DEFAULT_CSV_PATH})")
+    ap.add_argument("--dry-run", action="store_true", help="yalnızca farkı göster, yayınlama")
+    ap.add_argument("--show", type=int, default=10, help="listelenecek örnek satır sayısı")
+    args = ap.parse_args(argv)
+
+    report = refresh(args.new_csv, args.csv, dry_run=args.dry_run, show=args.show)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
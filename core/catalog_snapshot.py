@@ -0,0 +1,684 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import weakref
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from core.catalog import (
+    DEFAULT_CSV_PATH,
+    CatalogDiff,
+    CatalogTable,
+    DrugCatalog,
+    DrugProduct,
+    diff_rows,
+    persisted_tables,
+    read_drug_names,
+    row_hash,
+)
+
+# Dosya düzeni (native byte order, header'da işaretli); tüm bölümler 8 bayta hizalı:
+#   header:  magic(8) | version u32 | byteorder u32 | count u32 | nsections u32
+#            | src_mtime_ns u64 | src_size u64 | catalog_version (16 ASCII)
+#   dizin:   nsections x (ad 40s | offset u64 | uzunluk u64 | eleman boyu u32 | pad)
+#   bölümler:
+#     hashes                   u64[count]     satır hash'leri (core.catalog.row_hash; sıralı ad sırasıyla)
+#     names(.off)              ad metinleri (u32 başlangıçlar + UTF-8 blob); ürün id = sıra
+#     fields(.off)             ürün başına brand/strength/form/ingredient (4 x count metin)
+#     brand_keys(.off)         fold_tr(marka)
+#     words(.off), word_ids    sıralı önek listesi + ürün id'leri
+#     grams(.off), postings.off, postings   sıralı trigram'lar -> ürün id listeleri
+#     hash_sorted, hash_pids   sıralı hash -> ürün id
+#     table:<anahtar>          CatalogTable değerleri (ör. sınıf maskeleri), eleman boyu bayt genişliği
+# Dosya salt okunur mmap edilir: çalışan tüm süreçler aynı sayfa önbelleğini paylaşır (kopya yok).
+MAGIC = b"CAPEDRG1"
+VERSION = 3
+_HEADER = struct.Struct("=8sIIIIQQ16s")
+_SECTION = struct.Struct("=40sQQI4x")
+_BYTEORDER = 1 if sys.byteorder == "little" else 2
+_ALIGN = 8
+_CASTS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+PRODUCT_CACHE_SIZE = 1024  # süreç başına decode edilmiş ürün / ad araması önbelleği üst sınırı
+_STAMPED = re.compile(r"\.\d+-\d+\.bin")
+
+
+def snapshot_path_for(csv_path: str, stamp: Optional[Tuple[int, int]] = None) -> str:
+    """
+    CSV'nin (mtime_ns, boyut) damgasına ait snapshot yolu: data/sgk_ilaclar.<mtime_ns>-<boyut>.bin
+    Damga dosya adında olduğundan her sürümün snapshot'ı ayrıdır: eski damgayla gelen okuyucu yeni yayının
+    snapshot'ını ezemez, yayıncı da okuyucuların açık tuttuğu dosyanın üzerine yazmaz.
+    """
+    if stamp is None:
+        stamp = _csv_stamp(csv_path)
+        if stamp is None:
+            raise FileNotFoundError(csv_path)
+    return f"{os.path.splitext(csv_path)[0]}.{stamp[0]}-{stamp[1]}.bin"
+
+
+def remove_stale_snapshots(csv_path: str, keep: Tuple[int, int]) -> List[str]:
+    """
+    `keep` dışındaki damgalı snapshot'ları siler (yalnızca yayıncı çağırır; okuyucular asla silmez).
+    Dosyayı hâlâ mmap ile açık tutan süreçler etkilenmez; silinemeyen dosya (ör. Windows'ta açık) atlanır.
+    """
+    base = os.path.basename(os.path.splitext(csv_path)[0])
+    directory = os.path.dirname(os.path.abspath(csv_path))
+    keep_name = os.path.basename(snapshot_path_for(csv_path, keep))
+    removed = []
+    for fn in os.listdir(directory):
+        stale = fn == f"{base}.bin" or (fn.startswith(base) and _STAMPED.fullmatch(fn[len(base):]) is not None)
+        if not stale or fn == keep_name:
+            continue
+        try:
+            os.unlink(os.path.join(directory, fn))
+            removed.append(fn)
+        except OSError:
+            pass
+    return removed
+
+
+# ----------------------------
+# Build
+# ----------------------------
+def _strings(name: str, values: Iterable[str]) -> List[Tuple[str, bytes, int]]:
+    offsets = array("I", [0])
+    chunks: List[bytes] = []
+    pos = 0
+    for v in values:
+        b = v.encode("utf-8")
+        chunks.append(b)
+        pos += len(b)
+        offsets.append(pos)
+    return [(f"{name}.off", offsets.tobytes(), 4), (name, b"".join(chunks), 1)]
+
+
+def _int_table(values: Sequence[int]) -> Tuple[bytes, int]:
+    bits = max((v.bit_length() for v in values), default=0)
+    width = next((w for w in (1, 2, 4, 8) if bits <= 8 * w), (bits + 7) // 8)
+    if width in _CASTS:
+        return array(_CASTS[width], values).tobytes(), width
+    return b"".join(v.to_bytes(width, "little") for v in values), width
+
+
+def default_tables() -> Dict[str, CatalogTable]:
+    """Snapshot'a yazılan tablolar: sınıf maskeleri + yüklenebiliyorsa etkileşim etken madde maskeleri."""
+    import core.drug_classes  # noqa: F401  (sınıf tablosunu kaydeder)
+
+    try:
+        from core.registry import get_interaction_index
+
+        get_interaction_index()
+    except (OSError, ValueError):
+        pass
+    return persisted_tables()
+
+
+def _catalog_sections(catalog: DrugCatalog, tables: Mapping[str, CatalogTable]) -> Tuple[int, List[Tuple[str, bytes, int]]]:
+    """
+    Katalog -> (ürün sayısı, bölümler). Ürün id'leri ad sırasıyla yeniden numaralanır: apply ile türetilen
+    katalog (tombstone'lar, sona eklenen ürünler) tam kurulumla aynı dosyayı üretir.
+    Tablolar table.get ile alınır: türetilmiş katalogda üst katalogdan farkla güncellenmiş tablo yazılır.
+    """
+    products = catalog.products
+    order = sorted((pid for pid, p in enumerate(products) if p is not None), key=catalog._name_key)
+    new_id = [-1] * len(products)
+    for i, pid in enumerate(order):
+        new_id[pid] = i
+    hash_of = [0] * len(products)
+    for h, pid in catalog.by_hash.items():
+        hash_of[pid] = h
+    live = [products[pid] for pid in order]
+    hashes = [hash_of[pid] for pid in order]
+
+    sections: List[Tuple[str, bytes, int]] = [("hashes", array("Q", hashes).tobytes(), 8)]
+    sections += _strings("names", (p.name for p in live))
+    sections += _strings("fields", (f for p in live for f in (p.brand, p.strength, p.form, p.ingredient)))
+    sections += _strings("brand_keys", (catalog._brand_keys[pid] for pid in order))
+    words = sorted(zip(catalog._words, (new_id[pid] for pid in catalog._word_ids)))
+    sections += _strings("words", (w for w, _ in words))
+    sections.append(("word_ids", array("I", [pid for _, pid in words]).tobytes(), 4))
+
+    grams = sorted(catalog._postings)
+    post_off = array("I", [0])
+    postings = array("I")
+    for g in grams:
+        postings.extend(sorted(new_id[pid] for pid in catalog._postings[g]))
+        post_off.append(len(postings))
+    sections += _strings("grams", grams)
+    sections.append(("postings.off", post_off.tobytes(), 4))
+    sections.append(("postings", postings.tobytes(), 4))
+
+    by_hash = sorted(range(len(hashes)), key=hashes.__getitem__)
+    sections.append(("hash_sorted", array("Q", [hashes[i] for i in by_hash]).tobytes(), 8))
+    sections.append(("hash_pids", array("I", by_hash).tobytes(), 4))
+
+    for key, table in sorted(tables.items()):
+        values = table.get(catalog)
+        data, width = _int_table([values[pid] for pid in order])
+        sections.append((f"table:{key}", data, width))
+    return len(live), sections
+
+
+def write_snapshot(
+    catalog: DrugCatalog,
+    out_path: str,
+    source_stamp: Tuple[int, int],
+    tables: Optional[Mapping[str, CatalogTable]] = None,
+) -> str:
+    """
+    Katalog -> ikili snapshot (adlar + alanlar + arama indeksi + tablolar); `source_stamp` kaynak CSV'nin damgası.
+    Yazım geçici dosyaya yapılır ve os.replace ile atomik yayınlanır.
+    """
+    count, sections = _catalog_sections(catalog, default_tables() if tables is None else tables)
+
+    pos = _HEADER.size + _SECTION.size * len(sections)
+    directory = []
+    for name, data, itemsize in sections:
+        raw = name.encode("utf-8")
+        if len(raw) > 40:
+            raise ValueError(f"snapshot bölüm adı çok uzun: {name}")
+        pos += -pos % _ALIGN
+        directory.append(_SECTION.pack(raw, pos, len(data), itemsize))
+        pos += len(data)
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, _BYTEORDER, count, len(sections), source_stamp[0], source_stamp[1],
+        catalog.version.encode("ascii"),
+    )
+    tmp = f"{out_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(b"".join(directory))
+            for _, data, _ in sections:
+                f.write(b"\0" * (-f.tell() % _ALIGN))
+                f.write(data)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return out_path
+
+
+def build_snapshot(
+    csv_path: str = DEFAULT_CSV_PATH,
+    out_path: Optional[str] = None,
+    tables: Optional[Mapping[str, CatalogTable]] = None,
+) -> str:
+    """CSV -> snapshot (tam kurulum); varsayılan çıktı CSV'nin güncel damgasına ait yoldur."""
+    st = os.stat(csv_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    catalog = DrugCatalog(read_drug_names(csv_path))  # tekilleştirilmiş + sıralı
+    return write_snapshot(catalog, out_path or snapshot_path_for(csv_path, stamp), stamp, tables)
+
+
+# ----------------------------
+# Mapped views (kopyasız; yalnızca erişilen eleman decode edilir)
+# ----------------------------
+class MappedStrings(Sequence[str]):
+    """u32 başlangıçlar + UTF-8 blob üzerinde metin dizisi."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+        self._count = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: Union[int, slice]):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        # tam geçiş: blob bir kez kopyalanır, bytes dilimi memoryview dilimi + str'den ~3 kat hızlı
+        data, off = self._blob.tobytes(), self._offsets.tolist()
+        for start, end in zip(off, off[1:]):
+            yield data[start:end].decode("utf-8")
+
+
+class MappedTable(Sequence[int]):
+    """Sabit genişlikli tamsayı tablosu (1/2/4/8 bayt doğrudan cast; daha genişi little-endian)."""
+
+    def __init__(self, raw: memoryview, width: int):
+        self._width = width
+        self._view = raw.cast(_CASTS[width]) if width in _CASTS else raw
+        self._count = len(raw) // width
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if self._width in _CASTS:
+            return self._view[i]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        w = self._width
+        return int.from_bytes(self._view[i * w:(i + 1) * w], "little")
+
+
+class _NameIndex(Mapping[str, int]):
+    """Ad -> ürün id: satır hash'i hash dizininde aranır, tek ad decode edilerek doğrulanır."""
+
+    def __init__(self, names: MappedStrings, by_hash: "_HashIndex"):
+        self._names = names
+
+        # kapanış self'i tutmaz: döngü yok, eski snapshot'ın eşlemesi referans sayımıyla hemen bırakılır
+        @lru_cache(maxsize=PRODUCT_CACHE_SIZE)
+        def lookup(name: str) -> Optional[int]:
+            i = by_hash.get(row_hash(name))
+            return i if i is not None and names[i] == name else None
+
+        self._lookup = lookup
+
+    def get(self, name, default=None):  # type: ignore[override]
+        if not isinstance(name, str):
+            return default
+        i = self._lookup(name)
+        return default if i is None else i
+
+    def __getitem__(self, name: str) -> int:
+        i = self.get(name)
+        if i is None:
+            raise KeyError(name)
+        return i
+
+    def __contains__(self, name: object) -> bool:
+        return self.get(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class _HashIndex(Mapping[int, int]):
+    """Satır hash'i -> ürün id (sıralı u64 dizisinde bisect)."""
+
+    def __init__(self, hashes: memoryview, pids: memoryview):
+        self._hashes = hashes
+        self._pids = pids
+
+    def get(self, h, default=None):  # type: ignore[override]
+        i = bisect.bisect_left(self._hashes, h)
+        return self._pids[i] if i < len(self._hashes) and self._hashes[i] == h else default
+
+    def __getitem__(self, h: int) -> int:
+        pid = self.get(h)
+        if pid is None:
+            raise KeyError(h)
+        return pid
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._hashes)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def items(self):  # type: ignore[override]
+        return zip(self._hashes, self._pids)
+
+
+class _Postings(Mapping[str, Sequence[int]]):
+    """Trigram -> ürün id listesi (sıralı trigram dizisinde bisect; liste postings dizisinin dilimi)."""
+
+    def __init__(self, grams: MappedStrings, offsets: memoryview, postings: memoryview):
+        self._grams = grams
+        self._offsets = offsets
+        self._postings = postings
+
+    def get(self, gram, default=None):  # type: ignore[override]
+        i = bisect.bisect_left(self._grams, gram)
+        if i < len(self._grams) and self._grams[i] == gram:
+            return self._postings[self._offsets[i]:self._offsets[i + 1]]
+        return default
+
+    def __getitem__(self, gram: str) -> Sequence[int]:
+        out = self.get(gram)
+        if out is None:
+            raise KeyError(gram)
+        return out
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._grams)
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+
+class _Products(Sequence[DrugProduct]):
+    """Ürün id -> DrugProduct; sık erişilen (hastanın ilaçları, son arama sonuçları) ürünler küçük LRU'da tutulur."""
+
+    def __init__(self, names: MappedStrings, fields: MappedStrings):
+        self._names = names
+
+        @lru_cache(maxsize=PRODUCT_CACHE_SIZE)
+        def product(i: int) -> DrugProduct:  # _NameIndex'teki gibi self'i tutmaz
+            f = fields
+            return DrugProduct(names[i], f[4 * i], f[4 * i + 1], f[4 * i + 2], f[4 * i + 3])
+
+        self._product = product
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self._names):
+            raise IndexError(i)
+        return self._product(i)
+
+
+class MappedNames(Sequence[str]):
+    """
+    mmap edilmiş snapshot: tembel (lazy) ilaç adı dizisi + katalog bölümleri.
+    Adlar kopyalanmaz; yalnızca erişilen eleman decode edilir. Sıra = sıralı ad sırası.
+    `hashes`: ad sırasıyla hizalı satır hash'leri (katalog farkı adları decode etmeden bulunur).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(path, mm)
+        except BaseException:
+            # yarım kalan görünümler bırakılıp eşleme (ve mmap'in dup ettiği fd) hemen kapatılır
+            self._sections = {}
+            self.hashes = self._names = None  # type: ignore[assignment]
+            mm.close()
+            raise
+        self._catalog_ref: Optional[weakref.ref] = None  # katalog self'i tutar; geri yön zayıf (döngü yok)
+        self._catalog_lock = threading.Lock()
+
+    def _open(self, path: str, mm: mmap.mmap) -> None:
+        magic, version, byteorder, count, nsections, src_mtime, src_size, cat_version = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER:
+            raise ValueError(f"Geçersiz veya uyumsuz ilaç snapshot'ı: {path}")
+
+        self._mm = mm
+        self.path = path
+        self.source_stamp: Tuple[int, int] = (src_mtime, src_size)
+        self.version = cat_version.decode("ascii")
+        self._count = count
+        self._sections: Dict[str, Tuple[memoryview, int]] = {}
+        with memoryview(mm) as view:
+            for k in range(nsections):
+                raw_name, offset, length, itemsize = _SECTION.unpack_from(mm, _HEADER.size + k * _SECTION.size)
+                if offset + length > len(mm):
+                    raise ValueError(f"Kesik ilaç snapshot'ı: {path}")
+                self._sections[raw_name.rstrip(b"\0").decode("utf-8")] = (view[offset:offset + length], itemsize)
+
+        self.hashes = self._array("hashes")
+        self._names = self._strings("names")
+
+    def _array(self, name: str) -> memoryview:
+        raw, itemsize = self._sections[name]
+        return raw.cast(_CASTS[itemsize])
+
+    def _strings(self, name: str) -> MappedStrings:
+        return MappedStrings(self._array(f"{name}.off"), self._sections[name][0])
+
+    def tables(self) -> Dict[str, MappedTable]:
+        return {
+            name[len("table:"):]: MappedTable(raw, itemsize)
+            for name, (raw, itemsize) in self._sections.items()
+            if name.startswith("table:")
+        }
+
+    def section_sizes(self) -> Dict[str, int]:
+        return {name: len(raw) for name, (raw, _) in self._sections.items()}
+
+    def catalog(self) -> MappedCatalog:
+        """Bu snapshot'ın katalog görünümü (kullanımda olduğu sürece süreç başına tek nesne)."""
+        catalog = self._catalog_ref() if self._catalog_ref is not None else None
+        if catalog is None:
+            with self._catalog_lock:
+                catalog = self._catalog_ref() if self._catalog_ref is not None else None
+                if catalog is None:
+                    catalog = MappedCatalog(self)
+                    self._catalog_ref = weakref.ref(catalog)
+        return catalog
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: Union[int, slice]):  # type: ignore[override]
+        return self._names[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+
+class MappedCatalog(DrugCatalog):
+    """
+    Snapshot üzerinde DrugCatalog: ürünler, arama indeksi ve tablolar mmap'ten okunur.
+    - Açılışta kurulum yapılmaz (yalnızca bölüm dizini okunur); süreç başına ek bellek yok denecek kadar az
+    - search/get/diff/apply DrugCatalog'dan gelir; apply bellek içi (copy-on-write) bir katalog üretir
+    """
+
+    def __init__(self, mapped: MappedNames):  # DrugCatalog.__init__ çağrılmaz: kurulacak bir şey yok
+        self.mapped = mapped
+        names = mapped._names
+        self.products = _Products(names, mapped._strings("fields"))  # type: ignore[assignment]
+        self.by_hash = _HashIndex(mapped._array("hash_sorted"), mapped._array("hash_pids"))  # type: ignore[assignment]
+        self.by_name = _NameIndex(names, self.by_hash)  # type: ignore[assignment]
+        self.version = mapped.version
+        self.lineage = None
+        self.tables = mapped.tables()
+        self._brand_keys = mapped._strings("brand_keys")  # type: ignore[assignment]
+        self._words = mapped._strings("words")  # type: ignore[assignment]
+        self._word_ids = mapped._array("word_ids")  # type: ignore[assignment]
+        self._postings = _Postings(  # type: ignore[assignment]
+            mapped._strings("grams"), mapped._array("postings.off"), mapped._array("postings")
+        )
+
+    def live_products(self) -> Iterable[DrugProduct]:
+        return iter(self.products)
+
+    def _name_key(self, pid: int) -> int:
+        return pid  # snapshot ürün id'leri ad sırasındadır: ad decode edilmez
+
+    def diff(self, names: Sequence[str], hashes: Optional[Sequence[int]] = None) -> CatalogDiff:
+        # hash'ler ad sırasıyla hizalı: ürünler decode edilmez, adlar tek geçişte okunur
+        return diff_rows(dict(zip(self.mapped.hashes, self.mapped._names)), names, hashes)
+
+    def apply(self, diff: CatalogDiff) -> DrugCatalog:
+        """
+        Fark, bölümlerin tek geçişte okunduğu bellek içi kopyaya uygulanır (bisect / LRU yok).
+        Ürün id'leri aynı kaldığından türetilen katalogun üstü bu katalogdur: tablolar mmap'teki tablodan farkla güncellenir.
+        """
+        if not diff:
+            return self
+        new = self._materialize().apply(diff)
+        if new.lineage is not None:
+            new.lineage = (weakref.ref(self), new.lineage[1])
+        return new
+
+    def _materialize(self) -> DrugCatalog:
+        names = list(self.mapped._names)
+        fields = iter(self.mapped._strings("fields"))
+        index = self._postings
+        offsets, postings = index._offsets.tolist(), index._postings.tolist()  # type: ignore[attr-defined]
+
+        heap = object.__new__(DrugCatalog)
+        heap.products = [DrugProduct(n, next(fields), next(fields), next(fields), next(fields)) for n in names]
+        heap.by_name = {n: i for i, n in enumerate(names)}
+        heap.by_hash = dict(zip(self.mapped.hashes, range(len(names))))
+        heap.version = self.version
+        heap.lineage = None
+        heap.tables = self.tables
+        heap._brand_keys = list(self._brand_keys)
+        heap._words = list(self._words)
+        heap._word_ids = self._word_ids.tolist()  # type: ignore[attr-defined]
+        heap._postings = {g: postings[start:end] for g, start, end in zip(index._grams, offsets, offsets[1:])}  # type: ignore[attr-defined]
+        return heap
+
+
+_lock = threading.Lock()
+_cache: Dict[str, Tuple[Optional[Tuple[int, int]], Sequence[str]]] = {}
+
+
+def _csv_stamp(csv_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_source_stamp(snap: str) -> Optional[Tuple[int, int]]:
+    """Snapshot'ın kaynak CSV damgası; yalnızca header okunur (mmap açılmaz). Geçersizse None."""
+    try:
+        with open(snap, "rb") as f:
+            raw = f.read(_HEADER.size)
+        magic, version, byteorder, _, _, src_mtime, src_size, _ = _HEADER.unpack(raw)
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER:
+        return None
+    return (src_mtime, src_size)
+
+
+def open_snapshot(csv_path: str, stamp: Tuple[int, int]) -> Optional[MappedNames]:
+    """CSV'nin `stamp` damgalı sürümünün snapshot'ı (yoksa / geçersizse None)."""
+    return _open_fresh(snapshot_path_for(csv_path, stamp), stamp)
+
+
+def _open_fresh(snap: str, stamp: Optional[Tuple[int, int]]) -> Optional[MappedNames]:
+    # damga önce header'dan denetlenir: eski snapshot için eşleme hiç açılmaz
+    found = read_source_stamp(snap)
+    if found is None or (stamp is not None and found != stamp):
+        return None
+    try:
+        mapped = MappedNames(snap)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    return mapped if stamp is None or mapped.source_stamp == stamp else None
+
+
+def open_or_build(csv_path: str, stamp: Tuple[int, int]) -> Optional[MappedNames]:
+    """
+    Soğuk açılış (süreçte önceki katalog yok): bu damganın snapshot'ı yoksa satır içi yazılıp açılır.
+    Yazılamıyorsa (salt okunur dağıtım) None: çağıran CSV'den okur.
+    """
+    snap = snapshot_path_for(csv_path, stamp)
+    mapped = _open_fresh(snap, stamp)
+    if mapped is None:
+        try:
+            build_snapshot(csv_path, snap)
+        except OSError:
+            return None
+        mapped = _open_fresh(snap, stamp)
+    return mapped
+
+
+_pending: set = set()  # (csv yolu, damga): arka planda yazılan snapshot'lar
+
+
+def write_snapshot_async(csv_path: str, stamp: Tuple[int, int], catalog: DrugCatalog) -> Optional[threading.Thread]:
+    """
+    Farkla güncellenen katalogun snapshot'ını istek yolunun dışında (daemon iş parçacığı) yazar.
+    - Damga başına süreç içinde tek yazım; dosya zaten varsa ya da CSV bu arada yine değiştiyse yazılmaz
+    - Bu süreç bellek içi katalogla devam eder; diğer / yeni süreçler yazılan snapshot'ı mmap ile açar
+    - Yazılamazsa (salt okunur dağıtım) sessizce vazgeçilir
+    """
+    key = (os.path.abspath(csv_path), stamp)
+    with _lock:
+        if key in _pending:
+            return None
+        _pending.add(key)
+
+    def run() -> None:
+        try:
+            out = snapshot_path_for(csv_path, stamp)
+            if read_source_stamp(out) != stamp and _csv_stamp(csv_path) == stamp:
+                write_snapshot(catalog, out, stamp)
+        except OSError:
+            pass
+        finally:
+            with _lock:
+                _pending.discard(key)
+
+    thread = threading.Thread(target=run, name="catalog-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+def load_drug_names(csv_path: str = DEFAULT_CSV_PATH) -> Sequence[str]:
+    """
+    Sıralı, tekil ilaç adları (pandas'sız).
+    1) CSV'nin bu damgası için snapshot varsa mmap ile açılır (kopyasız)
+    2) Süreçte önceki liste varsa (CSV catalog_refresh dışında değişti) adlar get_catalog'dan alınır:
+       fark bellek içi uygulanır, snapshot arka planda yazılır (istek yolunda tam kurulum yok)
+    3) Soğuk açılışta snapshot yazılıp mmap ile açılır; yazılamıyorsa (salt okunur dağıtım)
+       CSV stdlib csv ile okunur
+    Sonuç süreç başına önbelleklenir; CSV değişince yenilenir.
+    """
+    stamp = _csv_stamp(csv_path)
+    key = os.path.abspath(csv_path)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    if stamp is None:
+        raise FileNotFoundError(csv_path)
+
+    if hit is not None and read_source_stamp(snapshot_path_for(csv_path, stamp)) != stamp:
+        from core.catalog import get_catalog  # _lock dışında: get_catalog kendi kilidini alır
+
+        catalog = get_catalog(csv_path)
+        if catalog is None:
+            raise FileNotFoundError(csv_path)
+        names: Sequence[str] = (
+            catalog.mapped if isinstance(catalog, MappedCatalog) else sorted(p.name for p in catalog.live_products())
+        )
+        with _lock:
+            _cache[key] = (stamp, names)
+        return names
+
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        mapped = open_or_build(csv_path, stamp)
+        names = mapped if mapped is not None else read_drug_names(csv_path)
+        _cache[key] = (stamp, names)
+        return names
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="SGK ilaç CSV'sinden ikili (mmap) snapshot üretir.")
+    ap.add_argument("csv", nargs="?", default=DEFAULT_CSV_PATH)
+    ap.add_argument("-o", "--out", default=None)
+    ap.add_argument("--sizes", action="store_true", help="bölüm boyutlarını listele")
+    args = ap.parse_args(argv)
+    out = build_snapshot(args.csv, args.out)
+    mapped = MappedNames(out)
+    print(f"{out}: {len(mapped)} kayıt, {os.path.getsize(out) / 1e6:.1f} MB, tablolar: {sorted(mapped.tables())}")
+    if args.sizes:
+        for name, size in mapped.section_sizes().items():
+            print(f"  {name:<40} {size:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
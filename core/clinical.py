@@ -0,0 +1,705 @@
+# core/clinical.py
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Mapping, Optional, Sequence, Union
+
+from core.patient import PatientContext
+
+# Klinik yardımcılar (UI'dan bağımsız): app.py, batch ve servis aynı fonksiyonları kullanır.
+
+# ----------------------------
+# TABLE 5 (ESC) -> Surgery list & risk mapping
+# ----------------------------
+SURGERY_TABLE5 = {
+    "Düşük": [
+        "Meme cerrahisi (Breast)",
+        "Dental girişimler (Dental)",
+        "Endokrin: Tiroid (Endocrine: thyroid)",
+        "Göz cerrahisi (Eye)",
+        "Jinekolojik: Minör (Gynaecological: minor)",
+        "Ortopedik minör: Menisektomi (Orthopaedic minor - meniscectomy)",
+        "Rekonstrüktif cerrahi (Reconstructive)",
+        "Yüzeyel cerrahi (Superficial surgery)",
+        "Ürolojik minör: TUR-P (Transurethral resection of prostate)",
+        "VATS minör akciğer rezeksiyonu (VATS minor lung resection)",
+    ],
+    "Orta": [
+        "Karotis asemptomatik: CEA veya CAS (Carotid asymptomatic - CEA/CAS)",
+        "Karotis semptomatik: CEA (Carotid symptomatic - CEA)",
+        "Endovasküler AAA onarımı: EVAR (Endovascular aortic aneurysm repair)",
+        "Baş-boyun cerrahisi (Head or neck surgery)",
+        "İntraperitoneal: Splenektomi / Hiatal herni / Kolesistektomi (Intraperitoneal)",
+        "İntratorasik: Majör olmayan (Intrathoracic - non-major)",
+        "Nörolojik veya ortopedik majör: Kalça / Omurga (Major hip and spine surgery)",
+        "Periferik arter anjiyoplasti (Peripheral arterial angioplasty)",
+        "Renal transplant (Renal transplants)",
+        "Ürolojik veya jinekolojik majör (Urological or gynaecological - major)",
+    ],
+    "Yüksek": [
+        "Adrenal rezeksiyon (Adrenal resection)",
+        "Aort ve majör vasküler cerrahi (Aortic and major vascular surgery)",
+        "Karotis semptomatik: CAS (Carotid symptomatic - CAS)",
+        "Duodeno-pankreatik cerrahi (Duodenal-pancreatic surgery)",
+        "Karaciğer rezeksiyonu / Safra yolu cerrahisi (Liver resection / bile duct surgery)",
+        "Özofajektomi (Oesophagectomy)",
+        "Açık alt ekstremite revaskülarizasyonu (akut iskemi) veya amputasyon",
+        "Pnömonektomi (VATS veya açık) (Pneumonectomy)",
+        "Pulmoner veya karaciğer transplantı (Pulmonary or liver transplant)",
+        "Perfore barsak onarımı (Repair of perforated bowel)",
+        "Total sistektomi (Total cystectomy)",
+    ],
+}
+
+SURGERY_TO_RISK = {}
+SURGERY_OPTIONS = []
+for risk, items in SURGERY_TABLE5.items():
+    for it in items:
+        SURGERY_OPTIONS.append(it)
+        SURGERY_TO_RISK[it] = risk
+
+
+# ----------------------------
+# Clinical helpers
+# ----------------------------
+# İlaç sınıfı kontrolleri core/drug_classes üzerinden (ürün başına önceden hesaplanmış bitmask):
+# beta-bloker, non-DHP KKB, verapamil, edoksaban etkileşimli ilaçlar vb.
+# drug_classes fonksiyon içinde import edilir: modülün import'u katalog/otomat kurmaz.
+
+
+# ----------------------------
+# RCRI helpers
+# ----------------------------
+RCRI_ITEMS_TR = {
+    "high_risk_surgery": "Yüksek riskli cerrahi (intraperitoneal / intratorasik / suprainguinal vasküler)",
+    "ihd": "İskemik kalp hastalığı (MI/anjina/pozitif stres testi/nitrat/Q dalgası)",
+    "chf": "Kalp yetersizliği öyküsü (pulmoner ödem/PND/S3/raller vb.)",
+    "cva": "Serebrovasküler hastalık (inme/TIA)",
+    "dm_insulin": "İnsülin kullanan DM",
+    "cr_gt2": "Kreatinin >2.0 mg/dL (≈177 µmol/L)",
+}
+
+
+def calc_rcri(flags: dict) -> tuple[int, list[str]]:
+    positives = []
+    score = 0
+    for k, label in RCRI_ITEMS_TR.items():
+        if bool(flags.get(k, False)):
+            score += 1
+            positives.append(label)
+    return score, positives
+
+
+ACTIVE_CARDIAC_SYMPTOMS = ("Angina", "Senkop", "Kalp yetersizliği semptomu", "Dispne")
+
+
+def has_active_cardiac_symptoms(symptoms: list[str]) -> bool:
+    active_symptoms = [s for s in (symptoms or []) if s != "Yok"]
+    return any(s in active_symptoms for s in ACTIVE_CARDIAC_SYMPTOMS)
+
+
+def esc_rcri_pathway_summary(
+    surgery_risk: str,
+    rcri_score: int,
+    functional_capacity: str,
+    symptoms: list[str],
+    urgency: str,
+    has_hf: str,
+    lvef: str,
+) -> tuple[str, list[str]]:
+    """
+    ESC akışı özeti. Girdi uzayı sonlu (cerrahi risk × RCRI × MET × semptom var/yok × aciliyet);
+    sonuçlar esc_pathway_entry ile önbelleklenir. Dönen liste çağırana ait kopyadır.
+    """
+    text, workup = esc_pathway_entry(
+        surgery_risk, int(rcri_score), functional_capacity, has_active_cardiac_symptoms(symptoms), urgency
+    )
+    return text, list(workup)
+
+
+@lru_cache(maxsize=2048)
+def esc_pathway_entry(
+    surgery_risk: str,
+    rcri_score: int,
+    functional_capacity: str,
+    symptomatic: bool,
+    urgency: str,
+) -> tuple[str, tuple[str, ...]]:
+    """Tek (interned, değişmez) akış girdisi; core/cohort tablosu da bunu kullanır."""
+    text, workup = _esc_pathway_compute(surgery_risk, rcri_score, functional_capacity, symptomatic, urgency)
+    return sys.intern(text), tuple(sys.intern(w) for w in workup)
+
+
+def _esc_pathway_compute(
+    surgery_risk: str,
+    rcri_score: int,
+    functional_capacity: str,
+    symptomatic: bool,
+    urgency: str,
+) -> tuple[str, list[str]]:
+    high_risk_surg = surgery_risk == "Yüksek"
+    intermediate_surg = surgery_risk == "Orta"
+    low_surg = surgery_risk == "Düşük"
+
+    poor_fc = functional_capacity == "<4 MET"
+    unknown_fc = functional_capacity == "Bilinmiyor"
+
+    unstable_flag = bool(symptomatic)
+
+    workup: list[str] = []
+    pathway_lines: list[str] = []
+
+    if urgency == "Acil":
+        pathway_lines.append("Acil cerrahi → zaman kısıtlı; sadece sonucu değiştirecek (management-changing) testler.")
+        workup.append("12 derivasyonlu ECG + klinik değerlendirme (acil).")
+    else:
+        pathway_lines.append(
+            "Elektif/Time-sensitive → ESC risk katmanlama: cerrahi risk + RCRI + fonksiyonel kapasite + semptomlar."
+        )
+
+    if unstable_flag:
+        pathway_lines.append(
+            "Aktif/önemli semptom varsa → öncelik kardiyak stabilizasyon ve endikasyona göre ileri değerlendirme."
+        )
+        workup.append("Kardiyoloji değerlendirmesi (management-changing yaklaşım).")
+        workup.append("Endikasyona göre TTE (özellikle KY/dispne/üfürüm/EF bilinmiyor ise).")
+        if high_risk_surg or intermediate_surg:
+            workup.append("hs-troponin bazal + postop 48–72 saat izlem (merkez protokolüne göre).")
+            workup.append("BNP/NT-proBNP (risk katmanlaması için düşünülebilir).")
+        return "\n".join([f"- {x}" for x in pathway_lines]), workup
+
+    if low_surg and rcri_score == 0 and functional_capacity == "≥4 MET":
+        pathway_lines.append("Düşük cerrahi risk + RCRI 0 + ≥4 MET → ek kardiyak test genellikle gerekmez.")
+        workup.append("Standart perioperatif izlem + bazal ECG (gerektiğinde).")
+        return "\n".join([f"- {x}" for x in pathway_lines]), workup
+
+    if high_risk_surg or intermediate_surg or rcri_score >= 1 or poor_fc or unknown_fc:
+        pathway_lines.append(f"Risk artırıcı faktör(ler): cerrahi={surgery_risk}, RCRI={rcri_score}, MET={functional_capacity}.")
+        workup.append("12 derivasyonlu ECG (bazal).")
+
+        if high_risk_surg or intermediate_surg:
+            workup.append("hs-troponin bazal + postop 48–72 saat izlem (merkez protokolüne göre).")
+
+        if intermediate_surg or high_risk_surg or poor_fc or unknown_fc:
+            workup.append("Klinik/endikasyona göre TTE (EF/kapak hastalığı/dispne varlığında öncelikli).")
+
+        if high_risk_surg or rcri_score >= 2 or (poor_fc or unknown_fc):
+            workup.append(
+                "BNP/NT-proBNP (özellikle ≥65 yaş veya orta/yüksek risk cerrahide risk katmanlaması için düşünülebilir)."
+            )
+
+        if (high_risk_surg or rcri_score >= 2) and (poor_fc or unknown_fc) and urgency != "Acil":
+            workup.append(
+                "Efor kapasitesi düşük/bilinmiyor + yüksek/orta risk: sadece sonucu değiştirecekse non-invaziv iskemi testi düşünülebilir."
+            )
+
+        pathway_lines.append("Test seçimi: sadece sonucu/tedaviyi değiştirecek (management-changing) ise.")
+        return "\n".join([f"- {x}" for x in pathway_lines]), workup
+
+    pathway_lines.append("Düşük-orta risk profil → klinik değerlendirme + bazal ECG ile proceed.")
+    workup.append("12 derivasyonlu ECG (bazal).")
+    return "\n".join([f"- {x}" for x in pathway_lines]), workup
+
+
+def get_mech_valve_warfarin_note() -> str:
+    return "\n".join(
+        [
+            "MEKANİK KAPAK – WARFARİN YÖNETİMİ ve ENFEKTİF ENDOKARDİT PROFİLAKSİSİ (Otomatik Not)",
+            "- Warfarin operasyon tarihinden **5 gün önce kesilmelidir**.",
+            "- Operasyon sabahı hedef **INR < 1.5** olacak şekilde planlama yapılmalıdır.",
+            "- INR operasyon öncesi gün kontrol edilmelidir.",
+            "",
+            "Enfektif Endokardit Profilaksisi:",
+            "- Standart: **Amoksisilin 2 g PO** (işlemden 30–60 dk önce).",
+            "- Penisilin alerjisi varsa: **Klindamisin 600 mg PO** veya **Azitromisin 500 mg PO**.",
+            "",
+            "Postop Warfarin:",
+            "- Hemostaz sağlandıktan sonra genellikle **operasyondan 12–24 saat sonra** başlanabilir.",
+            "- Büyük kanama riski varsa **48–72 saate** ertelenebilir.",
+            "- Başlangıç dozu: hastanın **önceki stabil dozuna göre** başlanır.",
+            "",
+            "INR Hedefleri:",
+            "- Mekanik mitral kapak: **2.5–3.5**",
+            "- Mekanik aort kapak: **2.0–3.0**",
+            "- Atriyal fibrilasyon: **2.0–3.0**",
+            "",
+            "Bridging:",
+            "- **INR >2 olana kadar LMWH ile bridging uygulanır; INR >2 olduktan sonra LMWH kesilmesi uygundur.**",
+        ]
+    )
+
+
+def get_device_management_note(has_device: str, device_type: str, pace_dependent: str) -> str:
+    if has_device != "Evet":
+        return ""
+
+    dt = (device_type or "").strip()
+    pd = (pace_dependent or "").strip()
+
+    if dt not in {"Permanent pacemaker", "ICD", "CRT"}:
+        return "- Cihaz: Belirtilmedi.\n"
+
+    if pd not in {"Evet", "Hayır"}:
+        return f"- Cihaz: {dt}. Pace bağımlılığı belirtilmedi.\n"
+
+    if dt == "Permanent pacemaker":
+        if pd == "Evet":
+            return "- Cihaz: Permanent pacemaker. **Pace bağımlı** → **VOO 80 bpm** moduna alınmalı (perioperatif plan).\n"
+        return "- Cihaz: Permanent pacemaker. Pace bağımlı değil → **VVI 40 bpm** alınmalı (perioperatif plan).\n"
+
+    if pd == "Evet":
+        return f"- Cihaz: {dt}. **Pace bağımlı** → **Taşi-terapiler kapatılmalı** + **VOO 80 bpm** moduna alınmalı.\n"
+    return f"- Cihaz: {dt}. Pace bağımlı değil → **Taşi-terapiler kapatılmalı** + **VVI 40 bpm** alınmalı.\n"
+
+
+def _rate_control_bits(current_meds: list[str]) -> int:
+    """Hız kontrol metinlerinin okuduğu tek bilgi: beta-bloker / non-DHP KKB bitleri."""
+    from core.drug_classes import DrugClass, meds_class_mask
+
+    return int(meds_class_mask(current_meds) & (DrugClass.BETA_BLOCKER | DrugClass.NON_DHP_CCB))
+
+
+def get_bradycardia_meds_note(hr: int, has_hf: str, current_meds: list[str]) -> str:
+    if hr >= 60:
+        return ""
+    return _bradycardia_note(hr, has_hf, _rate_control_bits(current_meds))
+
+
+@lru_cache(maxsize=256)
+def _bradycardia_note(hr: int, has_hf: str, med_bits: int) -> str:
+    from core.drug_classes import DrugClass
+
+    if hr >= 60:
+        return ""
+
+    on_bb = bool(med_bits & DrugClass.BETA_BLOCKER)
+    on_non_dhp = bool(med_bits & DrugClass.NON_DHP_CCB)
+
+    if not (on_bb or on_non_dhp):
+        return ""
+
+    if has_hf != "Evet":
+        return (
+            "- Bradikardi (HR<60/dk) ve hız düşürücü ilaç kullanımı mevcut: "
+            "perioperatif dönemde hemodinami uygunsa beta-bloker ve/veya non-DHP KKB doz azaltımı "
+            "veya geçici kesilmesi (hold) uygundur.\n"
+        )
+
+    if on_bb:
+        return (
+            "- Bradikardi (HR<60/dk) mevcut: kalp yetersizliği varlığında perioperatif dönemde "
+            "beta-bloker doz azaltımı veya geçici kesilmesi (hold) hemodinamiye göre uygundur.\n"
+        )
+
+    return (
+        "- Bradikardi (HR<60/dk) mevcut: hemodinamiye göre hız düşürücü ajanların doz azaltımı "
+        "veya geçici kesilmesi (hold) düşünülebilir.\n"
+    )
+
+
+def get_doac_dose_warnings(
+    agent: str,
+    age: int,
+    egfr: float,
+    current_meds: list[str],
+    bleed_risk: str,
+    very_high_bleed: bool,
+) -> list[str]:
+    """Ajan/yaş/eGFR/etkileşim uyarıları; kurallar rules/doac_warnings.yaml'da (eşleşen tümü, sırayla)."""
+    from core.drug_classes import DrugClass, meds_class_mask
+    from core.registry import get_doac_warning_tool
+
+    med_mask = meds_class_mask(current_meds)
+    res = get_doac_warning_tool().evaluate(
+        {
+            "agent": agent,
+            "age": age,
+            "egfr": egfr,
+            "bleed_risk": bleed_risk,
+            "very_high_bleed": very_high_bleed,
+            "has_verapamil": bool(med_mask & DrugClass.VERAPAMIL),
+            "has_edox_interaction": bool(med_mask & DrugClass.EDOXABAN_INTERACTOR),
+        }
+    )
+    return [out.fields["text_tr"] for out in res.outputs]
+
+
+def get_interaction_warnings(current_meds: list[str]) -> list[str]:
+    """Tüm ilaç listesindeki etkileşimli etken madde çiftleri (rules/interactions.yaml), ağırlık sırasıyla."""
+    if not current_meds:
+        return []
+    from core.registry import get_interaction_index
+
+    return [hit.text_tr() for hit in get_interaction_index().check(current_meds)]
+
+
+def get_af_rate_control_text(has_af: str, hr: int, has_hf: str, lvef: str, current_meds: list[str]) -> str:
+    # ilaç listesi yalnızca iki sınıf bitine indirgenir -> aynı sınıftaki farklı ürünler aynı önbellek girdisi
+    med_bits = _rate_control_bits(current_meds) if (has_af == "Evet" or hr < 60) else 0
+    return _af_rate_control_text(has_af, hr, has_hf, lvef, med_bits)
+
+
+@lru_cache(maxsize=1024)
+def _af_rate_control_text(has_af: str, hr: int, has_hf: str, lvef: str, med_bits: int) -> str:
+    from core.drug_classes import DrugClass
+
+    brady_note = _bradycardia_note(hr, has_hf, med_bits)
+
+    if has_af != "Evet":
+        base = "- AF’ye yönelik hız kontrol önerisi: Endike değil.\n"
+        if brady_note:
+            base += brady_note
+        return base
+
+    if hr >= 110:
+        status = "kontrolsüz (yüksek ventrikül yanıtı)"
+    elif hr >= 90:
+        status = "kısmi kontrol"
+    else:
+        status = "kontrollü"
+
+    on_bb = bool(med_bits & DrugClass.BETA_BLOCKER)
+    on_non_dhp = bool(med_bits & DrugClass.NON_DHP_CCB)
+    hfrEF = (has_hf == "Evet" and lvef == "<40%")
+
+    lines = [f"- AF perioperatif hız kontrolü: Ventrikül yanıtı {status} (≈{hr}/dk)."]
+
+    if on_bb:
+        lines.append("- Mevcut tedavide beta-bloker mevcut: perioperatif dönemde hemodinami izin verdiği ölçüde sürdürülmesi uygundur.")
+    if on_non_dhp:
+        if hfrEF:
+            lines.append("- Non-DHP KKB (verapamil/diltiazem) mevcut: LVEF <40% olguda negatif inotropi nedeniyle dikkat/kaçınılması gerektiği hatırlatılır.")
+        else:
+            lines.append("- Non-DHP KKB (verapamil/diltiazem) mevcut: uygun hastada hız kontrolünde kullanılabilir; hipotansiyon/bradikardi açısından izlem önerilir.")
+
+    if hfrEF:
+        lines.append("- HFrEF varlığında non-DHP KKB’den kaçınma; hız kontrolünde beta-bloker ± digoksin; instabilitede amiodaron multidisipliner kararla düşünülebilir.")
+    else:
+        lines.append("- Hemodinami stabil hastada hız kontrolünde beta-bloker veya non-DHP KKB; instabilitede öncelik hemodinamik stabilizasyondur.")
+
+    if brady_note:
+        lines.append(brady_note.strip())
+
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# Antiplatelet monotherapy preop plan
+# ----------------------------
+def get_antiplatelet_monotherapy_preop_plan(agent: str, surgery_risk: str) -> str:
+    a = (agent or "").strip()
+    if surgery_risk in {"Düşük", "Orta"}:
+        return f"- Antiplatelet monoterapi ({a}): Cerrahi kanama riski **düşük/orta** → **ilaç devamı önerilir (kesilmez).**"
+    if surgery_risk == "Yüksek":
+        if a == "Aspirin":
+            return "- Antiplatelet monoterapi (Aspirin): Cerrahi kanama riski **yüksek** → **operasyondan 7 gün önce kes.**"
+        if a == "Klopidogrel":
+            return "- Antiplatelet monoterapi (Klopidogrel): Cerrahi kanama riski **yüksek** → **operasyondan 5 gün önce kes.**"
+        return "- Antiplatelet monoterapi: Ajan belirtilmedi (yüksek kanama riski)."
+    return "- Antiplatelet monoterapi: Cerrahi kanama riski belirlenemedi."
+
+
+def get_oac_monotherapy_hint(oac_agent: str) -> str:
+    a = (oac_agent or "").strip()
+    if not a or a == "Bilinmiyor":
+        return "- OAC monoterapi: Ajan seçilmedi → **Warfarin/Apiksaban/Rivaroksaban/Dabigatran/Edoksaban** seçeneklerinden biri seçilmeli."
+    return f"- OAC monoterapi: **{a}** (kesme/bridging/yeniden başlama planı Tool-2’ye göre oluşturulur)."
+
+
+# ----------------------------
+# Consultation note generator
+# ----------------------------
+# Not bölümlere ayrılır; her bölüm yalnızca okuduğu bağlam alanlarıyla anahtarlanan sınırlı bir
+# LRU önbellekte tutulur. Tek alan değişince (ör. TA) yalnızca o bölüm yeniden üretilir.
+# Tarih satırı önbelleğe alınmaz.
+NOTE_SECTION_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_patient_section(
+    age: Any,
+    sex: Any,
+    has_dm: Any,
+    has_ht: Any,
+    has_cad: Any,
+    has_af: Any,
+    has_mech_valve: Any,
+    has_hf: Any,
+    has_ckd: Any,
+    has_device: Any,
+    device_type: Any,
+    meds: tuple[str, ...],
+) -> str:
+    comorb = []
+    if has_dm == "Evet":
+        comorb.append("DM")
+    if has_ht == "Evet":
+        comorb.append("HT")
+    if has_cad == "Evet":
+        comorb.append("KAH/PCI öyküsü")
+    if has_af == "Evet":
+        comorb.append("AF")
+    if has_mech_valve == "Evet":
+        comorb.append("Mekanik kapak")
+    if has_hf == "Evet":
+        comorb.append("Kalp yetersizliği")
+    if has_ckd == "Evet":
+        comorb.append("CKD")
+    if has_device == "Evet":
+        comorb.append(f"Kardiyak cihaz ({device_type})")
+    comorb_text = ", ".join(comorb) if comorb else "Belirtilmedi"
+    meds_text = ", ".join(meds) if meds else "Belirtilmedi"
+
+    return (
+        "A) Hasta Bilgileri\n"
+        f"- Yaş/Cinsiyet: {age} / {sex}\n"
+        f"- Komorbiditeler: {comorb_text}\n"
+        f"- Mevcut ilaçlar: {meds_text}"
+    )
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_vitals_section(has_af: Any, hr_val: int, sbp: Any, dbp: Any) -> str:
+    rhythm_line = (
+        f"Atriyal fibrilasyon, ventrikül yanıtı yaklaşık {hr_val}/dk."
+        if has_af == "Evet"
+        else f"Sinüs ritmi, kalp hızı yaklaşık {hr_val}/dk."
+    )
+    return f"B) Vital Bulgular\n- Ritim: {rhythm_line}\n- TA (mmHg): {sbp}/{dbp}"
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_procedure_section(selected_surgery: Any, surgery_risk: Any, urgency: Any) -> str:
+    return (
+        "C) İşlem / Cerrahi Bilgisi\n"
+        f"- Planlanan işlem: {selected_surgery}\n"
+        f"- Cerrahi kardiyak risk (Table 5): {surgery_risk}\n"
+        f"- Cerrahi aciliyeti: {urgency}"
+    )
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_history_section(symptoms: tuple[str, ...], functional_capacity: Any) -> str:
+    symptom_text = ", ".join(symptoms) if symptoms and "Yok" not in symptoms else "Aktif kardiyak semptom tariflemiyor."
+    return (
+        "D) Kardiyak Öykü – Semptom / Fonksiyonel Kapasite\n"
+        f"- Semptomlar: {symptom_text}\n"
+        f"- Fonksiyonel kapasite: {functional_capacity}"
+    )
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_comorbidity_block(has_hf: Any, nyha: Any, lvef: Any, has_ckd: Any, egfr: Any) -> str:
+    hf_block = "- Kalp yetersizliği: Yok / bilinmiyor.\n"
+    if has_hf == "Evet":
+        hf_block = (
+            f"- Kalp yetersizliği: VAR (NYHA: {nyha}, LVEF: {lvef}).\n"
+            "- Perioperatif volüm/hemodinami: Hipovolemi ve hipervolemiden kaçınılmalı; sıvı yönetimi hedefe yönelik titrasyonla yürütülmelidir.\n"
+        )
+
+    ckd_block = "- Kronik böbrek hastalığı: Yok / bilinmiyor.\n"
+    if has_ckd == "Evet":
+        egfr = float(egfr or 0)
+        egfr_text = f"{egfr:.0f} ml/dk/1.73m²" if egfr > 0 else "bilinmiyor"
+        ckd_block = f"- Kronik böbrek hastalığı: VAR (eGFR: {egfr_text}). Nefrotoksik ajanlardan kaçınılmalı; elektrolit/volüm yakın izlenmelidir.\n"
+
+    return hf_block + ckd_block
+
+
+@lru_cache(maxsize=NOTE_SECTION_CACHE_SIZE)
+def _note_antithrombotic_section(
+    ant_strategy: Any,
+    pci_time: Any,
+    mono_oac_agent: Any,
+    mono_ap_agent: Any,
+    surgery_risk: Any,
+    aspirin_dose: Any,
+    p2y12_agent_ui: Any,
+) -> str:
+    if ant_strategy == "Monoterapi-OAC":
+        lines = [
+            "F1) Antitrombotik Tedavi",
+            f"- PCI zamanı: {pci_time}",
+            "- Strateji: Monoterapi (OAC)",
+            f"- Ajan: {mono_oac_agent}",
+            get_oac_monotherapy_hint(mono_oac_agent),
+        ]
+    elif ant_strategy == "Monoterapi-AP":
+        lines = [
+            "F1) Antitrombotik Tedavi",
+            f"- PCI zamanı: {pci_time}",
+            "- Strateji: Monoterapi (Antiplatelet)",
+            f"- Ajan: {mono_ap_agent}",
+            get_antiplatelet_monotherapy_preop_plan(mono_ap_agent, surgery_risk),
+        ]
+    elif ant_strategy == "DAPT (Tool-1)":
+        lines = [
+            "F1) Antitrombotik Tedavi",
+            f"- PCI zamanı: {pci_time}",
+            "- Strateji: DAPT (Tool-1)",
+            f"- Aspirin: {aspirin_dose}",
+            f"- P2Y12 inhibitörü: {p2y12_agent_ui}",
+        ]
+    else:
+        lines = ["F1) Antitrombotik Tedavi", "- Strateji: Belirtilmedi / uygulanmadı."]
+    return "F) Antitrombotik Yönetim\n" + "\n".join(lines)
+
+
+_NOTE_SECTION_CACHES = {
+    "patient": _note_patient_section,
+    "vitals": _note_vitals_section,
+    "procedure": _note_procedure_section,
+    "history": _note_history_section,
+    "comorbidity": _note_comorbidity_block,
+    "antithrombotic": _note_antithrombotic_section,
+    "rate_control": _af_rate_control_text,
+}
+
+
+def note_cache_info() -> dict[str, dict[str, int]]:
+    """Bölüm önbelleklerinin isabet/ıska sayıları (tanılama ve benchmark için)."""
+    out = {}
+    for name, fn in _NOTE_SECTION_CACHES.items():
+        ci = fn.cache_info()
+        out[name] = {"hits": ci.hits, "misses": ci.misses, "size": ci.currsize}
+    return out
+
+
+def clear_note_cache() -> None:
+    for fn in _NOTE_SECTION_CACHES.values():
+        fn.cache_clear()
+
+
+def generate_consultation_note(
+    context: Union[PatientContext, Mapping[str, Any]],
+    dapt_result: dict,
+    oac_text_block: str,
+    device_note: str,
+    rcri_block: str,
+    esc_pathway_block: str,
+    esc_workup_block: str,
+    interaction_lines: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Birleşik konsültasyon notu.
+    `interaction_lines`: çağıran etkileşimleri zaten kontrol ettiyse (denetim kaydı / JSON çıktısı için) aynı satırlar;
+    verilmezse burada get_interaction_warnings ile hesaplanır.
+    """
+    today = datetime.now().strftime("%d.%m.%Y")
+    get = context.get
+    hr_val = int(get("hr", 0) or 0)
+    meds = tuple(get("current_meds", []) or ())
+    has_af, has_hf, lvef = get("has_af"), get("has_hf"), get("lvef")
+
+    sections = [
+        f"PREOPERATİF KARDİYOLOJİ KONSÜLTASYON NOTU\nTarih: {today}",
+        _note_patient_section(
+            get("patient_age"),
+            get("patient_sex"),
+            get("has_dm"),
+            get("has_ht"),
+            get("has_cad"),
+            has_af,
+            get("has_mech_valve"),
+            has_hf,
+            get("has_ckd"),
+            get("has_device"),
+            get("device_type"),
+            meds,
+        ),
+        _note_vitals_section(has_af, hr_val, get("sbp"), get("dbp")),
+        _note_procedure_section(get("selected_surgery"), get("surgery_risk"), get("urgency")),
+        _note_history_section(tuple(get("symptoms", []) or ()), get("functional_capacity")),
+        f"E) Risk Katmanlama (ESC entegrasyonlu)\n{rcri_block}",
+        f"ESC yaklaşım şeması (özet):\n{esc_pathway_block}",
+        f"Önerilen yaklaşım / test seti (management-changing prensibi):\n{esc_workup_block}",
+        "E2) Klinik Değerlendirme (perioperatif kritik noktalar)\n"
+        + _note_comorbidity_block(has_hf, get("nyha"), lvef, get("has_ckd"), get("egfr", 0))
+        + f"\n{device_note}",
+        _note_antithrombotic_section(
+            get("antithrombotic_strategy", "—"),
+            get("pci_time", "—"),
+            get("mono_oac_agent", "Bilinmiyor"),
+            get("mono_ap_agent", "Bilinmiyor"),
+            get("surgery_risk"),
+            get("aspirin_dose"),
+            get("p2y12_agent_ui"),
+        ),
+        oac_text_block,
+        "G) Kılavuz Temelli Perioperatif Antitrombotik Plan (Tool-1 / DAPT)\n"
+        f"- Öneri: {dapt_result.get('recommendation_tr', '')}\n"
+        f"- Öneri sınıfı: {dapt_result.get('class', '')}",
+        "H) Ritim / Hız kontrolü ve perioperatif ilaç notu\n"
+        + get_af_rate_control_text(has_af=has_af, hr=hr_val, has_hf=has_hf, lvef=lvef, current_meds=list(meds)),
+    ]
+    if interaction_lines is None:
+        interaction_lines = get_interaction_warnings(list(meds))
+    if interaction_lines:
+        sections.append("H2) İlaç Etkileşimleri\n" + "\n".join(f"- {line}" for line in interaction_lines))
+    sections += [
+        "I) Sonuç / Plan\n"
+        "- Bu çıktı karar destek amaçlıdır; nihai klinik karar ilgili hekim değerlendirmesi ve multidisipliner ekip kararı ile verilecektir.",
+    ]
+    return "\n\n".join(sections)
+
+
+# ----------------------------
+# Note block assembly (app.py "Konsültasyon Notu" ile ortak)
+# ----------------------------
+TOOL1_INACTIVE_RESULT = {
+    "output_id": "tool1_inactive",
+    "recommendation_tr": "Tool-1 (DAPT) uygulanmadı (PCI ≥1 yıl veya KAH/PCI yok).",
+    "class": "",
+}
+
+TOOL2_INACTIVE_BLOCK = "F2) Oral Antikoagülasyon (Tool-2 / OAK-NOAC)\n- Tool-2 uygulanmadı: AF veya mekanik kapak yok."
+
+
+def map_oac_bleed_risk(bleed_risk_oac: str) -> str:
+    return "Düşük-Orta" if bleed_risk_oac in ["Minör", "Düşük-Orta"] else "Yüksek"
+
+
+def antithrombotic_strategy_for(has_cad: str, pci_time: str, has_af: str) -> str:
+    if has_cad != "Evet":
+        return "—"
+    if pci_time == "<1 yıl":
+        return "DAPT (Tool-1)"
+    return "Monoterapi-OAC" if has_af == "Evet" else "Monoterapi-AP"
+
+
+def build_oac_block(oac_res, dose_warnings: list[str], has_mech_valve: bool) -> str:
+    if has_mech_valve:
+        base_lines = [
+            "F2) Oral Antikoagülasyon (Tool-2 / OAK-NOAC)",
+            oac_res.summary_tr,
+            "",
+            get_mech_valve_warfarin_note(),
+        ]
+    else:
+        base_lines = [
+            "F2) Oral Antikoagülasyon (Tool-2 / OAK-NOAC)",
+            oac_res.summary_tr,
+            oac_res.stop_plan_tr,
+            oac_res.bridging_tr,
+            oac_res.restart_plan_tr,
+        ]
+
+    if dose_warnings:
+        base_lines += ["", "F2-Not) DOAC Doz / Kesme Uyarıları:", *[f"- {w}" for w in dose_warnings]]
+
+    return "\n".join([l for l in base_lines if l is not None and str(l).strip() != ""])
+
+
+def build_rcri_block(rcri_score: int, rcri_positives: list[str]) -> str:
+    return "\n".join(
+        [
+            f"- RCRI skoru: {rcri_score}/6",
+            ("- Pozitif kriter(ler): " + "; ".join(rcri_positives)) if rcri_positives else "- Pozitif kriter yok (RCRI 0).",
+        ]
+    )
+
+
+def build_workup_block(workup: list[str]) -> str:
+    return "\n".join([f"- {w}" for w in workup]) if workup else "- Ek test önerisi yok."
@@ -0,0 +1,153 @@
+# core/cohort.py
+"""
+Kohort ölçeğinde RCRI + ESC akışı.
+
+- RCRI: (n, 6) boolean matris -> tek vektörel toplam
+- ESC akışı: girdi uzayı sonlu (3 cerrahi risk × RCRI 0–6 × 3 MET × semptom var/yok × 3 aciliyet = 378);
+  her girdi bir kez hesaplanır, metinler intern edilir, hastalar yalnızca tablo id'si taşır
+- Tablo dışı değer (ör. bilinmeyen aciliyet) -> id -1, satır bazında skaler yola düşülür
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.clinical import RCRI_ITEMS_TR, esc_pathway_entry, has_active_cardiac_symptoms
+
+SURGERY_RISK_LEVELS = ("Düşük", "Orta", "Yüksek")
+FUNCTIONAL_CAPACITY_LEVELS = ("≥4 MET", "<4 MET", "Bilinmiyor")
+URGENCY_LEVELS = ("Elektif", "Time-sensitive", "Acil")
+RCRI_KEYS = tuple(RCRI_ITEMS_TR)
+RCRI_MAX = len(RCRI_KEYS)
+
+
+@dataclass
+class CohortResult:
+    """
+    evaluate_cohort çıktısı (satır başına):
+    - rcri_scores: 0..6
+    - pathway_ids: CohortRiskEngine tablosundaki girdi (-1 = tablo dışı, skaler hesap)
+    """
+    engine: "CohortRiskEngine"
+    rcri_scores: Any
+    pathway_ids: Any
+    surgery_risk: Sequence[Any]
+    functional_capacity: Sequence[Any]
+    symptomatic: Any
+    urgency: Sequence[Any]
+
+    def __len__(self) -> int:
+        return int(self.rcri_scores.shape[0])
+
+    def pathway(self, i: int) -> Tuple[str, Tuple[str, ...]]:
+        pid = int(self.pathway_ids[i])
+        if pid >= 0:
+            return self.engine.texts[pid], self.engine.workups[pid]
+        return esc_pathway_entry(
+            self.surgery_risk[i],
+            int(self.rcri_scores[i]),
+            self.functional_capacity[i],
+            bool(self.symptomatic[i]),
+            self.urgency[i],
+        )
+
+
+class CohortRiskEngine:
+    """Önceden hesaplanmış ESC akış tablosu + vektörel RCRI skorlaması (NumPy gerekir)."""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.workups: List[Tuple[str, ...]] = []
+        for risk in SURGERY_RISK_LEVELS:
+            for score in range(RCRI_MAX + 1):
+                for fc in FUNCTIONAL_CAPACITY_LEVELS:
+                    for symptomatic in (False, True):
+                        for urgency in URGENCY_LEVELS:
+                            text, workup = esc_pathway_entry(risk, score, fc, symptomatic, urgency)
+                            self.texts.append(text)
+                            self.workups.append(workup)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @staticmethod
+    def _codes(values: Sequence[Any], levels: Tuple[str, ...]):
+        import numpy as np
+
+        index: Dict[str, int] = {v: i for i, v in enumerate(levels)}
+        return np.fromiter((index.get(v, -1) for v in values), dtype=np.int16, count=len(values))
+
+    @staticmethod
+    def score_rcri(flags) -> Any:
+        """(n, 6) boolean matris (kolon sırası RCRI_KEYS) -> RCRI skorları."""
+        import numpy as np
+
+        m = np.asarray(flags, dtype=bool)
+        if m.ndim != 2 or m.shape[1] != RCRI_MAX:
+            raise ValueError(f"RCRI matrisi (n, {RCRI_MAX}) boyutunda olmalı: {m.shape}")
+        return m.sum(axis=1, dtype=np.int16)
+
+    @staticmethod
+    def rcri_matrix(flag_dicts: Iterable[Dict[str, Any]]) -> Any:
+        """calc_rcri girdisi (dict) listesinden (n, 6) boolean matris."""
+        import numpy as np
+
+        rows = [[bool(f.get(k, False)) for k in RCRI_KEYS] for f in flag_dicts]
+        return np.array(rows, dtype=bool).reshape(len(rows), RCRI_MAX)
+
+    def pathway_ids(self, surgery_risk, rcri_scores, functional_capacity, symptomatic, urgency) -> Any:
+        import numpy as np
+
+        r = self._codes(surgery_risk, SURGERY_RISK_LEVELS).astype(np.int32)
+        f = self._codes(functional_capacity, FUNCTIONAL_CAPACITY_LEVELS).astype(np.int32)
+        u = self._codes(urgency, URGENCY_LEVELS).astype(np.int32)
+        s = np.asarray(symptomatic, dtype=bool).astype(np.int32)
+        score = np.asarray(rcri_scores, dtype=np.int32)
+
+        n_u = len(URGENCY_LEVELS)
+        n_f = len(FUNCTIONAL_CAPACITY_LEVELS)
+        ids = (((r * (RCRI_MAX + 1) + score) * n_f + f) * 2 + s) * n_u + u
+        valid = (r >= 0) & (f >= 0) & (u >= 0) & (score >= 0) & (score <= RCRI_MAX)
+        return np.where(valid, ids, -1)
+
+    def evaluate_cohort(
+        self,
+        surgery_risk: Sequence[str],
+        rcri_flags,
+        functional_capacity: Sequence[str],
+        symptoms: Sequence[Optional[List[str]]],
+        urgency: Sequence[str],
+    ) -> CohortResult:
+        """
+        Kohort değerlendirmesi; rcri_flags (n, 6) boolean matris veya calc_rcri dict'leri olabilir.
+        Sonuç satırları esc_rcri_pathway_summary ile birebir aynıdır.
+        """
+        import numpy as np
+
+        if not hasattr(rcri_flags, "shape") and len(rcri_flags) and isinstance(rcri_flags[0], dict):
+            rcri_flags = self.rcri_matrix(rcri_flags)
+        scores = self.score_rcri(np.asarray(rcri_flags, dtype=bool).reshape(-1, RCRI_MAX))
+        symptomatic = np.fromiter(
+            (has_active_cardiac_symptoms(s) for s in symptoms), dtype=bool, count=len(symptoms)
+        )
+        ids = self.pathway_ids(surgery_risk, scores, functional_capacity, symptomatic, urgency)
+        return CohortResult(
+            engine=self,
+            rcri_scores=scores,
+            pathway_ids=ids,
+            surgery_risk=surgery_risk,
+            functional_capacity=functional_capacity,
+            symptomatic=symptomatic,
+            urgency=urgency,
+        )
+
+
+_engine: Optional[CohortRiskEngine] = None
+
+
+def get_cohort_engine() -> CohortRiskEngine:
+    """Süreç başına tek tablo (378 girdi; kurulum bir kez)."""
+    global _engine
+    if _engine is None:
+        _engine = CohortRiskEngine()
+    return _engine
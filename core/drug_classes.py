@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from collections import deque
+from enum import IntFlag
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.catalog import CatalogTable, DrugCatalog, DrugProduct, fold_tr, get_catalog, on_publish, table_key
+
+
+class DrugClass(IntFlag):
+    """Farmakolojik sınıf bitleri (ürün başına önceden hesaplanır, çalışma anında OR'lanır)."""
+    NONE = 0
+    BETA_BLOCKER = 1 << 0
+    NON_DHP_CCB = 1 << 1
+    VERAPAMIL = 1 << 2
+    PGP_CYP3A4_INTERACTOR = 1 << 3
+    EDOXABAN_INTERACTOR = 1 << 4   # siklosporin/dronedaron/eritromisin/ketokonazol
+    ANTIPLATELET = 1 << 5
+    OAC = 1 << 6
+    NOAC = 1 << 7
+    VKA = 1 << 8
+    HEPARIN = 1 << 9
+    DIGOXIN = 1 << 10
+    AMIODARONE = 1 << 11
+
+
+# Etken madde kalıpları (TR + EN yazımlar); fold_tr sonrası alt-dizi eşleşmesi.
+# fold_tr 'x' -> 'ks' yaptığı için apixaban/apiksaban tek kalıpla yakalanır.
+CLASS_PATTERNS: Dict[DrugClass, Tuple[str, ...]] = {
+    DrugClass.BETA_BLOCKER: (
+        "metoprolol", "bisoprolol", "nebivolol", "carvedilol", "karvedilol", "propranolol",
+        "atenolol", "esmolol", "sotalol",
+    ),
+    DrugClass.NON_DHP_CCB: ("diltiazem", "verapamil"),
+    DrugClass.VERAPAMIL: ("verapamil",),
+    DrugClass.PGP_CYP3A4_INTERACTOR: (
+        "amiodaron", "dronedaron", "verapamil", "diltiazem", "kinidin", "quinidin",
+        "ketokonazol", "ketoconazol", "itrakonazol", "itraconazol", "vorikonazol", "voriconazol",
+        "posakonazol", "posaconazol", "klaritromisin", "clarithromycin", "eritromisin", "erythromycin",
+        "siklosporin", "ciclosporin", "cyclosporin", "takrolimus", "tacrolimus",
+        "ritonavir", "cobicistat", "kobisistat", "rifampisin", "rifampicin",
+        "karbamazepin", "carbamazepin", "fenitoin", "phenytoin", "fenobarbital", "phenobarbital",
+    ),
+    DrugClass.EDOXABAN_INTERACTOR: (
+        "siklosporin", "ciclosporin", "cyclosporin", "dronedaron",
+        "eritromisin", "erythromycin", "ketokonazol", "ketoconazol",
+    ),
+    DrugClass.ANTIPLATELET: (
+        "aspirin", "acetylsalicylic", "asetilsalisilik", "klopidogrel", "clopidogrel",
+        "prasugrel", "tikagrelor", "ticagrelor", "cilostazol", "silostazol", "dipyridamol", "dipiridamol",
+    ),
+    DrugClass.OAC: ("warfarin", "acenocoumarol", "apiksaban", "rivaroksaban", "edoksaban", "dabigatran"),
+    DrugClass.NOAC: ("apiksaban", "rivaroksaban", "edoksaban", "dabigatran"),
+    DrugClass.VKA: ("warfarin", "acenocoumarol", "asenokumarol"),
+    DrugClass.HEPARIN: ("heparin", "enoksaparin", "dalteparin", "tinzaparin", "nadroparin", "fondaparin"),
+    DrugClass.DIGOXIN: ("digoksin",),
+    DrugClass.AMIODARONE: ("amiodaron",),
+}
+
+
+class ClassAutomaton:
+    """
+    Aho-Corasick çoklu kalıp otomatı: metin tek geçişte taranır, eşleşen bitler OR'lanır.
+    Anahtarlar bit maskeleridir (DrugClass veya core.interactions etken madde bitleri).
+    """
+
+    def __init__(self, patterns: Dict[int, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[int] = [0]
+
+        for klass, pats in patterns.items():
+            for pat in pats:
+                self._add(fold_tr(pat), int(klass))
+
+        # BFS ile fail bağlantıları; çıkış maskeleri fail zinciri boyunca birleştirilir
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def _add(self, pat: str, mask: int) -> None:
+        state = 0
+        for ch in pat:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+            state = nxt
+        self._out[state] |= mask
+
+    def scan(self, folded_text: str) -> int:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        mask = 0
+        for ch in folded_text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            mask |= out[state]
+        return mask
+
+
+_automaton = ClassAutomaton(CLASS_PATTERNS)
+
+
+@lru_cache(maxsize=4096)
+def classify_text(text: str) -> int:
+    """Katalog dışı serbest metin (ör. 'Metoprolol') için sınıf maskesi."""
+    return _automaton.scan(fold_tr(text))
+
+
+def _scan_product(p: DrugProduct) -> int:
+    # etken madde ayrıştırılabildiyse o taranır (marka adındaki tesadüfi eşleşmeler önlenir), aksi halde tam ad
+    return _automaton.scan(fold_tr(p.ingredient or p.name))
+
+
+_class_tables = CatalogTable(_scan_product, key=table_key("classes", CLASS_PATTERNS))  # snapshot'a yazılır
+on_publish(_class_tables.carry)
+
+
+def build_class_table(catalog: DrugCatalog) -> List[int]:
+    """Katalogdaki her ürün için sınıf maskesi (ürün id ile hizalı; kaldırılmış ürünler 0)."""
+    return _class_tables.build(catalog)
+
+
+def get_class_table(catalog: DrugCatalog) -> Sequence[int]:
+    return _class_tables.get(catalog)
+
+
+def meds_class_mask(meds: Optional[Iterable[str]], catalog: Optional[DrugCatalog] = None) -> int:
+    """Hastanın ilaç listesi -> sınıf maskesi (katalog ürünleri için yalnızca tablo okuma + OR)."""
+    if not meds:
+        return 0
+    if catalog is None:
+        catalog = get_catalog()
+
+    table = get_class_table(catalog) if catalog is not None else None
+    mask = 0
+    for m in meds:
+        pid = catalog.by_name.get(m) if catalog is not None else None
+        mask |= table[pid] if pid is not None else classify_text(m)
+    return mask
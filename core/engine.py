@@ -1,8 +1,15 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import itertools
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 import yaml
 
+from core.records import FrozenRecord
+from core.result_cache import RESULT_CACHE, new_token
+from core.rule_compiler import CompiledRule, compile_when
+from core.rule_tool import compile_derived
+
 
 @dataclass
 class Question:
@@ -19,19 +26,79 @@ class OutputRule:
     when: str
     recommendation_tr: str
     klass: str
+    predicate: Optional[CompiledRule] = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class VisibilityDelta:
+    """
+    update_visibility sonucu (soru sırasıyla).
+    - shown / hidden: görünürlüğü değişen soru id'leri
+    - pruned: yeni gizlenen sorulardan silinen eski yanıtlar
+    """
+    shown: List[str] = field(default_factory=list)
+    hidden: List[str] = field(default_factory=list)
+    pruned: Dict[str, Any] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.shown or self.hidden)
+
+
+@dataclass
+class TruthTableReport:
+    """
+    Doğruluk tablosu derleme raporu.
+    - no_match: görünür soruların tümü yanıtlıyken hiçbir kurala uymayan kombinasyonlar (kural boşluğu)
+    - partial_no_match: görünür bir soru yanıtsızken uymayanlar (form doldurulurken beklenir)
+    - overlaps: birden fazla kurala uyan kombinasyonlar (ilk eşleşen kazanır)
+    """
+    size: int = 0
+    variables: List[str] = field(default_factory=list)
+    no_match: List[Dict[str, Any]] = field(default_factory=list)
+    partial_no_match: List[Dict[str, Any]] = field(default_factory=list)
+    overlaps: List[Tuple[Dict[str, Any], List[str]]] = field(default_factory=list)
+    fallback_reason: str = ""
+
+    @property
+    def enabled(self) -> bool:
+        return not self.fallback_reason
 
+    @property
+    def clean(self) -> bool:
+        """Tablo kurulmuş, kural boşluğu ve çoklu eşleşme yok."""
+        return self.enabled and not self.no_match and not self.overlaps
+
+    def summary_tr(self) -> str:
+        if not self.enabled:
+            return f"Doğruluk tablosu devre dışı: {self.fallback_reason}"
+        return (
+            f"Doğruluk tablosu: {self.size} kombinasyon ({', '.join(self.variables)}); "
+            f"eşleşmeyen: {len(self.no_match)} tam yanıtlı / {len(self.partial_no_match)} eksik yanıtlı, "
+            f"çoklu eşleşme: {len(self.overlaps)}"
+        )
+
+
+# Tablo boyutu bu sınırı aşarsa derlenmiş predicate değerlendirmesine dönülür
+TRUTH_TABLE_MAX_SIZE = 4096
 
 class DaptRuleEngine:
     """
     Minimal YAML-driven rule engine for Tool-1 (DAPT).
     - Reads rules/dapt.yaml
-    - Evaluates derived variable: high_thrombotic_risk
+    - Evaluates derived variables from the `derived:` section (e.g. high_thrombotic_risk; core/rule_tool formatı)
     - Returns the first matching output rule
+    - `when` ifadeleri yüklemede derlenir (core/rule_compiler); evaluate eval() çağırmaz
+    - precompute=True: sonlu yanıt uzayı yüklemede sayılır, evaluate tek tablo erişimi olur
+    - evaluate girdiyi değiştirmez; aynı yanıt kaydı süreç genelindeki sonuç önbelleğinden döner
     """
 
-    def __init__(self, yaml_path: str):
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            self.cfg = yaml.safe_load(f)
+    def __init__(self, yaml_path: str, *, precompute: bool = False, cfg: Optional[Dict[str, Any]] = None):
+        # cfg verilirse dosya tekrar okunmaz (core/registry zaten okuyup hash'lemiştir)
+        if cfg is None:
+            with open(yaml_path, "r", encoding="utf-8") as f:
+                cfg = yaml.safe_load(f)
+        self.yaml_path = yaml_path
+        self.cfg = cfg
 
         self.tool_id = self.cfg.get("tool_id")
         self.title_tr = self.cfg.get("title_tr")
@@ -48,6 +115,11 @@ class DaptRuleEngine:
                 )
             )
 
+        # visible_if bağımlılık grafiği: yanıt anahtarı -> kontrol ettiği soruların indeksleri
+        self._dependents: Dict[str, Tuple[int, ...]] = self._build_dependents()
+
+        self.derived = compile_derived(self.cfg.get("derived", []))
+
         self.outputs: List[OutputRule] = []
         for o in self.cfg.get("outputs", []):
             self.outputs.append(
@@ -56,9 +128,19 @@ class DaptRuleEngine:
                     when=o["when"],
                     recommendation_tr=o["recommendation_tr"].strip(),
                     klass=o.get("class", "").strip(),
+                    predicate=compile_when(o["when"]),
                 )
             )
 
+        # (ad, taban, değer->basamak) ; tablo: anahtar -> OutputRule | None
+        self._table_vars: List[Tuple[str, int, Dict[Any, int]]] = []
+        self._table: Optional[List[Optional[OutputRule]]] = None
+        self.truth_table_report: Optional[TruthTableReport] = None
+        if precompute:
+            self.truth_table_report = self._build_truth_table()
+
+        self.cache_token = new_token()  # yeniden yüklenen motor eski önbellek kayıtlarını görmez
+
     @staticmethod
     def _is_visible(visible_if: Optional[Dict[str, str]], answers: Dict[str, Any]) -> bool:
         if not visible_if:
@@ -68,34 +150,189 @@ class DaptRuleEngine:
                 return False
         return True
 
-    @staticmethod
-    def _compute_high_thrombotic_risk(answers: Dict[str, Any]) -> str:
-        pci = answers.get("pci_lt_1m") == "Evet"
-        acs = answers.get("acs_lt_3m") == "Evet"
-        st = answers.get("high_stent_thrombosis_risk") == "Evet"
-        return "Evet" if (pci or acs or st) else "Hayır"
-
     def get_visible_questions(self, answers: Dict[str, Any]) -> List[Question]:
         return [q for q in self.questions if self._is_visible(q.visible_if, answers)]
 
-    def evaluate(self, answers: Dict[str, Any]) -> Dict[str, str]:
-        # derive high_thrombotic_risk only if high_bleeding_risk_ncs == "Evet"
-        if answers.get("high_bleeding_risk_ncs") == "Evet":
-            answers["high_thrombotic_risk"] = self._compute_high_thrombotic_risk(answers)
-        else:
-            answers["high_thrombotic_risk"] = "Hayır"
+    # --- incremental visibility ---
+    def _build_dependents(self) -> Dict[str, Tuple[int, ...]]:
+        deps: Dict[str, List[int]] = {}
+        for i, q in enumerate(self.questions):
+            for key in (q.visible_if or {}):
+                deps.setdefault(key, []).append(i)
+
+        # döngü kontrolü: gizlenen sorunun yanıtı silinince bağımlıları yeniden değerlendirilir,
+        # döngü olursa bu zincir sonlanmaz
+        state: Dict[str, int] = {}  # 1 = ziyarette, 2 = bitti
+
+        def visit(qid: str, path: List[str]) -> None:
+            if state.get(qid) == 2:
+                return
+            if state.get(qid) == 1:
+                cycle = path[path.index(qid):] + [qid]
+                raise ValueError(f"visible_if döngüsü: {' -> '.join(cycle)}")
+            state[qid] = 1
+            for j in deps.get(qid, ()):
+                visit(self.questions[j].id, path + [qid])
+            state[qid] = 2
+
+        for q in self.questions:
+            visit(q.id, [])
+        return {k: tuple(v) for k, v in deps.items()}
 
-        # safe eval context
-        ctx = dict(answers)
+    def visible_ids(self, answers: Dict[str, Any]) -> Set[str]:
+        """Tam hesap (ilk yükleme / kural seti değişince); sonrasında update_visibility kullanılır."""
+        return {q.id for q in self.questions if self._is_visible(q.visible_if, answers)}
 
+    def questions_for(self, visible: Set[str]) -> List[Question]:
+        return [q for q in self.questions if q.id in visible]
+
+    def update_visibility(
+        self,
+        visible: Set[str],
+        answers: Dict[str, Any],
+        changed: Iterable[str],
+        *,
+        prune: bool = True,
+    ) -> VisibilityDelta:
+        """
+        Yalnızca `changed` anahtarlarına bağlı soruları yeniden değerlendirir; `visible` yerinde güncellenir.
+        - Maliyet formun boyutuna değil, değişikliğin etkilediği soru sayısına bağlıdır
+        - prune=True: yeni gizlenen sorunun yanıtı answers'tan silinir ve bu silme de
+          değişiklik sayılarak bağımlı sorulara yayılır
+        """
+        before: Dict[int, bool] = {}
+        queue = deque(changed)
+        pruned: Dict[str, Any] = {}
+        while queue:
+            for i in self._dependents.get(queue.popleft(), ()):
+                q = self.questions[i]
+                was = q.id in visible
+                now = self._is_visible(q.visible_if, answers)
+                if was == now:
+                    continue
+                before.setdefault(i, was)
+                if now:
+                    visible.add(q.id)
+                else:
+                    visible.discard(q.id)
+                    if prune and q.id in answers:
+                        pruned[q.id] = answers.pop(q.id)
+                        queue.append(q.id)
+
+        delta = VisibilityDelta(pruned=pruned)
+        for i in sorted(before):
+            qid = self.questions[i].id
+            if (qid in visible) != before[i]:
+                (delta.shown if qid in visible else delta.hidden).append(qid)
+        return delta
+
+    def _derive(self, answers: Dict[str, Any]) -> None:
+        for d in self.derived:
+            answers[d.name] = d(answers)
+
+    def _match(self, answers: Dict[str, Any]) -> Optional[OutputRule]:
+        for rule in self.outputs:
+            if rule.predicate(answers) is True:
+                return rule
+        return None
+
+    # --- truth table ---
+    def _build_truth_table(self) -> TruthTableReport:
+        report = TruthTableReport()
+        by_id = {q.id: q for q in self.questions}
+
+        names: set[str] = set()
+        for d in self.derived:
+            names |= d.names
         for rule in self.outputs:
-            if eval(rule.when, {"__builtins__": {}}, ctx) is True:
-                return {
-                    "output_id": rule.id,
-                    "recommendation_tr": rule.recommendation_tr,
-                    "class": rule.klass,
-                    "high_thrombotic_risk": answers.get("high_thrombotic_risk", ""),
-                }
+            names |= rule.predicate.names
+        names -= {d.name for d in self.derived}
+
+        # soru sırasını koru (anahtar düzeni deterministik olsun)
+        ordered = [q.id for q in self.questions if q.id in names]
+        unknown = sorted(names - set(ordered))
+        if unknown:
+            report.fallback_reason = f"soru olmayan değişken(ler): {', '.join(unknown)}"
+            return report
+
+        domains: List[List[Any]] = []
+        for name in ordered:
+            q = by_id[name]
+            if q.qtype != "choice" or not q.options:
+                report.fallback_reason = f"sonlu olmayan soru tipi: {name} ({q.qtype})"
+                return report
+            # None = yanıtlanmamış (gizli soru)
+            domains.append([*q.options, None])
+
+        size = 1
+        for d in domains:
+            size *= len(d)
+        if size > TRUTH_TABLE_MAX_SIZE:
+            report.fallback_reason = f"yanıt uzayı çok büyük ({size} > {TRUTH_TABLE_MAX_SIZE})"
+            return report
+
+        table: List[Optional[OutputRule]] = [None] * size
+        for key, combo in enumerate(itertools.product(*domains)):
+            answers = {k: v for k, v in zip(ordered, combo) if v is not None}
+            complete = all(
+                name in answers or not self._is_visible(by_id[name].visible_if, answers)
+                for name in ordered
+            )
+            self._derive(answers)
+            matched = [r for r in self.outputs if r.predicate(answers) is True]
+            if not matched:
+                (report.no_match if complete else report.partial_no_match).append(answers)
+            else:
+                table[key] = matched[0]
+                if len(matched) > 1:
+                    report.overlaps.append((answers, [r.id for r in matched]))
+
+        self._table_vars = [
+            (name, len(d), {v: i for i, v in enumerate(d)}) for name, d in zip(ordered, domains)
+        ]
+        self._table = table
+        report.size = size
+        report.variables = ordered
+        return report
+
+    def _table_key(self, answers: Dict[str, Any]) -> int:
+        key = 0
+        for name, radix, digits in self._table_vars:
+            d = digits.get(answers.get(name), -1)
+            if d < 0:
+                return -1
+            key = key * radix + d
+        return key
+
+    def evaluate(self, answers: Mapping[str, Any]) -> Dict[str, str]:
+        """
+        Girdi değiştirilmez (dondurulmuş kayıt önerilir: core.records.FrozenRecord).
+        Sonuç core.result_cache'te yanıt kaydına göre tutulur; her çağrıya yeni bir dict döner.
+        """
+        record = answers if isinstance(answers, FrozenRecord) else FrozenRecord(answers)
+        result = RESULT_CACHE.get_or_compute(
+            (self.tool_id or "dapt", self.cache_token, record), lambda: self._evaluate(record)
+        )
+        return dict(result)
+
+    def _evaluate(self, record: Mapping[str, Any]) -> Dict[str, str]:
+        answers = dict(record)
+        self._derive(answers)
+
+        if self._table is not None:
+            key = self._table_key(answers)
+            # tablo dışı değer (ör. seçenek listesinde olmayan yanıt) -> predicate yolu
+            rule = self._table[key] if key >= 0 else self._match(answers)
+        else:
+            rule = self._match(answers)
+
+        if rule is not None:
+            return {
+                "output_id": rule.id,
+                "recommendation_tr": rule.recommendation_tr,
+                "class": rule.klass,
+                "high_thrombotic_risk": answers.get("high_thrombotic_risk", ""),
+            }
 
         return {
             "output_id": "no_match",
@@ -103,3 +340,28 @@ class DaptRuleEngine:
             "class": "",
             "high_thrombotic_risk": answers.get("high_thrombotic_risk", ""),
         }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="DAPT kural dosyasının doğruluk tablosu raporu (kural boşlukları / çakışmalar).")
+    ap.add_argument("yaml_path", nargs="?", default="rules/dapt.yaml")
+    ap.add_argument("--partial", action="store_true", help="eksik yanıtlı eşleşmeyen kombinasyonları da listele")
+    args = ap.parse_args(argv)
+
+    report = DaptRuleEngine(args.yaml_path, precompute=True).truth_table_report
+    print(report.summary_tr())
+    for answers in report.no_match:
+        print(f"  eşleşmeyen: {json.dumps(answers, ensure_ascii=False)}")
+    for answers, ids in report.overlaps:
+        print(f"  çoklu eşleşme {ids}: {json.dumps(answers, ensure_ascii=False)}")
+    if args.partial:
+        for answers in report.partial_no_match:
+            print(f"  eksik yanıtlı: {json.dumps(answers, ensure_ascii=False)}")
+    return 0 if report.clean else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,200 @@
+# core/interactions.py
+"""
+İlaç–ilaç etkileşim motoru (kurallar: rules/interactions.yaml).
+
+- Etken maddeler tamsayı id alır; etkileşimler seyrek komşuluk indeksinde tutulur:
+  id -> {komşu id: Interaction} (her çift iki yönde, tek kayıt)
+- İlaç -> etken madde id'leri: katalog ürünleri için ürün id'siyle hizalı maske tablosu
+  (CatalogTable, ilaç snapshot'ına yazılır; kombinasyon ürünleri birden fazla bit taşır), katalog dışı serbest metin için
+  aynı Aho-Corasick otomatı (core.drug_classes.ClassAutomaton)
+- check(): hastanın etken maddeleri için yalnızca kendi komşuluk listelerine bakılır
+  -> maliyet ilaç sayısıyla orantılı, tablo boyutundan bağımsız
+"""
+from __future__ import annotations
+
+import weakref
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from core.catalog import CatalogTable, DrugCatalog, DrugProduct, fold_tr, get_catalog, on_publish, table_key
+from core.drug_classes import ClassAutomaton
+
+SEVERITY_ORDER: Tuple[str, ...] = ("kontrendike", "majör", "orta")
+SEVERITY_LABEL_TR = {"kontrendike": "🛑 Kontrendike", "majör": "⚠️ Majör", "orta": "ℹ️ Orta"}
+_SEVERITY_RANK = {s: i for i, s in enumerate(SEVERITY_ORDER)}
+
+
+@dataclass(frozen=True)
+class Interaction:
+    a: str
+    b: str
+    severity: str
+    message_tr: str
+
+    @property
+    def rank(self) -> int:
+        return _SEVERITY_RANK[self.severity]
+
+
+@dataclass(frozen=True)
+class InteractionHit:
+    """
+    Hastada bulunan tek etkileşimli çift; meds_a / meds_b bu etken maddeyi içeren ilaçlar,
+    labels_a / labels_b metinde gösterilen kısa adları (katalog ürünü için marka).
+    """
+    interaction: Interaction
+    meds_a: Tuple[str, ...]
+    meds_b: Tuple[str, ...]
+    labels_a: Tuple[str, ...]
+    labels_b: Tuple[str, ...]
+
+    def text_tr(self) -> str:
+        it = self.interaction
+        return (
+            f"{SEVERITY_LABEL_TR[it.severity]} — {it.a} ({', '.join(self.labels_a)}) + "
+            f"{it.b} ({', '.join(self.labels_b)}): {it.message_tr}"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        it = self.interaction
+        return {
+            "a": it.a,
+            "b": it.b,
+            "severity": it.severity,
+            "message_tr": it.message_tr,
+            "meds_a": list(self.meds_a),
+            "meds_b": list(self.meds_b),
+        }
+
+
+def _iter_bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class InteractionIndex:
+    """rules/interactions.yaml'dan derlenmiş, değiştirilmez etkileşim indeksi."""
+
+    def __init__(self, cfg: Mapping[str, Any], *, source: str = ""):
+        where = source or "interactions"
+        ingredients = cfg.get("ingredients") or {}
+        if not isinstance(ingredients, Mapping) or not ingredients:
+            raise ValueError(f"{where}: 'ingredients' boş olamaz")
+
+        self.names: List[str] = [str(n) for n in ingredients]
+        self.ids: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+        patterns = {1 << i: [n, *(ingredients[n] or ())] for i, n in enumerate(self.names)}
+        self._automaton = ClassAutomaton(patterns)
+
+        self._adj: Dict[int, Dict[int, Interaction]] = {}
+        for k, spec in enumerate(cfg.get("interactions") or ()):
+            severity = spec.get("severity")
+            if severity not in _SEVERITY_RANK:
+                raise ValueError(f"{where}: interactions[{k}] geçersiz severity {severity!r} (beklenen: {SEVERITY_ORDER})")
+            message = str(spec.get("message_tr") or "").strip()
+            if not message:
+                raise ValueError(f"{where}: interactions[{k}] message_tr boş")
+            group_a = self._resolve_names(spec.get("a"), where, k)
+            if spec.get("b") is None:
+                pairs = [(x, y) for i, x in enumerate(group_a) for y in group_a[i + 1:]]
+            else:
+                pairs = [(x, y) for x in group_a for y in self._resolve_names(spec.get("b"), where, k)]
+            for x, y in pairs:
+                if x == y:
+                    raise ValueError(f"{where}: interactions[{k}] etken madde kendisiyle eşleşmiş: {self.names[x]}")
+                if y in self._adj.get(x, ()):
+                    raise ValueError(
+                        f"{where}: interactions[{k}] {self.names[x]} + {self.names[y]} çifti birden fazla tanımlı"
+                    )
+                record = Interaction(self.names[x], self.names[y], severity, message)
+                self._adj.setdefault(x, {})[y] = record
+                self._adj.setdefault(y, {})[x] = record
+
+        # aynı etken madde kalıplarıyla kurulmuş tablo ilaç snapshot'ında hazır bulunur
+        self._table = CatalogTable(self._scan_product, key=table_key("ingredients", patterns))
+        self.text_mask = lru_cache(maxsize=4096)(self._scan_text)
+        _live.add(self)
+
+    def _resolve_names(self, names: Any, where: str, k: int) -> List[int]:
+        if isinstance(names, str):
+            names = [names]
+        if not names:
+            raise ValueError(f"{where}: interactions[{k}] 'a' boş olamaz")
+        out = []
+        for n in names:
+            if n not in self.ids:
+                raise ValueError(f"{where}: interactions[{k}] tanımsız etken madde {n!r} (ingredients altında yok)")
+            out.append(self.ids[n])
+        return out
+
+    def __len__(self) -> int:
+        """Tanımlı etkileşimli çift sayısı."""
+        return sum(len(v) for v in self._adj.values()) // 2
+
+    def _scan_product(self, p: DrugProduct) -> int:
+        return self._automaton.scan(fold_tr(p.ingredient or p.name))
+
+    def _scan_text(self, text: str) -> int:
+        """Katalog dışı serbest metin (ör. 'Amiodaron') için etken madde maskesi."""
+        return self._automaton.scan(fold_tr(text))
+
+    def ingredient_mask(self, med: str, catalog: Optional[DrugCatalog] = None) -> int:
+        pid = catalog.by_name.get(med) if catalog is not None else None
+        return self._table.get(catalog)[pid] if pid is not None else self.text_mask(med)
+
+    def ingredients(self, med: str, catalog: Optional[DrugCatalog] = None) -> List[str]:
+        return [self.names[i] for i in _iter_bits(self.ingredient_mask(med, catalog))]
+
+    def check(self, meds: Iterable[str], catalog: Optional[DrugCatalog] = None) -> List[InteractionHit]:
+        """
+        Hastanın ilaç listesindeki tüm etkileşimli çiftler (kontrendike -> orta, sonra ada göre).
+        Her etken madde yalnızca kendi komşu listesiyle hastanın etken madde kümesinden küçük olanı gezer.
+        """
+        if catalog is None:
+            catalog = get_catalog()
+
+        owners: Dict[int, List[str]] = {}
+        labels: Dict[str, str] = {}
+        table = self._table.get(catalog) if catalog is not None else None
+        for med in dict.fromkeys(meds):
+            pid = catalog.by_name.get(med) if catalog is not None else None
+            if pid is None or table is None:
+                labels[med] = med
+                mask = self.text_mask(med)
+            else:
+                labels[med] = catalog.products[pid].brand or med  # type: ignore[union-attr]
+                mask = table[pid]
+            for i in _iter_bits(mask):
+                owners.setdefault(i, []).append(med)
+
+        adj = self._adj
+        hits: List[InteractionHit] = []
+        for i in owners:
+            nbrs = adj.get(i)
+            if not nbrs:
+                continue
+            if len(nbrs) <= len(owners):
+                pairs = [(j, it) for j, it in nbrs.items() if j > i and j in owners]
+            else:
+                pairs = [(j, nbrs[j]) for j in owners if j > i and j in nbrs]
+            for j, it in pairs:
+                a, b = (owners[i], owners[j]) if self.ids[it.a] == i else (owners[j], owners[i])
+                hits.append(
+                    InteractionHit(it, tuple(a), tuple(b), tuple(labels[m] for m in a), tuple(labels[m] for m in b))
+                )
+
+        hits.sort(key=lambda h: (h.interaction.rank, h.interaction.a, h.interaction.b))
+        return hits
+
+
+# canlı indekslerin katalog tabloları yeni katalog sürümüne artımlı taşınır
+_live: "weakref.WeakSet[InteractionIndex]" = weakref.WeakSet()
+
+
+@on_publish
+def _carry_ingredient_tables(catalog: DrugCatalog) -> None:
+    for index in list(_live):
+        index._table.carry(catalog)
@@ -1,7 +1,25 @@
 # core/oac_engine.py
-from dataclasses import dataclass
+from __future__ import annotations
 
-@dataclass
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Sequence, Union
+
+import yaml
+
+from core.result_cache import RESULT_CACHE, new_token
+from core.rule_compiler import RuleCompileError
+from core.rule_tool import RuleTool, ToolBatchResult, ToolResult
+
+# Bridging kategorileri (rules/oac.yaml `bridging` değerleri; evaluate_batch çıktısında kod olarak döner)
+BRIDGING_NOAC = 0
+BRIDGING_CONSIDER = 1
+BRIDGING_NONE = 2
+
+OAC_RULES_PATH = os.path.join("rules", "oac.yaml")
+
+
+@dataclass(frozen=True)
 class OacResult:
     summary_tr: str
     stop_plan_tr: str
@@ -10,72 +28,43 @@ class OacResult:
     cautions_tr: str
 
 
+_RESULT_FIELDS = tuple(f.name for f in fields(OacResult))
+# rules/oac.yaml türetilmiş sayısal kararları (timing(); denetim kaydı / analiz için)
+_TIMING_FIELDS = ("stop_hours", "restart_min_hours", "restart_max_hours", "bridging")
+
+
 class OacRuleEngine:
     """
     Tool-2 (OAK/NOAC) — perioperatif yönetim için kural motoru.
-    Bu sınıf, UI'dan gelen yapılandırılmış girdilerle TR plan üretir.
+    - Karar mantığı ve metinler rules/oac.yaml'da (core.rule_tool formatı)
+    - Bu sınıf UI'dan gelen yapılandırılmış girdileri araca verir ve OacResult'a çevirir
     """
 
-    def __init__(self, title_tr: str = "Tool-2: OAK/NOAC (Oral Antikoagülan)"):
-        self.title_tr = title_tr
-
-    # --- helpers ---
-    def _is_noac(self, agent: str) -> bool:
-        a = (agent or "").lower()
-        return any(x in a for x in ["apiksaban", "rivaroksaban", "edoksaban", "dabigatran"])
-
-    def _noac_last_dose_timing_hours(self, agent: str, egfr: float, bleed_risk: str, very_high: bool) -> int:
-        """
-        Basitleştirilmiş ESC yaklaşımı:
-        - Xa inhibitörleri (apiksaban/rivaroksaban/edoksaban): düşük/orta 24h, yüksek 48h (eGFR>=30 varsayımı)
-        - Dabigatran: renal fonksiyona duyarlı (>=50: 24/48; 30-49: 48/72-96)
-        - Çok yüksek kanama riski (spinal/epidural vb): ~5 yarı-ömür -> genelde 72-120h
-        """
-        a = (agent or "").lower()
-        egfr = float(egfr or 0)
-
-        if very_high:
-            # pratik: 96 saat (4 gün) default; dabigatran/ileri CKD'de 120 saate kadar uzar
-            if "dabigatran" in a and egfr and egfr < 50:
-                return 120
-            return 96
-
-        high = (bleed_risk == "Yüksek")
-
-        # Dabigatran
-        if "dabigatran" in a:
-            if egfr >= 50:
-                return 48 if high else 24
-            if 30 <= egfr < 50:
-                return 96 if high else 48
-            # eGFR <30: elektif girişim için uzman değerlendirmesi
-            return 120 if high else 96
-
-        # Xa inhibitörleri
-        if egfr and egfr < 30:
-            # elektif için uzat
-            return 72 if high else 48
-
-        return 48 if high else 24
-
-    def _restart_window_hours(self, bleed_risk: str, very_high: bool) -> tuple[int, int]:
-        """
-        Hemostaz sağlandıysa: düşük/orta 24h, yüksek 48-72h.
-        Çok yüksek riskte genelde 48-72h ve prosedüre göre daha geç olabilir.
-        """
-        if very_high:
-            return (48, 72)
-        if bleed_risk == "Yüksek":
-            return (48, 72)
-        return (24, 24)
-
-    def _bridging_text(self, agent: str, has_mech_valve: bool, high_te_risk: bool) -> str:
-        if self._is_noac(agent):
-            return "- Bridging: NOAC kullanan hastada rutin bridging önerilmez."
-        # VKA
-        if has_mech_valve and high_te_risk:
-            return "- Bridging: Mekanik kapak + yüksek tromboemboli riski varlığında UFH/LMWH ile bridging multidisipliner kararla düşünülebilir."
-        return "- Bridging: Düşük/orta trombotik riskte bridging önerilmez."
+    def __init__(self, yaml_path: str = OAC_RULES_PATH, *, cfg: Optional[Dict[str, Any]] = None):
+        # cfg verilirse dosya tekrar okunmaz (core/registry zaten okuyup hash'lemiştir)
+        if cfg is None:
+            with open(yaml_path, "r", encoding="utf-8") as f:
+                cfg = yaml.safe_load(f)
+        self.yaml_path = yaml_path
+        self.tool = RuleTool(cfg, source=yaml_path)
+        self.title_tr = self.tool.title_tr
+        self.cache_token = new_token()  # OacResult'lar araç sonuçlarından ayrı önbelleklenir
+
+        known = {d.name for d in self.tool.derived}
+        missing = [name for name in _TIMING_FIELDS if name not in known]
+        if missing:
+            raise RuleCompileError(f"{yaml_path}: türetilmiş değişken(ler) eksik: {', '.join(missing)}")
+        for rule in self.tool.outputs:
+            if set(rule.fields) != set(_RESULT_FIELDS):
+                raise RuleCompileError(
+                    f"{yaml_path}: outputs.{rule.id} alanları {', '.join(_RESULT_FIELDS)} olmalı"
+                )
+
+    def _to_result(self, res: ToolResult) -> OacResult:
+        out = res.first()
+        if out is None:
+            raise ValueError(f"{self.yaml_path}: girdilere uyan Tool-2 çıktısı yok")
+        return OacResult(**out.fields)
 
     # --- public API ---
     def evaluate(
@@ -89,43 +78,95 @@ class OacRuleEngine:
         has_mech_valve: bool,
         high_te_risk: bool
     ) -> OacResult:
+        key = self.tool.key(
+            {
+                "agent": agent,
+                "urgency": urgency,
+                "bleed_risk": bleed_risk,
+                "very_high_bleed": very_high_bleed,
+                "egfr": egfr,
+                "has_mech_valve": has_mech_valve,
+                "high_te_risk": high_te_risk,
+            }
+        )
+        # OacResult değiştirilemez: önbellekten doğrudan paylaşılır
+        return RESULT_CACHE.get_or_compute(
+            (self.tool.tool_id, self.cache_token, key), lambda: self._to_result(self.tool.evaluate_key(key))
+        )
+
+    def timing(self, **inputs: Any) -> Dict[str, int]:
+        """evaluate ile aynı girdiler -> stop_hours / restart_*_hours / bridging (araç önbelleğinden)."""
+        values = self.tool.evaluate(inputs).values
+        return {name: int(values[name]) for name in _TIMING_FIELDS}
+
+    def evaluate_batch(
+        self,
+        *,
+        agent: Sequence[str],
+        urgency: Union[str, Sequence[str]],
+        bleed_risk: Union[str, Sequence[str]],
+        very_high_bleed: Union[bool, Sequence[bool]],
+        egfr: Union[float, Sequence[float]],
+        has_mech_valve: Union[bool, Sequence[bool]],
+        high_te_risk: Union[bool, Sequence[bool]],
+    ) -> "OacBatchResult":
+        """
+        Kolon (dizi) girdilerle toplu değerlendirme. Skaler argümanlar tüm satırlara yayılır.
+        Yalnızca benzersiz girdi kombinasyonları değerlendirilir (RuleTool.evaluate_batch);
+        metin yalnızca result.render(i) ile üretilir. evaluate() ile aynı kararları verir.
+        """
+        import numpy as np  # opsiyonel bağımlılık: yalnızca toplu modda gerekir
+
+        rows = self.tool.evaluate_batch(
+            {
+                "agent": agent,
+                "urgency": urgency,
+                "bleed_risk": bleed_risk,
+                "very_high_bleed": very_high_bleed,
+                "egfr": egfr,
+                "has_mech_valve": has_mech_valve,
+                "high_te_risk": high_te_risk,
+            }
+        )
+        return OacBatchResult(
+            engine=self,
+            rows=rows,
+            agent=rows.column("agent", object),
+            urgency=rows.column("urgency", object),
+            bleed_risk=rows.column("bleed_risk", object),
+            egfr=rows.column("egfr", float),
+            is_noac=rows.column("is_noac", bool),
+            urgent=rows.column("urgent", bool),
+            stop_hours=rows.column("stop_hours", np.int16),
+            restart_min_hours=rows.column("restart_min_hours", np.int16),
+            restart_max_hours=rows.column("restart_max_hours", np.int16),
+            bridging=rows.column("bridging", np.int8),
+        )
+
 
-        agent = agent or "Bilinmiyor"
-        urgency = urgency or "Elektif"
-        bleed_risk = bleed_risk or "Düşük-Orta"
-
-        # Urgent: stop immediately
-        if urgency == "Acil":
-            summary = f"- Antikoagülasyon: {agent}. Acil cerrahi planlanıyor."
-            stop_plan = "- Öneri: NOAC/VKA derhal kesilir. Kanama riski yüksekse tersine çevirme (antidot/PCC) gereksinimi multidisipliner değerlendirilir."
-            restart = "- Hemostaz sağlandıktan sonra kanama riski ve cerrahi ekiple birlikte değerlendirilerek yeniden başlama planlanır."
-            bridging = self._bridging_text(agent, has_mech_valve, high_te_risk)
-            cautions = "- Not: Bu çıktı karar destek amaçlıdır; acil durumda hematoloji/anestezi ile birlikte hızlı yönetim önerilir."
-            return OacResult(summary, stop_plan, restart, bridging, cautions)
-
-        # Planned / Time-sensitive
-        if self._is_noac(agent):
-            h = self._noac_last_dose_timing_hours(agent, egfr, "Yüksek" if bleed_risk == "Yüksek" else "Düşük-Orta", very_high_bleed)
-            days = h // 24
-            hours = h % 24
-            h_txt = f"{days} gün" if hours == 0 else f"{days} gün {hours} saat" if days else f"{h} saat"
-
-            summary = f"- Antikoagülasyon: {agent} (NOAC)."
-            stop_plan = f"- Son doz zamanlaması: {bleed_risk} kanama riski ve eGFR≈{int(egfr) if egfr else 0} dikkate alınarak, elektif cerrahiden **{h_txt} önce** kesilmesi yeterlidir."
-            r0, r1 = self._restart_window_hours(bleed_risk, very_high_bleed)
-            if r0 == r1:
-                restart = f"- Yeniden başlama: Hemostaz sağlandıysa genellikle **{r0} saat** sonra tam doz tekrar başlanabilir."
-            else:
-                restart = f"- Yeniden başlama: Hemostaz sağlandıysa genellikle **{r0}–{r1} saat** sonra tam doz tekrar başlanabilir."
-            bridging = "- Bridging: NOAC kullanan hastada rutin bridging önerilmez."
-            cautions = "- Çok yüksek kanama riski (örn. spinal/epidural) varsa daha uzun kesme aralığı ve yeniden başlama için cerrahi/anestezi ile ortak karar önerilir."
-            return OacResult(summary, stop_plan, restart, bridging, cautions)
-
-        # VKA
-        summary = f"- Antikoagülasyon: {agent} (VKA/Warfarin varsayımı)."
-        stop_plan = "- Kesilme: Elektif cerrahi öncesi warfarin genellikle **5 gün önce** kesilir; hedef INR cerrahi tipine göre doğrulanır."
-        r0, r1 = self._restart_window_hours(bleed_risk, very_high_bleed)
-        restart = "- Yeniden başlama: Kanama kontrolü sağlanır sağlanmaz (çoğu olguda ilk 24 saat içinde) warfarin tekrar başlanır; terapötik INR’a kadar köprüleme ihtiyacı ayrıca değerlendirilir."
-        bridging = self._bridging_text(agent, has_mech_valve, high_te_risk)
-        cautions = "- INR izlemi ve bridging kararı trombotik/kanama riski dengesiyle, cerrahi/anestezi ile birlikte verilmelidir."
-        return OacResult(summary, stop_plan, restart, bridging, cautions)
+@dataclass
+class OacBatchResult:
+    """
+    evaluate_batch çıktısı (satır başına):
+    - stop_hours: son doz -> cerrahi arası saat (VKA: 120; Acil: 0 = derhal kes)
+    - restart_min_hours / restart_max_hours: yeniden başlama penceresi (Acil: -1 = ekip kararı)
+    - bridging: BRIDGING_NOAC / BRIDGING_CONSIDER / BRIDGING_NONE
+    """
+    engine: OacRuleEngine
+    rows: ToolBatchResult
+    agent: Any
+    urgency: Any
+    bleed_risk: Any
+    egfr: Any
+    is_noac: Any
+    urgent: Any
+    stop_hours: Any
+    restart_min_hours: Any
+    restart_max_hours: Any
+    bridging: Any
+
+    def __len__(self) -> int:
+        return int(self.stop_hours.shape[0])
+
+    def render(self, i: int) -> OacResult:
+        return self.engine._to_result(self.rows.result(i))
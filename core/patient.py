@@ -0,0 +1,57 @@
+# core/patient.py
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Mapping
+
+
+@dataclass
+class PatientContext:
+    """
+    Konsültasyon notu girdisi (app.py widget değerleri / core.batch kaydı).
+    Değerler UI ile aynı metin kodlarıdır ("Evet"/"Hayır", "≥4 MET", "—" ...).
+    generate_consultation_note hem bu sınıfı hem de aynı anahtarlı dict'i kabul eder.
+    """
+    patient_age: int = 55
+    patient_sex: str = "Erkek"
+    selected_surgery: str = ""
+    surgery_risk: str = "Orta"
+    urgency: str = "Elektif"
+    hr: int = 80
+    sbp: int = 130
+    dbp: int = 80
+    symptoms: List[str] = field(default_factory=lambda: ["Yok"])
+    functional_capacity: str = "≥4 MET"
+    has_hf: str = "Hayır"
+    nyha: str = "Bilinmiyor"
+    lvef: str = "Bilinmiyor"
+    has_af: str = "Hayır"
+    has_ckd: str = "Hayır"
+    egfr: float = 0.0
+    has_dm: str = "Hayır"
+    has_ht: str = "Hayır"
+    has_cad: str = "Hayır"
+    pci_time: str = "—"
+    antithrombotic_strategy: str = "—"
+    mono_ap_agent: str = "Aspirin"
+    mono_oac_agent: str = "Bilinmiyor"
+    has_mech_valve: str = "Hayır"
+    has_device: str = "Hayır"
+    device_type: str = "—"
+    pace_dependent: str = "—"
+    aspirin_dose: str = "—"
+    p2y12_agent_ui: str = "—"
+    current_meds: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "PatientContext":
+        """Bilinmeyen anahtarlar yok sayılır; eksik alanlar varsayılan değeri alır."""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get uyumlu erişim (not üretimi eski dict tabanlı bağlamla aynı kodu paylaşır)."""
+        return getattr(self, key, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
@@ -0,0 +1,235 @@
+# core/profiling.py
+"""
+İsteğe bağlı (opt-in) rerun zamanlayıcısı.
+
+    CAPE_PROFILE=1 streamlit run app.py
+    CAPE_SLOW_RERUN_MS=300 CAPE_SLOW_RERUN_LOG=logs/slow_reruns.jsonl ...
+
+- Script bölümleri ve motor çağrıları `section("ad")` ile perf_counter_ns üzerinden ölçülür
+- Aktif ölçüm thread-local tutulur (Streamlit her rerun'ı tek thread'de çalıştırır)
+- Bölüm başına kayan pencere p50/p95 (LatencyStats; core.api metrikleri de bunu kullanır)
+- Eşiği aşan rerun'lar JSONL olarak eklenir
+- Kapalıyken `section` boş bir context manager döner; ölçüm maliyeti yoktur
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+ENV_ENABLE = "CAPE_PROFILE"
+ENV_SLOW_MS = "CAPE_SLOW_RERUN_MS"
+ENV_LOG_PATH = "CAPE_SLOW_RERUN_LOG"
+
+DEFAULT_SLOW_MS = 250.0
+DEFAULT_LOG_PATH = os.path.join("logs", "slow_reruns.jsonl")
+LATENCY_WINDOW = 4096
+RECENT_TRACES = 50
+
+
+def enabled() -> bool:
+    return os.environ.get(ENV_ENABLE, "").strip().lower() in {"1", "true", "yes", "evet"}
+
+
+def slow_threshold_ms() -> float:
+    try:
+        return float(os.environ.get(ENV_SLOW_MS, DEFAULT_SLOW_MS))
+    except ValueError:
+        return DEFAULT_SLOW_MS
+
+
+def slow_log_path() -> str:
+    return os.environ.get(ENV_LOG_PATH) or DEFAULT_LOG_PATH
+
+
+# ----------------------------
+# Rolling percentiles
+# ----------------------------
+class LatencyStats:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples: Dict[str, Deque[float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.window = window
+        self._lock = threading.Lock()
+
+    def add(self, route: str, ms: float) -> None:
+        with self._lock:
+            self.samples.setdefault(route, deque(maxlen=self.window)).append(ms)
+            self.counts[route] = self.counts.get(route, 0) + 1
+
+    @staticmethod
+    def _pct(sorted_vals: list[float], p: float) -> float:
+        if not sorted_vals:
+            return 0.0
+        k = min(len(sorted_vals) - 1, max(0, int(round(p / 100.0 * (len(sorted_vals) - 1)))))
+        return round(sorted_vals[k], 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = [(route, sorted(vals), self.counts[route]) for route, vals in self.samples.items()]
+        out = {}
+        for route, s, count in items:
+            out[route] = {
+                "count": count,
+                "p50_ms": self._pct(s, 50),
+                "p95_ms": self._pct(s, 95),
+                "p99_ms": self._pct(s, 99),
+                "max_ms": round(s[-1], 3) if s else 0.0,
+            }
+        return out
+
+
+# ----------------------------
+# Per-rerun trace
+# ----------------------------
+@dataclass
+class SectionTiming:
+    name: str
+    start_ms: float      # rerun başlangıcına göre
+    duration_ms: float
+    depth: int           # iç içe bölüm seviyesi (0 = en dış)
+
+
+@dataclass
+class RerunTrace:
+    kind: str                    # "full" veya "fragment:<ad>"
+    started_at: float            # epoch saniye
+    total_ms: float
+    sections: List[SectionTiming] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RerunProfiler:
+    def __init__(self, kind: str = "full"):
+        self.kind = kind
+        self.started_at = time.time()
+        self._t0 = time.perf_counter_ns()
+        self._depth = 0
+        self._sections: List[SectionTiming] = []
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        depth = self._depth
+        start = time.perf_counter_ns()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            end = time.perf_counter_ns()
+            self._sections.append(SectionTiming(name, (start - self._t0) / 1e6, (end - start) / 1e6, depth))
+
+    def finish(self) -> RerunTrace:
+        total = (time.perf_counter_ns() - self._t0) / 1e6
+        sections = sorted(self._sections, key=lambda s: (s.start_ms, s.depth))
+        return RerunTrace(self.kind, self.started_at, total, sections)
+
+
+# ----------------------------
+# Process-wide state
+# ----------------------------
+STATS = LatencyStats()
+_recent: Deque[RerunTrace] = deque(maxlen=RECENT_TRACES)
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def active() -> Optional[RerunProfiler]:
+    return getattr(_local, "profiler", None)
+
+
+def begin(kind: str = "full") -> Optional[RerunProfiler]:
+    """Bu thread için yeni ölçüm başlatır (profil kapalıysa None); end() çağrılmadan kalan ölçüm atılır."""
+    if not enabled():
+        _local.profiler = None
+        return None
+    _local.profiler = RerunProfiler(kind)
+    return _local.profiler
+
+
+def end() -> Optional[RerunTrace]:
+    """Aktif ölçümü kapatır: istatistiklere ekler, eşik aşıldıysa JSONL'e yazar."""
+    prof = active()
+    if prof is None:
+        return None
+    _local.profiler = None
+    trace = prof.finish()
+    record(trace)
+    return trace
+
+
+def record(trace: RerunTrace) -> None:
+    STATS.add(f"rerun[{trace.kind}]", trace.total_ms)
+    for s in trace.sections:
+        STATS.add(s.name, s.duration_ms)
+    _recent.append(trace)
+    if trace.total_ms >= slow_threshold_ms():
+        log_slow_rerun(trace)
+
+
+def log_slow_rerun(trace: RerunTrace, path: Optional[str] = None) -> None:
+    path = path or slow_log_path()
+    line = json.dumps({"threshold_ms": slow_threshold_ms(), **trace.to_dict()}, ensure_ascii=False)
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError:
+        # salt-okunur dağıtım: log yazılamazsa ölçüm yine de panelde görünür
+        pass
+
+
+def recent_traces() -> List[RerunTrace]:
+    return list(_recent)
+
+
+def _in_fragment_rerun() -> bool:
+    """Yalnızca fragment'ların çalıştığı rerun mu (script gövdesi, dolayısıyla begin() çalışmaz)?"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return False
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def section(name: str):
+    """Aktif ölçüm varsa bölümü zamanlar; yoksa maliyetsiz boş context."""
+    prof = active()
+    return prof.section(name) if prof is not None else nullcontext()
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Fonksiyonu bölüm olarak ölçer. Tam rerun içinde çağrılırsa o rerun'ın bölümü olur;
+    tek başına çalışırsa (ör. fragment rerun) kendi ölçümünü "fragment:<ad>" olarak açar.
+    """
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if active() is not None:
+                if not _in_fragment_rerun():
+                    with section(name):
+                        return fn(*args, **kwargs)
+                # önceki tam rerun end()'e ulaşmadan kesilmiş (st.stop / hata): ölü ölçüm atılır
+                _local.profiler = None
+            if not enabled():
+                return fn(*args, **kwargs)
+            begin(f"fragment:{name}")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end()
+
+        return wrapper
+
+    return deco
@@ -0,0 +1,84 @@
+# core/records.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+
+_ATOMIC = frozenset({str, int, float, bool, type(None)})
+
+
+def freeze(value: Any) -> Any:
+    """list/tuple -> tuple, set -> frozenset, dict -> FrozenRecord (iç içe); diğerleri olduğu gibi."""
+    if type(value) in _ATOMIC:  # sıcak yol: yanıtlar neredeyse hep düz değer (ABC isinstance pahalı)
+        return value
+    if isinstance(value, FrozenRecord):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenRecord(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+class FrozenRecord(Mapping[str, Any]):
+    """
+    Değiştirilemez, hash'lenebilir girdi kaydı (kural motoru yanıtları / Tool girdileri).
+    - Mapping arayüzü: motorlar dict ile aynı şekilde okur (get, [] ...)
+    - Eşitlik/hash içerik üzerinden; aynı yanıtlar farklı hastalardan gelse de aynı önbellek anahtarı olur
+    - Güncelleme yerine replace(...) yeni kayıt döner
+    """
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, data: Optional[Mapping[str, Any]] = None, **kwargs: Any):
+        items = dict(data) if data else {}
+        if kwargs:
+            items.update(kwargs)
+        for k, v in items.items():
+            if type(v) not in _ATOMIC:
+                items[k] = freeze(v)
+        object.__setattr__(self, "_data", items)
+        object.__setattr__(self, "_hash", None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("FrozenRecord değiştirilemez; replace(...) kullanın")
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __hash__(self) -> int:
+        h = self._hash
+        if h is None:
+            h = hash(frozenset(self._data.items()))
+            object.__setattr__(self, "_hash", h)
+        return h
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FrozenRecord):
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self._data == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"FrozenRecord({self._data!r})"
+
+    def replace(self, **changes: Any) -> "FrozenRecord":
+        return FrozenRecord(self._data, **changes)
+
+    def thaw(self) -> Dict[str, Any]:
+        return dict(self._data)
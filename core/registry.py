@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import yaml
+
+from core.engine import DaptRuleEngine
+from core.interactions import InteractionIndex
+from core.oac_engine import OAC_RULES_PATH, OacRuleEngine
+from core.rule_tool import RuleTool
+
+logger = logging.getLogger(__name__)
+
+# (yaml_path, cfg) -> motor
+EngineFactory = Callable[[str, Dict[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class _Entry:
+    stamp: Tuple[int, int]  # (mtime_ns, size)
+    sha256: str
+    engine: Any
+    error: str = ""
+
+
+class RuleEngineRegistry:
+    """
+    Süreç genelinde (tüm Streamlit oturumları) paylaşılan kural motoru kayıt defteri.
+    - Her kural dosyası süreç başına bir kez okunur/derlenir
+    - get() çağrısında yalnızca os.stat (mtime + boyut) kontrol edilir
+    - mtime değişirse içerik hash'i karşılaştırılır; içerik gerçekten değiştiyse
+      motor yeniden derlenip tek atamayla (atomik) yerine konur
+    - Yeni YAML bozuksa eski motor sunulmaya devam eder (hata `last_error` ile okunur)
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path: str, factory: EngineFactory, *, kind: str = "") -> Any:
+        key = (kind or getattr(factory, "__qualname__", repr(factory)), os.path.abspath(path))
+        stamp = self._stamp(path)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.stamp == stamp:
+            return entry.engine
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                return entry.engine
+
+            with open(path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+
+            if entry is not None and entry.sha256 == digest:
+                # sadece mtime değişti (touch / aynı içerikle kaydetme)
+                self._entries[key] = _Entry(stamp, digest, entry.engine)
+                return entry.engine
+
+            try:
+                cfg = yaml.safe_load(raw.decode("utf-8"))
+                engine = factory(path, cfg)
+            except Exception as e:
+                if entry is None:
+                    raise
+                self._entries[key] = _Entry(stamp, entry.sha256, entry.engine, error=f"{type(e).__name__}: {e}")
+                return entry.engine
+
+            self._entries[key] = _Entry(stamp, digest, engine)
+            return engine
+
+    def rules_hash(self, path: str, *, kind: str) -> Optional[str]:
+        entry = self._entries.get((kind, os.path.abspath(path)))
+        return entry.sha256 if entry else None
+
+    def last_error(self, path: str, *, kind: str) -> str:
+        entry = self._entries.get((kind, os.path.abspath(path)))
+        return entry.error if entry else ""
+
+
+registry = RuleEngineRegistry()
+
+DAPT_RULES_PATH = "rules/dapt.yaml"
+DOAC_WARNINGS_RULES_PATH = os.path.join("rules", "doac_warnings.yaml")
+INTERACTIONS_RULES_PATH = os.path.join("rules", "interactions.yaml")
+
+
+def _load_dapt_engine(path: str, cfg: Dict[str, Any]) -> DaptRuleEngine:
+    # yükleme / yeniden yüklemede doğruluk tablosu özeti loglanır; kural boşluğu ya da çakışma uyarıdır
+    engine = DaptRuleEngine(path, precompute=True, cfg=cfg)
+    report = engine.truth_table_report
+    logger.log(logging.INFO if report.clean else logging.WARNING, "%s: %s", path, report.summary_tr())
+    return engine
+
+
+def get_dapt_engine(path: str = DAPT_RULES_PATH) -> DaptRuleEngine:
+    return registry.get(path, _load_dapt_engine, kind="dapt")
+
+
+def get_oac_engine(path: str = OAC_RULES_PATH) -> OacRuleEngine:
+    return registry.get(path, lambda p, cfg: OacRuleEngine(p, cfg=cfg), kind="oac")
+
+
+def get_rule_tool(path: str) -> RuleTool:
+    """Genel bildirimsel araç (core.rule_tool formatındaki herhangi bir YAML)."""
+    return registry.get(path, lambda p, cfg: RuleTool(cfg, source=p), kind="tool")
+
+
+def get_doac_warning_tool(path: str = DOAC_WARNINGS_RULES_PATH) -> RuleTool:
+    return get_rule_tool(path)
+
+
+def get_interaction_index(path: str = INTERACTIONS_RULES_PATH) -> InteractionIndex:
+    return registry.get(path, lambda p, cfg: InteractionIndex(cfg, source=p), kind="interactions")
@@ -0,0 +1,93 @@
+# core/result_cache.py
+"""
+Süreç genelinde, sınırlı (LRU) kural sonucu önbelleği — DAPT, Tool-2 ve NOAC uyarıları önünde.
+
+    CAPE_RESULT_CACHE_SIZE=8192      # 0 = kapalı
+
+- Anahtar: (tür, motor belirteci, dondurulmuş girdi kaydı); tür istatistiklerde ayrıştırılır
+- Motor belirteci her motor örneği için tekildir: kural dosyası yeniden yüklenince eski sonuçlar
+  eşleşmez ve LRU ile düşer
+- Değerler paylaşılır; çağıranlar değiştirmemelidir (motorlar değiştirilemez tipler ya da kopya döner)
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+ENV_SIZE = "CAPE_RESULT_CACHE_SIZE"
+DEFAULT_SIZE = 8192
+
+_tokens = itertools.count(1)
+_MISSING = object()
+
+
+def new_token() -> int:
+    """Motor örneği başına tekil önbellek belirteci (süreç ömrü boyunca tekrar kullanılmaz)."""
+    return next(_tokens)
+
+
+def _size_from_env() -> int:
+    try:
+        return max(0, int(os.environ.get(ENV_SIZE, DEFAULT_SIZE)))
+    except ValueError:
+        return DEFAULT_SIZE
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._stats: Dict[str, List[int]] = {}  # tür -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        kind = key[0]
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(key)
+                self._stats.setdefault(kind, [0, 0])[0] += 1
+                return value
+
+        value = compute()  # kilit dışında: eşzamanlı aynı anahtar en kötü iki kez hesaplanır
+
+        with self._lock:
+            self._stats.setdefault(kind, [0, 0])[1] += 1
+            if self.maxsize > 0:
+                self._data[key] = value
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._stats.clear()
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_kind = {k: (h, m) for k, (h, m) in self._stats.items()}
+            size = len(self._data)
+        hits = sum(h for h, _ in by_kind.values())
+        misses = sum(m for _, m in by_kind.values())
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "by_kind": {
+                k: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 4) if h + m else 0.0}
+                for k, (h, m) in sorted(by_kind.items())
+            },
+        }
+
+
+RESULT_CACHE = ResultCache(_size_from_env())
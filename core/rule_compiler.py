@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import ast
+import operator
+from typing import Any, Callable, Dict, FrozenSet, Mapping
+
+Predicate = Callable[[Mapping[str, Any]], Any]
+
+
+class RuleCompileError(ValueError):
+    """`when` ifadesi izin verilen alt kümenin dışında ya da sözdizimi hatalı."""
+
+
+def _ordered(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    # eksik değişken (None) sıralı karşılaştırmada TypeError yerine eşleşmeme döner: `egfr < 30` -> False
+    return lambda a, b: a is not None and b is not None and op(a, b)
+
+
+_COMPARE_OPS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: _ordered(operator.lt),
+    ast.LtE: _ordered(operator.le),
+    ast.Gt: _ordered(operator.gt),
+    ast.GtE: _ordered(operator.ge),
+    ast.In: lambda a, b: b is not None and a in b,
+    ast.NotIn: lambda a, b: b is None or a not in b,
+}
+
+_BIN_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+# ifadelerde çağrılabilen saf fonksiyonlar (ör. türetilmiş değişkenler: lower(agent), int(egfr))
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "lower": lambda s: str(s).lower(),
+    "strip": lambda s: str(s).strip(),
+    "int": int,
+    "float": float,
+    "abs": abs,
+    "min": min,
+    "max": max,
+}
+
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+
+
+class CompiledRule:
+    """
+    Tek bir `when` ifadesinin derlenmiş hali.
+    - fn(answers) -> değer (eval ile aynı anlamda)
+    - names: ifadenin okuduğu değişkenler
+    """
+
+    __slots__ = ("source", "fn", "names")
+
+    def __init__(self, source: str, fn: Predicate, names: FrozenSet[str]):
+        self.source = source
+        self.fn = fn
+        self.names = names
+
+    def __call__(self, answers: Mapping[str, Any]) -> Any:
+        return self.fn(answers)
+
+    def __repr__(self) -> str:
+        return f"CompiledRule({self.source!r})"
+
+
+def compile_when(source: str) -> CompiledRule:
+    """
+    `when` ifadesini kısıtlı AST'ye ayrıştırıp Python closure'larına çevirir.
+    İzin verilenler: karşılaştırmalar, and/or/not, değişken adları, literaller,
+    aritmetik (+ - * / // %), `a if koşul else b` ve FUNCTIONS içindeki çağrılar.
+    Diğer her şey (attribute, subscript, lambda, diğer çağrılar ...) RuleCompileError verir.
+    Eksik değişken None okunur; None içeren sıralı karşılaştırma (<, <=, >, >=) ve `in` eşleşmez.
+    """
+    if not isinstance(source, str) or not source.strip():
+        raise RuleCompileError(f"Boş veya geçersiz kural ifadesi: {source!r}")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleCompileError(f"Kural ifadesi ayrıştırılamadı: {source!r} ({e.msg})") from None
+
+    names: set[str] = set()
+    fn = _compile_node(tree.body, source, names)
+    return CompiledRule(source, fn, frozenset(names))
+
+
+def _compile_node(node: ast.AST, source: str, names: set[str]) -> Predicate:
+    if isinstance(node, ast.BoolOp):
+        parts = tuple(_compile_node(v, source, names) for v in node.values)
+        if isinstance(node.op, ast.And):
+            def _and(ans, parts=parts):
+                val = True
+                for p in parts:
+                    val = p(ans)
+                    if not val:
+                        return val
+                return val
+            return _and
+
+        def _or(ans, parts=parts):
+            val = False
+            for p in parts:
+                val = p(ans)
+                if val:
+                    return val
+            return val
+        return _or
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        inner = _compile_node(node.operand, source, names)
+        return lambda ans: not inner(ans)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        inner = _compile_node(node.operand, source, names)
+        return lambda ans: -inner(ans)
+
+    if isinstance(node, ast.BinOp):
+        fn = _BIN_OPS.get(type(node.op))
+        if fn is None:
+            raise RuleCompileError(f"İzin verilmeyen işlem ({type(node.op).__name__}): {source!r}")
+        left = _compile_node(node.left, source, names)
+        right = _compile_node(node.right, source, names)
+        return lambda ans: fn(left(ans), right(ans))
+
+    if isinstance(node, ast.IfExp):
+        test = _compile_node(node.test, source, names)
+        body = _compile_node(node.body, source, names)
+        orelse = _compile_node(node.orelse, source, names)
+        return lambda ans: body(ans) if test(ans) else orelse(ans)
+
+    if isinstance(node, ast.Call):
+        func = FUNCTIONS.get(node.func.id) if isinstance(node.func, ast.Name) else None
+        if func is None or node.keywords:
+            raise RuleCompileError(f"İzin verilmeyen fonksiyon çağrısı: {source!r}")
+        args = tuple(_compile_node(a, source, names) for a in node.args)
+        return lambda ans: func(*(a(ans) for a in args))
+
+    if isinstance(node, ast.Compare):
+        return _compile_compare(node, source, names)
+
+    if isinstance(node, ast.Name):
+        key = node.id
+        names.add(key)
+        return lambda ans: ans.get(key)
+
+    if isinstance(node, (ast.Constant, ast.Tuple, ast.List, ast.Set)):
+        value = _literal(node, source)
+        return lambda ans: value
+
+    raise RuleCompileError(
+        f"Kural ifadesinde izin verilmeyen yapı ({type(node).__name__}): {source!r}"
+    )
+
+
+def _compile_compare(node: ast.Compare, source: str, names: set[str]) -> Predicate:
+    ops = []
+    for op in node.ops:
+        fn = _COMPARE_OPS.get(type(op))
+        if fn is None:
+            raise RuleCompileError(f"İzin verilmeyen karşılaştırma ({type(op).__name__}): {source!r}")
+        ops.append(fn)
+
+    operands = [_compile_node(x, source, names) for x in [node.left, *node.comparators]]
+
+    # en sık durum: `ad == 'literal'` -> tek dict lookup
+    if len(ops) == 1 and isinstance(node.left, ast.Name) and isinstance(node.comparators[0], ast.Constant):
+        key = node.left.id
+        value = _literal(node.comparators[0], source)
+        op0 = ops[0]
+        if op0 is operator.eq:
+            return lambda ans: ans.get(key) == value
+        return lambda ans: op0(ans.get(key), value)
+
+    if len(ops) == 1:
+        left, right = operands
+        op0 = ops[0]
+        return lambda ans: op0(left(ans), right(ans))
+
+    # zincirleme karşılaştırma (a < b <= c)
+    chain = tuple(zip(ops, operands[1:]))
+    first = operands[0]
+
+    def _chain(ans):
+        left = first(ans)
+        for op, right_fn in chain:
+            right = right_fn(ans)
+            if not op(left, right):
+                return False
+            left = right
+        return True
+
+    return _chain
+
+
+def _literal(node: ast.AST, source: str) -> Any:
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, _LITERAL_TYPES):
+            raise RuleCompileError(f"İzin verilmeyen literal ({type(node.value).__name__}): {source!r}")
+        return node.value
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        return frozenset(_literal(e, source) for e in node.elts)
+    raise RuleCompileError(f"Literal bekleniyordu ({type(node).__name__}): {source!r}")
+
+
+# ----------------------------
+# Vektörel (NumPy) derleme — toplu değerlendirme için
+# ----------------------------
+def compile_vector(source: str) -> CompiledRule:
+    """
+    Aynı ifade alt kümesini NumPy kolonları üzerinde çalışan closure'a çevirir:
+    fn(columns) -> dizi (veya skaler; yayılır). and/or/not mantıksal (bool) sonuç döner.
+    Vektörleştirilemeyen yapı (ör. literal olmayan `in` sağ tarafı) RuleCompileError verir;
+    çağıran satır satır değerlendirmeye düşer.
+    """
+    import numpy as np  # opsiyonel bağımlılık: yalnızca toplu modda gerekir
+
+    if not isinstance(source, str) or not source.strip():
+        raise RuleCompileError(f"Boş veya geçersiz kural ifadesi: {source!r}")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleCompileError(f"Kural ifadesi ayrıştırılamadı: {source!r} ({e.msg})") from None
+
+    names: set[str] = set()
+    fn = _vector_node(np, tree.body, source, names)
+    return CompiledRule(source, fn, frozenset(names))
+
+
+def _per_unique(np, cols, arr, fn: Callable[[Any], Any]):
+    """
+    Metin dizisinde fn'i yalnızca benzersiz değerlere uygular (kolonlarda tekrar yüksek).
+    Ayrıştırma (unique + inverse) değerlendirme boyunca `cols` içinde dizi başına bir kez yapılır.
+    """
+    memo_key = ("__unique__", id(arr))
+    hit = cols.get(memo_key)
+    if hit is None:
+        a = np.asarray(arr, dtype=str)
+        uniq, inv = np.unique(a, return_inverse=True)
+        hit = cols[memo_key] = (arr, uniq.tolist(), inv.reshape(a.shape))
+    _, uniq, inv = hit
+    return np.asarray([fn(u) for u in uniq])[inv] if uniq else np.asarray(arr, dtype=str)
+
+
+def _vector_functions(np) -> Dict[str, Callable[..., Any]]:
+    # ilk argüman: değerlendirme kolonları (ara sonuç belleği)
+    return {
+        "lower": lambda cols, s: _per_unique(np, cols, s, str.lower),
+        "strip": lambda cols, s: _per_unique(np, cols, s, str.strip),
+        "int": lambda cols, x: np.trunc(np.asarray(x, dtype=float)).astype(np.int64),
+        "float": lambda cols, x: np.asarray(x, dtype=float),
+        "abs": lambda cols, x: np.abs(x),
+        "min": lambda cols, a, b: np.minimum(a, b),
+        "max": lambda cols, a, b: np.maximum(a, b),
+    }
+
+
+def _vector_node(np, node: ast.AST, source: str, names: set[str]) -> Predicate:
+    if isinstance(node, ast.BoolOp):
+        parts = tuple(_vector_node(np, v, source, names) for v in node.values)
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def _bool(cols, parts=parts, combine=combine):
+            val = parts[0](cols)
+            for p in parts[1:]:
+                val = combine(val, p(cols))
+            return np.asarray(val, dtype=bool)
+        return _bool
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        inner = _vector_node(np, node.operand, source, names)
+        return lambda cols: np.logical_not(inner(cols))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        inner = _vector_node(np, node.operand, source, names)
+        return lambda cols: np.negative(inner(cols))
+
+    if isinstance(node, ast.BinOp):
+        fn = _BIN_OPS.get(type(node.op))
+        if fn is None:
+            raise RuleCompileError(f"İzin verilmeyen işlem ({type(node.op).__name__}): {source!r}")
+        left = _vector_node(np, node.left, source, names)
+        right = _vector_node(np, node.right, source, names)
+        return lambda cols: fn(left(cols), right(cols))
+
+    if isinstance(node, ast.IfExp):
+        test = _vector_node(np, node.test, source, names)
+        body = _vector_node(np, node.body, source, names)
+        orelse = _vector_node(np, node.orelse, source, names)
+        return lambda cols: np.where(test(cols), body(cols), orelse(cols))
+
+    if isinstance(node, ast.Call):
+        func = _vector_functions(np).get(node.func.id) if isinstance(node.func, ast.Name) else None
+        if func is None or node.keywords:
+            raise RuleCompileError(f"İzin verilmeyen fonksiyon çağrısı: {source!r}")
+        args = tuple(_vector_node(np, a, source, names) for a in node.args)
+        return lambda cols: func(cols, *(a(cols) for a in args))
+
+    if isinstance(node, ast.Compare):
+        return _vector_compare(np, node, source, names)
+
+    if isinstance(node, ast.Name):
+        key = node.id
+        names.add(key)
+        return lambda cols: cols[key]
+
+    if isinstance(node, ast.Constant):
+        value = _literal(node, source)
+        return lambda cols: value
+
+    raise RuleCompileError(
+        f"Kural ifadesi vektörleştirilemiyor ({type(node).__name__}): {source!r}"
+    )
+
+
+def _vector_compare(np, node: ast.Compare, source: str, names: set[str]) -> Predicate:
+    parts = []
+    left_node = node.left
+    for op, right_node in zip(node.ops, node.comparators):
+        if isinstance(op, (ast.In, ast.NotIn)):
+            negate = isinstance(op, ast.NotIn)
+            if isinstance(right_node, (ast.Tuple, ast.List, ast.Set)):
+                # `x in ('a', 'b')` -> üyelik
+                members = sorted(_literal(right_node, source), key=repr)
+                left = _vector_node(np, left_node, source, names)
+                fn = lambda cols, left=left, members=members: np.isin(left(cols), members)  # noqa: E731
+            elif isinstance(left_node, ast.Constant) and isinstance(left_node.value, str):
+                # `'alt' in metin` -> alt dizi
+                sub = left_node.value
+                right = _vector_node(np, right_node, source, names)
+                fn = lambda cols, right=right, sub=sub: _per_unique(np, cols, right(cols), lambda s: sub in s).astype(bool)  # noqa: E731
+            else:
+                raise RuleCompileError(f"Kural ifadesi vektörleştirilemiyor (in): {source!r}")
+            if negate:
+                fn = lambda cols, fn=fn: np.logical_not(fn(cols))  # noqa: E731
+        else:
+            cmp = _COMPARE_OPS.get(type(op))
+            if cmp is None:
+                raise RuleCompileError(f"İzin verilmeyen karşılaştırma ({type(op).__name__}): {source!r}")
+            left = _vector_node(np, left_node, source, names)
+            right = _vector_node(np, right_node, source, names)
+            fn = lambda cols, left=left, right=right, cmp=cmp: cmp(left(cols), right(cols))  # noqa: E731
+        parts.append(fn)
+        left_node = right_node
+
+    if len(parts) == 1:
+        return parts[0]
+
+    def _chain(cols):
+        val = parts[0](cols)
+        for p in parts[1:]:
+            val = np.logical_and(val, p(cols))
+        return val
+    return _chain
@@ -0,0 +1,406 @@
+# core/rule_tool.py
+"""
+Bildirimsel (YAML) araç formatı ve ortak, bir kez derlenen motor.
+
+    tool_id: ...
+    title_tr: ...
+    match: first            # first: ilk eşleşen çıktı | all: eşleşen tüm çıktılar (sırayla)
+    inputs:                 # ad: {type: str|int|float|bool, default: ...}; None/"" -> default
+      egfr: {type: float, default: 0}
+    derived:                # sırayla hesaplanır; yalnızca girdilere ve önceki türetilmişlere bakabilir
+      - name: is_noac
+        expr: "'apiksaban' in lower(agent) or ..."
+      - name: stop_hours
+        cases:              # ilk doğru `when` kazanır; when yoksa her zaman eşleşir
+          - {when: "urgency == 'Acil'", value: 0}
+          - {when: "is_dabigatran and egfr >= 50", expr: "48 if high_bleed else 24"}
+        default: 24
+    outputs:                # id ve when dışındaki her anahtar bir metin şablonudur: "{agent} ..."
+      - id: ...
+        when: "..."
+        summary_tr: "- Antikoagülasyon: {agent}."
+
+- İfadeler core/rule_compiler ile derlenir (eval yok); şablonlardaki adlar yüklemede doğrulanır
+- evaluate sonuçları normalize girdi demetine göre core.result_cache'te tutulur; ToolResult değiştirilemez
+- evaluate_batch: ifadeler ilk çağrıda NumPy'a da derlenir; metin şablonları yalnızca result(i) ile üretilir
+"""
+from __future__ import annotations
+
+import string
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from core.result_cache import RESULT_CACHE, new_token
+from core.rule_compiler import CompiledRule, RuleCompileError, compile_vector, compile_when
+
+_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+
+
+class Template:
+    """`{ad}` alanlı metin şablonu; alan yoksa format çağrılmaz."""
+
+    __slots__ = ("source", "names")
+
+    def __init__(self, source: str):
+        self.source = source
+        names = set()
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise RuleCompileError(f"Şablon ayrıştırılamadı: {source!r} ({e})") from None
+        for _, name, _, _ in parsed:
+            if name is None:
+                continue
+            if not name.isidentifier():
+                raise RuleCompileError(f"Şablonda yalnızca düz değişken adı kullanılabilir: {source!r}")
+            names.add(name)
+        self.names = frozenset(names)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        return self.source.format_map(values) if self.names else self.source
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+@dataclass(frozen=True)
+class InputSpec:
+    name: str
+    type: str = "str"
+    default: Any = None
+
+    def coerce(self, value: Any) -> Any:
+        if value is None or (isinstance(value, str) and value == ""):
+            return self.default
+        if self.type == "float":
+            value = float(value)
+            return self.default if value != value else value  # NaN -> varsayılan
+        if self.type == "int":
+            return int(float(value))
+        return _TYPES[self.type](value)
+
+    def coercer(self) -> Callable[[Any], Any]:
+        """coerce ile aynı; sıcak yol için tipe özel closure (evaluate başına girdi sayısı kadar çağrılır)."""
+        default = self.default
+        if self.type == "str":
+            return lambda v: v if type(v) is str and v else (default if v is None or v == "" else str(v))
+        if self.type == "bool":
+            return lambda v: v if type(v) is bool else (default if v is None or v == "" else bool(v))
+        if self.type == "float":
+            coerce = self.coerce
+            return lambda v: v if type(v) is float and v == v else coerce(v)
+        return self.coerce
+
+    def coerce_column(self, column: Any):
+        """Kolonu tek tipli NumPy dizisine çevirir (skaler -> 0 boyutlu dizi)."""
+        import numpy as np
+
+        if self.type in ("float", "int"):
+            arr = np.asarray(column, dtype=float)
+            arr = np.nan_to_num(arr, nan=float(self.default or 0))
+            if self.type == "int":
+                arr = np.trunc(arr).astype(np.int64)
+            return arr
+        if self.type == "bool" and not self.default:
+            return np.asarray(column, dtype=bool)  # None/"" -> False, varsayılanla aynı
+        arr = np.asarray(column, dtype=object)
+        missing = (arr == None) | (arr == "")  # noqa: E711
+        return np.where(missing, self.default, arr).astype(bool if self.type == "bool" else str)
+
+
+# ----------------------------
+# Derived variables
+# ----------------------------
+_Row = Callable[[Mapping[str, Any]], Any]
+
+
+def _row_value(raw: Any, names: set) -> _Row:
+    """cases/default değeri: metin -> şablon, diğer -> literal."""
+    if isinstance(raw, str):
+        t = Template(raw)
+        if t.names:
+            names |= t.names
+            return t.render
+        raw = t.source
+    return lambda values, raw=raw: raw
+
+
+@dataclass
+class DerivedVar:
+    """
+    Türetilmiş değişken: `expr` ya da sıralı `cases` + `default`.
+    cases değerleri `value` (literal/şablon) veya `expr` olabilir.
+    """
+    name: str
+    fn: _Row
+    names: frozenset
+    spec: Mapping[str, Any]   # toplu mod için NumPy'a tembel derlenir
+
+    def __call__(self, values: Mapping[str, Any]) -> Any:
+        return self.fn(values)
+
+
+def compile_derived(entries: List[Mapping[str, Any]]) -> List[DerivedVar]:
+    out: List[DerivedVar] = []
+    for e in entries or []:
+        name = e.get("name")
+        if not name or not str(name).isidentifier():
+            raise RuleCompileError(f"Türetilmiş değişken adı geçersiz: {name!r}")
+        names: set[str] = set()
+        if "expr" in e:
+            expr = compile_when(e["expr"])
+            out.append(DerivedVar(name, expr.fn, expr.names, e))
+            continue
+
+        cases = []
+        for c in e.get("cases", []):
+            when = compile_when(c["when"]) if c.get("when") else None
+            if when is not None:
+                names |= when.names
+            if "expr" in c:
+                value = compile_when(c["expr"])
+                names |= value.names
+                cases.append((when.fn if when else None, value.fn))
+            else:
+                cases.append((when.fn if when else None, _row_value(c.get("value"), names)))
+        default = _row_value(e.get("default"), names)
+
+        def fn(values, cases=tuple(cases), default=default):
+            for when, value in cases:
+                if when is None or when(values):
+                    return value(values)
+            return default(values)
+
+        out.append(DerivedVar(name, fn, frozenset(names), e))
+    return out
+
+
+def _vector_value(raw: Any):
+    if isinstance(raw, str) and Template(raw).names:
+        raise RuleCompileError("alanlı şablon vektörleştirilmez")
+    return lambda cols, raw=raw: raw
+
+
+def compile_derived_vector(spec: Mapping[str, Any]):
+    """Türetilmiş değişkeni fn(kolonlar, n) -> dizi olarak derler (alanlı şablonlar: RuleCompileError)."""
+    import numpy as np
+
+    if "expr" in spec:
+        expr = compile_vector(spec["expr"])
+        return lambda cols, n: np.broadcast_to(np.asarray(expr(cols)), (n,))
+
+    conds, choices = [], []
+    for c in spec.get("cases", []):
+        conds.append(compile_vector(c["when"]) if c.get("when") else None)
+        choices.append(compile_vector(c["expr"]) if "expr" in c else _vector_value(c.get("value")))
+    default = _vector_value(spec.get("default"))
+
+    def fn(cols, n):
+        condlist = [
+            np.broadcast_to(np.asarray(w(cols) if w is not None else True, dtype=bool), (n,)) for w in conds
+        ]
+        choicelist = [np.broadcast_to(np.asarray(v(cols)), (n,)) for v in choices]
+        if not condlist:
+            return np.broadcast_to(np.asarray(default(cols)), (n,))
+        return np.select(condlist, choicelist, default=default(cols))
+
+    return fn
+
+
+# ----------------------------
+# Tool
+# ----------------------------
+@dataclass
+class ToolRule:
+    id: str
+    predicate: Optional[CompiledRule]
+    fields: Dict[str, Template]
+
+
+@dataclass(frozen=True)
+class ToolOutput:
+    id: str
+    fields: Mapping[str, str]    # salt okunur (MappingProxyType)
+
+
+@dataclass(frozen=True)
+class ToolResult:
+    tool_id: str
+    values: Mapping[str, Any]    # girdiler (normalize) + türetilmiş değişkenler; salt okunur
+    outputs: Tuple[ToolOutput, ...]
+
+    def first(self) -> Optional[ToolOutput]:
+        return self.outputs[0] if self.outputs else None
+
+
+class RuleTool:
+    """
+    YAML araç tanımını bir kez derler; evaluate(girdiler) -> ToolResult.
+    Yeni bir araç yeni bir yorumlayıcı değil, yalnızca yeni bir YAML dosyası gerektirir.
+    """
+
+    def __init__(self, cfg: Mapping[str, Any], *, source: str = ""):
+        self.source = source
+        self.cfg = cfg
+        self.tool_id = cfg.get("tool_id", "")
+        self.title_tr = cfg.get("title_tr", "")
+        self.match = cfg.get("match", "first")
+        if self.match not in ("first", "all"):
+            raise RuleCompileError(f"{self._where()}: match 'first' veya 'all' olmalı: {self.match!r}")
+
+        self.inputs: Dict[str, InputSpec] = {}
+        for name, spec in (cfg.get("inputs") or {}).items():
+            spec = spec or {}
+            itype = spec.get("type", "str")
+            if itype not in _TYPES:
+                raise RuleCompileError(f"{self._where()}: bilinmeyen girdi tipi {name}: {itype!r}")
+            default = spec.get("default")
+            self.inputs[name] = InputSpec(name, itype, None if default is None else _TYPES[itype](default))
+        self._coercers = tuple((name, spec.coercer()) for name, spec in self.inputs.items())
+
+        self.derived = compile_derived(cfg.get("derived", []))
+        known = set(self.inputs)
+        for d in self.derived:
+            self._check_names(f"derived.{d.name}", d.names, known)
+            known.add(d.name)
+        self._derived_fns = tuple((d.name, d.fn) for d in self.derived)
+
+        self.outputs: List[ToolRule] = []
+        for o in cfg.get("outputs", []):
+            predicate = compile_when(o["when"]) if o.get("when") else None
+            fields = {k: Template(str(v).strip()) for k, v in o.items() if k not in ("id", "when")}
+            used = set(predicate.names if predicate else ())
+            for t in fields.values():
+                used |= t.names
+            self._check_names(f"outputs.{o['id']}", used, known)
+            self.outputs.append(ToolRule(o["id"], predicate, fields))
+
+        self.cache_token = new_token()  # yeniden yüklenen araç eski önbellek kayıtlarını görmez
+        self._vector_plan: Optional[Tuple[list, Optional[list]]] = None
+
+    def _where(self) -> str:
+        return self.source or self.tool_id or "tool"
+
+    def _check_names(self, where: str, used: set, known: set) -> None:
+        unknown = sorted(set(used) - known)
+        if unknown:
+            raise RuleCompileError(f"{self._where()}: {where} tanımsız değişken(ler): {', '.join(unknown)}")
+
+    # --- evaluation ---
+    def key(self, inputs: Mapping[str, Any]) -> Tuple[Any, ...]:
+        """Normalize girdi demeti (girdi sırasıyla); önbellek anahtarı olarak kullanılır."""
+        return tuple([coerce(inputs.get(name)) for name, coerce in self._coercers])
+
+    def evaluate_key(self, key: Tuple[Any, ...]) -> ToolResult:
+        """key() demetinden önbelleksiz değerlendirme."""
+        values: Dict[str, Any] = dict(zip(self.inputs, key))
+        for name, fn in self._derived_fns:
+            values[name] = fn(values)
+
+        outputs: List[ToolOutput] = []
+        for rule in self.outputs:
+            if rule.predicate is None or rule.predicate(values):
+                fields = {k: t.render(values) for k, t in rule.fields.items()}
+                outputs.append(ToolOutput(rule.id, MappingProxyType(fields)))
+                if self.match == "first":
+                    break
+        return ToolResult(self.tool_id, MappingProxyType(values), tuple(outputs))
+
+    def _evaluate_cached(self, key: Tuple[Any, ...]) -> ToolResult:
+        return RESULT_CACHE.get_or_compute((self.tool_id, self.cache_token, key), lambda: self.evaluate_key(key))
+
+    def evaluate(self, inputs: Mapping[str, Any]) -> ToolResult:
+        """Bilinmeyen anahtarlar yok sayılır; eksik girdiler varsayılanı alır. Girdiler değiştirilmez."""
+        return self._evaluate_cached(self.key(inputs))
+
+    # --- batch ---
+    def _compile_vector_plan(self) -> Tuple[list, Optional[list]]:
+        if self._vector_plan is None:
+            derived = []
+            for d in self.derived:
+                try:
+                    derived.append((d.name, compile_derived_vector(d.spec)))
+                except RuleCompileError:
+                    derived.append((d.name, None))  # satır satır (result/column) hesaplanır
+            try:
+                outputs: Optional[list] = [
+                    compile_vector(r.predicate.source) if r.predicate is not None else None for r in self.outputs
+                ]
+            except RuleCompileError:
+                outputs = None
+            self._vector_plan = (derived, outputs)
+        return self._vector_plan
+
+    def evaluate_batch(self, columns: Mapping[str, Any]) -> "ToolBatchResult":
+        """
+        Kolon girdiler (dizi veya skaler; skaler tüm satırlara yayılır).
+        Türetilmiş değişkenler ve çıktı koşulları NumPy ile tüm satırlarda bir kez hesaplanır;
+        vektörleştirilemeyenler (alanlı şablonlar vb.) satır bazında, önbellekli evaluate ile üretilir.
+        """
+        import numpy as np
+
+        cols: Dict[str, Any] = {name: spec.coerce_column(columns.get(name)) for name, spec in self.inputs.items()}
+        n = max((a.shape[0] for a in cols.values() if a.ndim > 0), default=1)
+        for name, a in cols.items():
+            if a.ndim == 0:
+                cols[name] = np.broadcast_to(a, (n,))
+
+        derived, predicates = self._compile_vector_plan()
+        for name, vfn in derived:
+            if vfn is None:
+                continue
+            try:
+                cols[name] = vfn(cols, n)
+            except KeyError:
+                pass  # vektörleştirilemeyen bir değişkene bağlı
+
+        matched = None
+        if predicates is not None:
+            try:
+                matched = np.stack([
+                    np.broadcast_to(np.asarray(p(cols) if p is not None else True, dtype=bool), (n,))
+                    for p in predicates
+                ]) if predicates else np.zeros((0, n), dtype=bool)
+            except KeyError:
+                matched = None
+        columns_out = {k: v for k, v in cols.items() if isinstance(k, str)}  # ara sonuç belleği hariç
+        return ToolBatchResult(self, n, columns_out, matched)
+
+
+@dataclass
+class ToolBatchResult:
+    """
+    evaluate_batch çıktısı.
+    - columns: girdiler + vektörleştirilen türetilmiş değişkenler (satır dizileri)
+    - matched: (çıktı sayısı x satır) koşul matrisi; vektörleştirilemediyse None
+    """
+    tool: RuleTool
+    n: int
+    columns: Dict[str, Any]
+    matched: Any
+
+    def __len__(self) -> int:
+        return self.n
+
+    def result(self, i: int) -> ToolResult:
+        key = tuple(self.columns[name][i].item() for name in self.tool.inputs)
+        return self.tool._evaluate_cached(key)
+
+    def column(self, name: str, dtype: Any = None):
+        """Girdi/türetilmiş değişkeni satır dizisi olarak döner."""
+        import numpy as np
+
+        if name in self.columns:
+            return np.asarray(self.columns[name], dtype=dtype)
+        return np.asarray([self.result(i).values[name] for i in range(self.n)], dtype=dtype)
+
+    def output_index(self):
+        """match: first için satır başına eşleşen çıktının sırası (-1 = yok)."""
+        import numpy as np
+
+        if self.matched is None:
+            ids = {r.id: k for k, r in enumerate(self.tool.outputs)}
+            return np.asarray([ids[o.id] if (o := self.result(i).first()) else -1 for i in range(self.n)])
+        any_match = self.matched.any(axis=0)
+        return np.where(any_match, self.matched.argmax(axis=0), -1)
@@ -0,0 +1,76 @@
+# pages/1_Analiz.py
+"""
+Denetim kaydı analizi (salt okunur).
+- Yalnızca core/analytics özet tablolarını okur (consults taranmaz)
+- Veritabanına salt okunur (mode=ro) bağlanır; bu sayfa kayıt yazmaz
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import streamlit as st
+
+from core import analytics
+from core.audit import connect, db_path
+
+st.set_page_config(page_title="SynerCardioConsult – Analiz", page_icon="📊", layout="wide")
+st.title("Konsültasyon analizi")
+
+path = db_path()
+if not os.path.exists(path):
+    st.info(f"Henüz denetim kaydı yok ({path}). Not üretildikçe burada özetlenir.")
+    st.stop()
+
+c1, c2 = st.columns(2)
+since = c1.date_input("Başlangıç", value=None, key="an_since")
+until = c2.date_input("Bitiş (dahil)", value=None, key="an_until")
+since_s = since.isoformat() if since else None
+until_s = until.isoformat() if until else None
+
+try:
+    conn = connect(path, readonly=True)
+    try:
+        total = analytics.total_consults(conn, since_s, until_s)
+        daily = analytics.daily_counts(conn, since_s, until_s)
+        dapt = analytics.dapt_output_counts(conn, since_s, until_s)
+        oac = analytics.oac_stop_hours(conn, since_s, until_s)
+        rcri = analytics.rcri_by_surgery_risk(conn, since_s, until_s)
+    finally:
+        conn.close()
+except sqlite3.OperationalError as e:
+    # özet tabloları yoksa ilk yazma henüz gerçekleşmemiştir (kurulum yazıcı bağlantısında yapılır)
+    st.warning(f"Analiz tabloları okunamadı: {e}")
+    st.stop()
+
+st.metric("Konsültasyon", total)
+if daily:
+    st.line_chart({"gün": [d for d, _ in daily], "konsültasyon": [n for _, n in daily]}, x="gün", y="konsültasyon")
+
+st.subheader("Tool-1 (DAPT) çıktıları")
+if dapt:
+    st.bar_chart({"output_id": [o for o, _ in dapt], "sayı": [n for _, n in dapt]}, x="output_id", y="sayı")
+else:
+    st.caption("Kayıt yok.")
+
+st.subheader("Tool-2 kesme süresi (saat) — ajan × eGFR bandı")
+if oac:
+    hours = sorted({h for _, _, h, _ in oac})
+    table: dict = {}
+    for agent, band, h, n in oac:
+        row = table.setdefault((agent, band), {"ajan": agent, "eGFR": band, **{f"{x} sa": 0 for x in hours}})
+        row[f"{h} sa"] = n
+    st.dataframe(list(table.values()), hide_index=True, use_container_width=True)
+else:
+    st.caption("Kayıt yok.")
+
+st.subheader("RCRI skoru — cerrahi risk (ESC Tablo 5)")
+if rcri:
+    scores = sorted({s for _, s, _ in rcri})
+    table = {}
+    for risk, score, n in rcri:
+        row = table.setdefault(risk, {"cerrahi risk": risk, **{f"RCRI {x}": 0 for x in scores}})
+        row[f"RCRI {score}"] = n
+    st.dataframe(list(table.values()), hide_index=True, use_container_width=True)
+else:
+    st.caption("Kayıt yok.")
@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+os.chdir(ROOT)  # kurallar (rules/*.yaml) ve katalog (data/) göreli yollarla okunur
@@ -0,0 +1,54 @@
+# tests/grids.py
+"""
+Golden testlerin girdi ızgaraları. Kayıt betiği (record_golden.py) ve testler aynı sırayı üretir;
+golden dosyaları yalnızca çıktı indekslerini tutar (girdiler burada).
+"""
+from __future__ import annotations
+
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+OAC_AGENTS: List[Optional[str]] = [
+    "Apiksaban", "Rivaroksaban", "Edoksaban", "Dabigatran", "Warfarin", "Bilinmiyor", "", None, "DABIGATRAN 150 mg",
+]
+OAC_URGENCY: List[Optional[str]] = ["Elektif", "Zamana duyarlı", "Acil", None]
+OAC_BLEED: List[Optional[str]] = ["Minör", "Düşük-Orta", "Yüksek", None]
+OAC_EGFR: List[Optional[float]] = [None, 0, 10, 15, 29.5, 30, 45, 49, 49.5, 50, 51, 80]
+
+DOAC_AGENTS: List[Optional[str]] = [
+    "apiksaban", "Apixaban", "dabigatran", "Dabigatran eteksilat", "edoksaban", "Edoxaban",
+    "Rivaroksaban", "rivaroxaban", "Warfarin", "", None,
+]
+DOAC_AGES = [60, 75, 79, 80, 85]
+DOAC_EGFR: List[Optional[float]] = [None, 0, 14, 15, 29, 30, 45, 49, 50, 51, 80]
+DOAC_MEDS: List[List[str]] = [[], ["Verapamil"], ["Siklosporin"], ["Dronedarone", "Verapamil"], ["Amiodaron", "Ketokonazol"]]
+DOAC_BLEED = ["Düşük-Orta", "Yüksek"]
+
+
+def oac_grid() -> Iterator[Dict[str, Any]]:
+    for agent, urgency, bleed, very_high, egfr, mech, high_te in itertools.product(
+        OAC_AGENTS, OAC_URGENCY, OAC_BLEED, [False, True], OAC_EGFR, [False, True], [False, True]
+    ):
+        yield dict(
+            agent=agent,
+            urgency=urgency,
+            bleed_risk=bleed,
+            very_high_bleed=very_high,
+            egfr=egfr,
+            has_mech_valve=mech,
+            high_te_risk=high_te,
+        )
+
+
+def doac_warning_grid() -> Iterator[Dict[str, Any]]:
+    for agent, age, egfr, meds, bleed, very_high in itertools.product(
+        DOAC_AGENTS, DOAC_AGES, DOAC_EGFR, DOAC_MEDS, DOAC_BLEED, [False, True]
+    ):
+        yield dict(agent=agent, age=age, egfr=egfr, current_meds=list(meds), bleed_risk=bleed, very_high_bleed=very_high)
+
+
+def dapt_grid(questions: Sequence[Tuple[str, Sequence[str]]]) -> Iterator[Dict[str, str]]:
+    """Tüm soruların tüm seçenekleri + yanıtsız (anahtar yok)."""
+    ids = [qid for qid, _ in questions]
+    for combo in itertools.product(*[[*options, None] for _, options in questions]):
+        yield {qid: v for qid, v in zip(ids, combo) if v is not None}
@@ -0,0 +1,89 @@
+# tests/record_golden.py
+"""
+Golden çıktıları verilen kaynak ağacındaki uygulamadan kaydeder (testler mevcut uygulamayı bunlarla karşılaştırır).
+
+    git worktree add /tmp/prev_oac a4ae44a     # ortak kural formatından önceki Tool-2 / DOAC uyarıları
+    git worktree add /tmp/prev_dapt 0e55682    # derlenmiş when ifadelerinden önceki (eval) DAPT motoru
+    python tests/record_golden.py /tmp/prev_oac oac doac_warnings
+    python tests/record_golden.py /tmp/prev_dapt dapt
+
+Dosya: {"outputs": [tekil çıktılar], "index": [ızgara satırı başına çıktı indeksi]};
+kaynak uygulama istisna verdiyse çıktı {"error": "<istisna türü>"} olur.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(HERE, "golden")
+
+
+def _record(rows: Iterable[Any], fn: Callable[[Any], Any]) -> Dict[str, Any]:
+    outputs: List[Any] = []
+    seen: Dict[str, int] = {}
+    index: List[int] = []
+    for row in rows:
+        try:
+            out = fn(row)
+        except Exception as e:  # noqa: BLE001 - kaynak uygulamanın davranışı olduğu gibi kaydedilir
+            out = {"error": type(e).__name__}
+        key = json.dumps(out, ensure_ascii=False, sort_keys=True)
+        if key not in seen:
+            seen[key] = len(outputs)
+            outputs.append(out)
+        index.append(seen[key])
+    return {"outputs": outputs, "index": index}
+
+
+def record_oac() -> Dict[str, Any]:
+    from core.oac_engine import OacRuleEngine
+    from grids import oac_grid
+
+    engine = OacRuleEngine()
+    return _record(oac_grid(), lambda kw: vars(engine.evaluate(**kw)))
+
+
+def record_doac_warnings() -> Dict[str, Any]:
+    from core.clinical import get_doac_dose_warnings
+    from grids import doac_warning_grid
+
+    return _record(doac_warning_grid(), lambda kw: get_doac_dose_warnings(**kw))
+
+
+def record_dapt() -> Dict[str, Any]:
+    from core.engine import DaptRuleEngine
+    from grids import dapt_grid
+
+    engine = DaptRuleEngine(os.path.join("rules", "dapt.yaml"))
+    questions = [(q.id, list(q.options)) for q in engine.questions]
+    return {"questions": questions, **_record(dapt_grid(questions), lambda answers: engine.evaluate(dict(answers)))}
+
+
+RECORDERS = {"oac": record_oac, "doac_warnings": record_doac_warnings, "dapt": record_dapt}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Golden çıktıları bir kaynak ağacından kaydeder.")
+    ap.add_argument("tree", help="kaydedilecek uygulamanın kök dizini (ör. git worktree)")
+    ap.add_argument("names", nargs="+", choices=sorted(RECORDERS))
+    args = ap.parse_args(argv)
+
+    tree = os.path.abspath(args.tree)
+    sys.path[:0] = [tree, HERE]
+    os.chdir(tree)  # kurallar / katalog göreli yollarla okunur
+    for name in args.names:
+        data = RECORDERS[name]()
+        path = os.path.join(GOLDEN_DIR, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.write("\n")
+        print(f"{path}: {len(data['index'])} satır, {len(data['outputs'])} tekil çıktı")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+# tests/test_api.py
+"""Yerel JSON API: gerçek soket üzerinden (127.0.0.1, rastgele port) uçtan uca."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Tuple
+
+import pytest
+
+from core.api import ApiServer, make_executor
+
+
+@pytest.fixture(autouse=True)
+def _no_audit(monkeypatch):
+    monkeypatch.setenv("CAPE_AUDIT", "0")
+
+
+async def _request(port: int, raw: bytes) -> Tuple[int, Dict[str, Any]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    assert head, "boş yanıt"
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(body) if body else {}
+
+
+def _http(method: str, path: str, body: Any = None, *, raw_body: bytes = b"", length: Any = None) -> bytes:
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else raw_body
+    length = len(payload) if length is None else length
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n"
+    ).encode("latin-1") + payload
+
+
+def _serve(scenario):
+    """scenario(server) -> awaitable; sunucu ve süreç içi işçi her test için yeniden kurulur."""
+    executor = make_executor(0)
+
+    async def main():
+        server = ApiServer(executor, port=0)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def test_identical_inflight_requests_are_coalesced():
+    n = 8
+    body = {"answers": {"high_bleeding_risk_ncs": "Evet", "pci_lt_1m": "Evet", "can_defer_ncs": "Hayır"}}
+
+    async def scenario(server):
+        gate = threading.Event()
+        server.executor.submit(gate.wait)  # tek işçi meşgul: ilk istek kuyrukta bekler, diğerleri ona bağlanır
+        tasks = [asyncio.create_task(_request(server.port, _http("POST", "/v1/dapt", body))) for _ in range(n)]
+        for _ in range(500):
+            if server.coalesced >= n - 1:
+                break
+            await asyncio.sleep(0.01)
+        gate.set()
+        return server.coalesced, await asyncio.gather(*tasks)
+
+    coalesced, responses = _serve(scenario)
+    assert coalesced == n - 1
+    assert {status for status, _ in responses} == {200}
+    assert all(payload == responses[0][1] for _, payload in responses)
+    assert responses[0][1]["output_id"]
+
+
+@pytest.mark.parametrize(
+    "raw, status",
+    [
+        pytest.param(_http("POST", "/v1/interactions", raw_body=b"{not json"), 400, id="bad-json"),
+        pytest.param(_http("POST", "/v1/interactions", raw_body=b"[1, 2]"), 400, id="not-object"),
+        pytest.param(_http("POST", "/v1/interactions", {"current_meds": "Amiodaron"}), 400, id="meds-string"),
+        pytest.param(_http("POST", "/v1/interactions", {"current_meds": ["Amiodaron", 3]}), 400, id="meds-non-str"),
+        pytest.param(_http("POST", "/v1/doac-warnings", {"agent": "Apiksaban", "current_meds": "Amiodaron"}), 400, id="doac-meds-string"),
+        pytest.param(_http("POST", "/v1/interactions", length="abc"), 400, id="length-text"),
+        pytest.param(_http("POST", "/v1/interactions", length="-5"), 400, id="length-negative"),
+        pytest.param(_http("POST", "/v1/interactions", length=str(1 << 30)), 413, id="too-large"),
+        pytest.param(b"garbage\r\n\r\n", 400, id="bad-request-line"),
+        pytest.param(_http("GET", "/v1/yok"), 404, id="unknown-get"),
+        pytest.param(_http("POST", "/v1/yok", {}), 404, id="unknown-post"),
+        pytest.param(_http("GET", "/v1/dapt"), 405, id="get-on-post-route"),
+    ],
+)
+def test_error_statuses(raw, status):
+    got, payload = _serve(lambda server: _request(server.port, raw))
+    assert got == status
+    assert payload.get("error")
+
+
+def test_interactions_and_metrics():
+    async def scenario(server):
+        hit = await _request(server.port, _http("POST", "/v1/interactions", {"current_meds": ["Amiodaron", "Digoksin"]}))
+        health = await _request(server.port, _http("GET", "/v1/health"))
+        metrics = await _request(server.port, _http("GET", "/v1/metrics"))
+        return hit, health, metrics
+
+    (status, payload), health, (m_status, metrics) = _serve(scenario)
+    assert status == 200
+    assert [(h["a"], h["b"]) for h in payload["interactions"]] == [("digoxin", "amiodarone")]
+    assert health == (200, {"status": "ok"})
+    assert m_status == 200
+    assert metrics["routes"]["/v1/interactions"]["count"] == 1
+    assert metrics["coalesced"] == 0 and metrics["inflight"] == 0
@@ -0,0 +1,43 @@
+# tests/test_batch.py
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from core.batch import iter_records, main, process_stream
+
+JSONL = '{"has_af": "Evet"}\nnot json\n\n[1, 2]\n{"has_af": "Evet", "record_id": "r3"}\n'
+
+
+@pytest.fixture(autouse=True)
+def _no_audit(monkeypatch):
+    monkeypatch.setenv("CAPE_AUDIT", "0")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_malformed_jsonl_lines_become_error_rows(jobs):
+    rows = list(process_stream(iter_records(io.StringIO(JSONL), "jsonl"), jobs=jobs, chunk_size=2))
+
+    assert [(r["index"], r["record_id"]) for r in rows] == [(0, "0"), (1, "1"), (2, "2"), (3, "r3")]
+    assert "note" in rows[0] and "error" not in rows[0]
+    assert rows[1]["error"].startswith("JSONDecodeError: 2. satır")
+    assert rows[2]["error"].startswith("TypeError: 4. satır")
+    assert "note" in rows[3] and "error" not in rows[3]
+
+
+def test_main_keeps_going_and_exits_nonzero(tmp_path):
+    src = tmp_path / "in.jsonl"
+    out = tmp_path / "out.jsonl"
+    src.write_text(JSONL, encoding="utf-8")
+
+    assert main([str(src), "-o", str(out), "-j", "1", "--quiet"]) == 1
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert ["error" in r for r in rows] == [False, True, True, False]
+
+
+def test_main_exits_zero_without_errors(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text('{"has_af": "Evet"}\n', encoding="utf-8")
+    assert main([str(src), "-o", str(tmp_path / "out.jsonl"), "-j", "1", "--quiet"]) == 0
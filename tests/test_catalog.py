@@ -0,0 +1,143 @@
+# tests/test_catalog.py
+from __future__ import annotations
+
+import glob
+import os
+import random
+
+import pytest
+
+from core.catalog import DrugCatalog, fold_tr, read_drug_names
+from core.catalog_refresh import refresh
+from core.catalog_snapshot import build_snapshot, open_snapshot, snapshot_path_for
+from core.drug_classes import get_class_table
+from core.interactions import InteractionIndex
+from core.registry import get_interaction_index
+
+NAMES = read_drug_names()
+
+
+def _stamp(path) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _renamed(name: str, rng: random.Random) -> str:
+    # yazım düzeltmesi: katlanmış metni aynı kalan küçük/büyük harf değişikliği
+    letters = [i for i, ch in enumerate(name) if ch.isascii() and ch.isalpha()]
+    i = rng.choice(letters)
+    return name[:i] + name[i].swapcase() + name[i + 1:]
+
+
+def _step(current: list, pool: list, rng: random.Random) -> list:
+    """Rastgele ekleme / çıkarma / ad değişikliği; yeni (sıralı) liste döner."""
+    names = set(current)
+    for name in rng.sample(sorted(names), rng.randint(1, 40)):
+        names.discard(name)
+    for name in rng.sample(pool, rng.randint(1, 40)):
+        names.add(name)
+    for name in rng.sample(sorted(names), rng.randint(1, 20)):
+        new = _renamed(name, rng)
+        if new not in names and fold_tr(new) == fold_tr(name):
+            names.discard(name)
+            names.add(new)
+    return sorted(names)
+
+
+def _queries(catalog: DrugCatalog, rng: random.Random) -> list:
+    products = rng.sample(list(catalog.live_products()), 20)
+    out = ["a", "b", "ka", "apiksaban", "parasetamol", "beloc", "mg"]
+    for p in products:
+        brand = fold_tr(p.brand)
+        out.append(brand[: rng.randint(1, 6)])
+        if p.ingredient:
+            word = fold_tr(p.ingredient).split()[0]
+            out.append(word[rng.randint(0, max(0, len(word) - 4)):][:5])
+    return out
+
+
+def _by_name(catalog: DrugCatalog, table) -> dict:
+    return {p.name: table[pid] for pid, p in enumerate(catalog.products) if p is not None}
+
+
+def _assert_same(inc: DrugCatalog, ref: DrugCatalog, index: InteractionIndex, rng: random.Random) -> None:
+    assert set(inc.by_name) == set(ref.by_name)
+    assert len(inc) == len(ref)
+    assert inc.version == ref.version
+    for name, pid in inc.by_name.items():
+        assert inc.products[pid] == ref.get(name)
+    for q in _queries(ref, rng):
+        for k in (5, 20):
+            assert [p.name for p in inc.search(q, k)] == [p.name for p in ref.search(q, k)], (q, k)
+    assert _by_name(inc, get_class_table(inc)) == _by_name(ref, get_class_table(ref))
+    assert _by_name(inc, index._table.get(inc)) == _by_name(ref, index._table.get(ref))
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_apply_matches_fresh_build(seed):
+    rng = random.Random(seed)
+    pool = sorted(set(NAMES))
+    current = sorted(rng.sample(pool, 5000))
+    catalog = DrugCatalog(current)
+    index = get_interaction_index()
+    get_class_table(catalog)
+    index._table.get(catalog)  # tablolar üst katalogda kurulu: apply sonrası artımlı türetilir
+
+    for _ in range(6):
+        current = _step(current, pool, rng)
+        catalog = catalog.apply(catalog.diff(current))
+        _assert_same(catalog, DrugCatalog(current), index, rng)
+
+
+def test_mapped_apply_matches_fresh_build(tmp_path):
+    rng = random.Random(7)
+    csv_path = tmp_path / "ilaclar.csv"
+    current = sorted(rng.sample(sorted(set(NAMES)), 3000))
+    _write_csv(csv_path, current)
+    stamp = _stamp(csv_path)
+    build_snapshot(str(csv_path))
+    mapped = open_snapshot(str(csv_path), stamp).catalog()
+
+    current = _step(current, NAMES, rng)
+    _assert_same(mapped.apply(mapped.diff(current)), DrugCatalog(current), get_interaction_index(), rng)
+
+
+def _write_csv(path, names) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("drug_name\n")
+        for name in names:
+            f.write('"' + name.replace('"', '""') + '"\n')
+
+
+def test_refresh_dry_run_then_publish(tmp_path):
+    rng = random.Random(11)
+    csv_path = str(tmp_path / "ilaclar.csv")
+    new_csv = str(tmp_path / "yeni.csv")
+    old = sorted(rng.sample(sorted(set(NAMES)), 2000))
+    _write_csv(csv_path, old)
+    old_stamp = _stamp(csv_path)
+    build_snapshot(csv_path)
+    old_snap = snapshot_path_for(csv_path, old_stamp)
+    assert os.path.exists(old_snap)
+
+    new = _step(old, NAMES, rng)
+    _write_csv(new_csv, new)
+
+    report = refresh(new_csv, csv_path, dry_run=True)
+    assert report["published"] is False
+    assert report["rows"] == len(new)
+    assert report["added"] + report["removed"] + report["renamed"] > 0
+    assert read_drug_names(csv_path) == old
+    assert _stamp(csv_path) == old_stamp
+    assert glob.glob(os.path.join(tmp_path, "*.bin")) == [old_snap]
+
+    report = refresh(new_csv, csv_path)
+    assert report["published"] is True
+    assert read_drug_names(csv_path) == new
+    new_snap = snapshot_path_for(csv_path, _stamp(csv_path))
+    assert glob.glob(os.path.join(tmp_path, "*.bin")) == [new_snap]  # eski damgalı snapshot silindi
+    assert not [f for f in os.listdir(tmp_path) if ".tmp." in f]
+
+    mapped = open_snapshot(csv_path, _stamp(csv_path))
+    assert mapped is not None
+    assert sorted(mapped.catalog().by_name) == new
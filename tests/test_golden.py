@@ -0,0 +1,80 @@
+# tests/test_golden.py
+"""
+Tool-2 (OAK), DOAC doz uyarıları ve DAPT çıktıları, giriş ızgarası üzerinde önceki uygulamanın
+kaydedilmiş çıktılarıyla birebir aynı olmalı (kayıt: tests/record_golden.py).
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict
+
+import pytest
+
+from grids import dapt_grid, doac_warning_grid, oac_grid
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+
+def _golden(name: str) -> Dict[str, Any]:
+    with open(os.path.join(GOLDEN_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _mismatches(golden: Dict[str, Any], rows, actual) -> list:
+    outputs, index = golden["outputs"], golden["index"]
+    rows = list(rows)
+    assert len(rows) == len(index), "ızgara golden dosyasıyla uyuşmuyor (record_golden.py ile yeniden kaydedin)"
+    return [(row, outputs[i], out) for row, i, out in zip(rows, index, actual) if out != outputs[i]]
+
+
+def test_oac_evaluate_matches_previous_implementation():
+    from core.oac_engine import OacRuleEngine
+
+    engine = OacRuleEngine()
+    rows = list(oac_grid())
+    bad = _mismatches(_golden("oac"), rows, (vars(engine.evaluate(**kw)) for kw in rows))
+    assert not bad[:5], f"{len(bad)} farklı satır"
+
+
+def test_oac_evaluate_batch_matches_previous_implementation():
+    pytest.importorskip("numpy")
+    from core.oac_engine import OacRuleEngine
+
+    engine = OacRuleEngine()
+    rows = list(oac_grid())
+    result = engine.evaluate_batch(**{k: [row[k] for row in rows] for k in rows[0]})
+    bad = _mismatches(_golden("oac"), rows, (vars(result.render(i)) for i in range(len(rows))))
+    assert not bad[:5], f"{len(bad)} farklı satır"
+
+
+def test_doac_warnings_match_previous_implementation():
+    from core.clinical import get_doac_dose_warnings
+
+    rows = list(doac_warning_grid())
+    bad = _mismatches(_golden("doac_warnings"), rows, (get_doac_dose_warnings(**kw) for kw in rows))
+    assert not bad[:5], f"{len(bad)} farklı satır"
+
+
+@pytest.mark.parametrize("precompute", [False, True])
+def test_dapt_matches_previous_implementation(precompute):
+    from core.engine import DaptRuleEngine
+
+    golden = _golden("dapt")
+    engine = DaptRuleEngine(os.path.join("rules", "dapt.yaml"), precompute=precompute)
+    questions = [[q.id, list(q.options)] for q in engine.questions]
+    assert questions == golden["questions"]
+
+    rows = list(dapt_grid(questions))
+    actual = [engine.evaluate(answers) for answers in rows]
+    outputs, index = golden["outputs"], golden["index"]
+    rule_ids = {o["output_id"] for o in outputs if "output_id" in o} | {"no_match"}
+    bad = []
+    for answers, i, out in zip(rows, index, actual):
+        if "error" in outputs[i]:
+            # önceki motor eksik yanıtta NameError veriyordu; derlenmiş motor eşleşmeme ile devam eder
+            if out["output_id"] not in rule_ids:
+                bad.append((answers, outputs[i], out))
+        elif out != outputs[i]:
+            bad.append((answers, outputs[i], out))
+    assert not bad[:5], f"{len(bad)} farklı satır"
@@ -0,0 +1,143 @@
+# tests/test_interactions.py
+from __future__ import annotations
+
+import itertools
+
+import pytest
+import yaml
+
+from core.catalog import get_catalog
+from core.interactions import SEVERITY_ORDER, InteractionIndex
+from core.registry import INTERACTIONS_RULES_PATH, get_interaction_index
+
+ELIQUIS_5 = "ELIQUIS 5 MG FILM KAPLI TABLET (56 TABLET) (5 MG, apixaban)"
+ELIQUIS_25 = "ELIQUIS 2,5 MG FILM KAPLI TABLET (56 TABLET) (2,5 MG, apixaban)"
+KLAROMIN = "KLAROMIN 500 MG 14 TABLET (500 MG, clarithromycin)"
+BRILINTA = "BRILINTA 90 MG 56 FILM KAPLI TABLET (90 MG, ticagrelor)"
+PRADAXA = "PRADAXA 110 MG 60 SERT KAPSUL (110 MG, dabigatran etexilate)"
+CORDARONE = "CORDARONE BT 200 MG 30 TABLET (200 MG, amiodarone)"
+DIGOXIN = "DIGOXIN- ASSOS 0,25 MG 50 TABLET (0,25 MG, digoxin)"
+EXFORGE = "EXFORGE 5/160 MG 28 FILM TABLET (160 MG, valsartan and amlodipine)"
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_interaction_index()
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    catalog = get_catalog()
+    for name in (ELIQUIS_5, ELIQUIS_25, KLAROMIN, BRILINTA, PRADAXA, CORDARONE, DIGOXIN, EXFORGE):
+        assert name in catalog.by_name, name
+    return catalog
+
+
+def _pairs(hits):
+    return [(h.interaction.a, h.interaction.b, h.interaction.severity) for h in hits]
+
+
+def test_brand_resolution(index, catalog):
+    hits = index.check([ELIQUIS_5, "Amiodaron", "Klaritromisin"], catalog)
+
+    assert _pairs(hits) == [
+        ("amiodarone", "clarithromycin", "majör"),
+        ("apixaban", "clarithromycin", "orta"),
+    ]
+    noac = hits[1]
+    assert noac.meds_a == (ELIQUIS_5,)
+    assert noac.labels_a == ("ELIQUIS",)  # katalog ürünü marka ile gösterilir
+    assert noac.labels_b == ("Klaritromisin",)
+    assert "apixaban (ELIQUIS) + clarithromycin (Klaritromisin)" in noac.text_tr()
+
+
+def test_severity_order(index, catalog):
+    hits = index.check([ELIQUIS_5, "Aspirin", KLAROMIN, BRILINTA], catalog)
+
+    severities = [h.interaction.severity for h in hits]
+    assert set(severities) == set(SEVERITY_ORDER)
+    assert severities == sorted(severities, key=SEVERITY_ORDER.index)
+    assert _pairs(hits)[0] == ("ticagrelor", "clarithromycin", "kontrendike")
+    for a, b in zip(hits, hits[1:]):  # aynı ağırlıkta etken madde adına göre
+        if a.interaction.severity == b.interaction.severity:
+            assert (a.interaction.a, a.interaction.b) < (b.interaction.a, b.interaction.b)
+
+
+def test_same_ingredient_in_two_products_is_one_hit(index, catalog):
+    hits = index.check([ELIQUIS_5, ELIQUIS_25, KLAROMIN, ELIQUIS_5], catalog)
+
+    assert _pairs(hits) == [("apixaban", "clarithromycin", "orta")]
+    assert hits[0].meds_a == (ELIQUIS_5, ELIQUIS_25)
+    assert hits[0].labels_a == ("ELIQUIS", "ELIQUIS")
+
+
+def test_free_text_fallback(index, catalog):
+    hits = index.check(["Digoksin", "Amiodaron", "bilinmeyen ilaç"], catalog)
+
+    assert _pairs(hits) == [("digoxin", "amiodarone", "majör")]
+    assert hits[0].meds_a == ("Digoksin",) and hits[0].labels_b == ("Amiodaron",)
+    assert index.check(["bilinmeyen ilaç", "Parol"], catalog) == []
+
+
+def test_long_list_matches_pairwise_check(index, catalog):
+    meds = [
+        ELIQUIS_5, PRADAXA, BRILINTA, KLAROMIN, CORDARONE, DIGOXIN, EXFORGE,
+        "Aspirin", "Klopidogrel", "Omeprazol", "İbuprofen", "Verapamil", "Metoprolol",
+        "Ramipril", "Simvastatin", "Flukonazol", "Rifampisin", "Parol",
+    ]
+    assert len(meds) >= 15
+    hits = index.check(meds, catalog)
+
+    # referans: her ilaç çiftinin etken maddeleri tek tek komşuluk indeksinde aranır
+    owners = {}
+    for med in meds:
+        for name in index.ingredients(med, catalog):
+            owners.setdefault(name, []).append(med)
+    expected = set()
+    for x, y in itertools.combinations(owners, 2):
+        it = index._adj.get(index.ids[x], {}).get(index.ids[y])
+        if it is not None:
+            expected.add((it.a, it.b, it.severity, tuple(owners[it.a]), tuple(owners[it.b])))
+
+    got = {(h.interaction.a, h.interaction.b, h.interaction.severity, h.meds_a, h.meds_b) for h in hits}
+    assert len(hits) == len(got)
+    assert got == expected
+    assert len(expected) > 10
+    ranks = [h.interaction.rank for h in hits]
+    assert ranks == sorted(ranks)
+
+
+def _cfg(*interactions):
+    return {
+        "ingredients": {"warfarin": [], "amiodarone": ["amiodaron"], "digoxin": []},
+        "interactions": [dict(severity="majör", message_tr="test", **spec) for spec in interactions],
+    }
+
+
+@pytest.mark.parametrize(
+    "interactions, match",
+    [
+        pytest.param([{"a": ["warfarin"], "b": ["warfarin"]}], "kendisiyle", id="self-pair-a-b"),
+        pytest.param([{"a": ["warfarin", "warfarin"]}], "kendisiyle", id="self-pair-group"),
+        pytest.param(
+            [{"a": ["warfarin"], "b": ["amiodarone"]}, {"a": ["amiodarone"], "b": ["warfarin"]}],
+            "birden fazla",
+            id="duplicate-reversed",
+        ),
+        pytest.param(
+            [{"a": ["warfarin", "amiodarone", "digoxin"]}, {"a": ["digoxin"], "b": ["warfarin"]}],
+            "birden fazla",
+            id="duplicate-group",
+        ),
+        pytest.param([{"a": ["warfarin"], "b": ["heparin"]}], "tanımsız etken madde", id="unknown-ingredient"),
+    ],
+)
+def test_rules_rejected(interactions, match):
+    with pytest.raises(ValueError, match=match):
+        InteractionIndex(_cfg(*interactions), source="test.yaml")
+
+
+def test_shipped_rules_load():
+    with open(INTERACTIONS_RULES_PATH, "r", encoding="utf-8") as f:
+        index = InteractionIndex(yaml.safe_load(f), source=INTERACTIONS_RULES_PATH)
+    assert len(index) > 0
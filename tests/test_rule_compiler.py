@@ -0,0 +1,53 @@
+# tests/test_rule_compiler.py
+from __future__ import annotations
+
+import pytest
+
+from core.rule_compiler import RuleCompileError, compile_vector, compile_when
+
+REJECTED = [
+    "agent.lower() == 'x'",  # attribute
+    "egfr.real > 0",
+    "__import__('os').system('true')",  # izin listesi dışı çağrı
+    "open('/etc/passwd')",
+    "eval('1')",
+    "getattr(agent, 'lower')",
+    "(lambda: True)()",  # lambda
+    "lambda x: x",
+    "meds[0] == 'Aspirin'",  # subscript
+    "agent[:3] == 'api'",
+    "{'a': 1}['a'] == 1",
+    "[x for x in meds]",
+    "egfr ** 2 > 10",  # izin verilmeyen aritmetik
+    "egfr is None",
+    "x := 1",
+    "",
+]
+
+
+@pytest.mark.parametrize("source", REJECTED)
+def test_compile_when_rejects_disallowed_nodes(source):
+    with pytest.raises(RuleCompileError):
+        compile_when(source)
+
+
+@pytest.mark.parametrize("source", REJECTED)
+def test_compile_vector_rejects_disallowed_nodes(source):
+    pytest.importorskip("numpy")
+    with pytest.raises(RuleCompileError):
+        compile_vector(source)
+
+
+def test_compile_when_allows_whitelisted_expressions():
+    rule = compile_when("lower(agent) in ('apiksaban', 'dabigatran') and not (egfr < 30) and int(age) >= 80")
+    assert rule({"agent": "Apiksaban", "egfr": 45, "age": "80"}) is True
+    assert rule({"agent": "Apiksaban", "egfr": 20, "age": 85}) is False
+    assert rule.names == {"agent", "egfr", "age"}
+
+
+def test_missing_variables_do_not_match_ordered_comparisons():
+    assert compile_when("egfr < 30")({}) is False
+    assert compile_when("egfr >= 30")({"egfr": None}) is False
+    assert compile_when("agent in ('a', 'b')")({}) is False
+    assert compile_when("'x' in meds")({}) is False
+    assert compile_when("'x' not in meds")({}) is True
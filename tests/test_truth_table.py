@@ -0,0 +1,74 @@
+# tests/test_truth_table.py
+from __future__ import annotations
+
+import logging
+
+import yaml
+
+from core.engine import DaptRuleEngine, main
+from core.registry import RuleEngineRegistry, _load_dapt_engine
+
+DAPT_RULES = "rules/dapt.yaml"
+
+# bleeding=Evet, defer=Hayır kapsanmıyor (kural boşluğu); bleeding=Hayır iki kurala uyuyor
+GAPPY = {
+    "tool_id": "gappy",
+    "questions": [
+        {"id": "bleeding", "text_tr": "Kanama", "options": ["Evet", "Hayır"]},
+        {"id": "defer", "text_tr": "Ertelenebilir", "options": ["Evet", "Hayır"], "visible_if": {"bleeding": "Evet"}},
+    ],
+    "outputs": [
+        {"id": "continue", "when": "bleeding=='Hayır'", "recommendation_tr": "Devam"},
+        {"id": "also_continue", "when": "bleeding=='Hayır'", "recommendation_tr": "Devam"},
+        {"id": "defer", "when": "bleeding=='Evet' and defer=='Evet'", "recommendation_tr": "Ertele"},
+    ],
+}
+
+
+def test_dapt_rules_have_no_gaps_or_overlaps():
+    report = DaptRuleEngine(DAPT_RULES, precompute=True).truth_table_report
+    assert report.enabled, report.fallback_reason
+    assert report.no_match == []
+    assert report.overlaps == []
+    assert report.clean
+    # yanıtsız görünür soru içeren kombinasyonlar ayrı raporlanır
+    assert report.partial_no_match
+
+
+def test_report_separates_complete_from_partial():
+    report = DaptRuleEngine("gappy.yaml", precompute=True, cfg=GAPPY).truth_table_report
+    assert report.size == 9
+    assert report.no_match == [{"bleeding": "Evet", "defer": "Hayır"}]
+    # bleeding yanıtsız ya da görünür defer yanıtsız: eksik yanıtlı
+    assert {"bleeding": "Evet"} in report.partial_no_match
+    assert {} in report.partial_no_match
+    # bleeding=Hayır: defer'in (gizli) her değerinde iki kural uyar
+    assert [ids for _, ids in report.overlaps] == [["continue", "also_continue"]] * 3
+    assert not report.clean
+    assert "1 tam yanıtlı" in report.summary_tr()
+
+
+def test_registry_logs_summary_on_load(tmp_path, caplog):
+    path = tmp_path / "dapt.yaml"
+    path.write_text(yaml.safe_dump(GAPPY, allow_unicode=True), encoding="utf-8")
+    registry = RuleEngineRegistry()
+
+    with caplog.at_level(logging.INFO, logger="core.registry"):
+        registry.get(str(path), _load_dapt_engine, kind="dapt")
+    [rec] = caplog.records
+    assert rec.levelno == logging.WARNING
+    assert "çoklu eşleşme: 3" in rec.getMessage()
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="core.registry"):
+        registry.get(DAPT_RULES, _load_dapt_engine, kind="dapt")
+    [rec] = caplog.records
+    assert rec.levelno == logging.INFO
+
+
+def test_cli_exit_code(tmp_path, capsys):
+    assert main([DAPT_RULES]) == 0
+    path = tmp_path / "dapt.yaml"
+    path.write_text(yaml.safe_dump(GAPPY, allow_unicode=True), encoding="utf-8")
+    assert main([str(path)]) == 1
+    assert "eşleşmeyen: {" in capsys.readouterr().out